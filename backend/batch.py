@@ -0,0 +1,482 @@
+"""Batch mutations: many creates, updates and deletes in one request.
+
+Operations are validated with the same models as the single-document
+endpoints and grouped per collection. Each collection's creates are one
+unordered ``bulk_write``. Its updates, and separately its deletes with
+their cascades, are one ``find`` of the documents as they are before the
+write and one ``bulk_write``, both inside a transaction, so the pre-images
+are exactly what gets written over. That is what the side effects are
+computed from: an operation whose document does not exist, e.g. because
+another request deleted it first, fails with 404 and changes no rollup,
+hours or bucket. A transaction that loses a write conflict to a concurrent
+request is retried. Sprint rollups and logged hours are then applied as
+merged deltas, as are the time buckets of created and deleted time
+entries. Every operation gets its own result, so an invalid operation does
+not abort the rest of the batch.
+
+A standalone mongod has no transactions. There each update and delete is
+one atomic ``find_one_and_update`` / ``find_one_and_delete`` returning its
+pre-image, run concurrently across documents.
+
+Like the single-document endpoints, the whole batch is not atomic.
+"""
+import asyncio
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field, ValidationError
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from database import Repository, store
+from models import (
+    Bug, BugUpdate, Project, ProjectUpdate, Sprint, SprintUpdate, Task, TaskUpdate, TeamMember, TeamMemberUpdate,
+    TimeEntry,
+)
+from search import SEARCH_FIELDS, search_fields
+from sprint_metrics import accepted_points
+from sprint_rollups import DONE, apply_deltas, done_hours_deltas, item_deltas, merge_deltas, sprint_update_operation
+from time_buckets import apply_bucket_deltas, delete_entries, entry_deltas, merge_bucket_deltas
+
+MAX_OPERATIONS = 500
+
+# Single-document writes in flight at once; the rest wait for a pooled connection anyway
+WRITE_CONCURRENCY = 16
+
+# Transactions retried after a write conflict before the error is returned
+TRANSACTION_ATTEMPTS = 3
+
+# Duplicate key, e.g. a unique index violated by a create
+DUPLICATE_KEY = 11000
+
+# What the done-hours rollup deltas need from an item's pre-image
+DONE_HOURS_FIELDS = {"_id": 0, "id": 1, "sprintId": 1, "status": 1, "actualHours": 1}
+
+# (operation index, document before, document after) per applied or missing operation
+Outcomes = List[Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+
+CollectionName = Literal["projects", "sprints", "tasks", "bugs", "team", "timeEntries"]
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    collection: CollectionName
+    id: Optional[str] = None
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., max_length=MAX_OPERATIONS)
+
+
+@dataclass(frozen=True)
+class Target:
+    repository: Repository
+    label: str
+    model: Type[BaseModel]
+    update_model: Optional[Type[BaseModel]] = None
+    # Server-maintained fields clients cannot create
+    exclude: frozenset = frozenset()
+
+
+# Collection names match the frontend's tables and the export format
+TARGETS: Dict[str, Target] = {
+    "projects": Target(store.projects, "Project", Project, ProjectUpdate),
+    "sprints": Target(store.sprints, "Sprint", Sprint, SprintUpdate, frozenset({"rollup"})),
+    "team": Target(store.team, "Team member", TeamMember, TeamMemberUpdate),
+    "tasks": Target(store.tasks, "Task", Task, TaskUpdate),
+    "bugs": Target(store.bugs, "Bug", Bug, BugUpdate),
+    "timeEntries": Target(store.time_entries, "Time entry", TimeEntry),
+}
+
+# Collections are applied in this order, parents before the items that reference them
+ORDER = ("projects", "sprints", "team", "tasks", "bugs", "timeEntries")
+
+# Collections whose documents feed the sprint rollups
+ROLLUP_COLLECTIONS = {"tasks", "bugs"}
+
+# Collections whose documents carry search terms
+SEARCH_COLLECTIONS = {"tasks", "bugs"}
+
+
+async def _unlink_sprints(ids: List[str], session) -> None:
+    unlink = {"$set": {"sprintId": None, "updatedAt": datetime.now()}}
+    await store.tasks.update_many({"sprintId": {"$in": ids}}, unlink, session=session)
+    await store.bugs.update_many({"sprintId": {"$in": ids}}, unlink, session=session)
+
+
+async def _unassign_members(ids: List[str], session) -> None:
+    unassign = {"$set": {"assigneeId": None, "assignee": None, "updatedAt": datetime.now()}}
+    await store.tasks.update_many({"assigneeId": {"$in": ids}}, unassign, session=session)
+    await store.bugs.update_many({"assigneeId": {"$in": ids}}, unassign, session=session)
+
+
+async def _unlink_tasks(ids: List[str], session) -> None:
+    unlink = {"$set": {"taskId": None, "updatedAt": datetime.now()}}
+    await store.bugs.update_many({"taskId": {"$in": ids}}, unlink, session=session)
+    await delete_entries({"taskId": {"$in": ids}}, session=session)
+
+
+async def _drop_bug_entries(ids: List[str], session) -> None:
+    await delete_entries({"taskId": {"$in": ids}, "isBugEntry": True}, session=session)
+
+
+# The same cascades the single-document delete endpoints run
+CASCADES = {
+    "sprints": _unlink_sprints,
+    "team": _unassign_members,
+    "tasks": _unlink_tasks,
+    "bugs": _drop_bug_entries,
+}
+
+
+async def _bulk_write(repository: Repository, requests: List[Any], session=None) -> Dict[int, Dict[str, Any]]:
+    """Run an unordered bulk write, returning its write errors by request position"""
+    if not requests:
+        return {}
+    try:
+        await repository.bulk_write(requests, ordered=False, session=session)
+    except BulkWriteError as exc:
+        return {error["index"]: error for error in exc.details.get("writeErrors", [])}
+    return {}
+
+
+async def _transactionally(apply: Callable[[Any], Awaitable[Any]]) -> Any:
+    """Run ``apply(session)`` in a transaction, again if it lost a write conflict to another request"""
+    for attempt in range(1, TRANSACTION_ATTEMPTS + 1):
+        try:
+            async with store.transaction() as session:
+                return await apply(session)
+        except OperationFailure as exc:
+            if attempt == TRANSACTION_ATTEMPTS or not exc.has_error_label("TransientTransactionError"):
+                raise
+
+
+async def _per_document(calls: List[Tuple[str, Callable[[], Awaitable[None]]]], concurrent: bool = True) -> None:
+    """Await each document's calls in batch order, different documents concurrently"""
+    if not concurrent:
+        for _, call in calls:
+            await call()
+        return
+    grouped: Dict[str, List[Callable[[], Awaitable[None]]]] = defaultdict(list)
+    for doc_id, call in calls:
+        grouped[doc_id].append(call)
+    limit = asyncio.Semaphore(WRITE_CONCURRENCY)
+
+    async def run_in_order(group: List[Callable[[], Awaitable[None]]]) -> None:
+        for call in group:
+            async with limit:
+                await call()
+
+    await asyncio.gather(*(run_in_order(group) for group in grouped.values()))
+
+
+def _strip(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in doc.items() if key != "_id" and key not in SEARCH_FIELDS}
+
+
+class Batch:
+    """Applies a list of operations and collects one result per operation"""
+
+    def __init__(self, operations: List[BatchOperation]):
+        self.operations = operations
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        self.rollups: List[Dict[Any, Dict[str, float]]] = []
+        self.buckets: List[Dict[Any, Any]] = []
+        # Hours to add to (or remove from) completed items, by (is task, item id)
+        self.done_hours: Dict[Tuple[bool, str], float] = defaultdict(float)
+        self.now = datetime.now()
+
+    def succeed(self, index: int, status: int, doc_id: str, document: Optional[Dict[str, Any]] = None) -> None:
+        result = {"index": index, "status": status, "id": doc_id}
+        if document is not None:
+            result["document"] = _strip(document)
+        self.results[index] = result
+
+    def fail(self, index: int, status: int, error: Any) -> None:
+        self.results[index] = {"index": index, "status": status, "id": self.operations[index].id, "error": error}
+
+    def write_failed(self, index: int, error: Dict[str, Any]) -> None:
+        status = 409 if error.get("code") == DUPLICATE_KEY else 400
+        self.fail(index, status, error.get("errmsg", "Write failed"))
+
+    async def run(self) -> Dict[str, Any]:
+        grouped: Dict[str, List[int]] = defaultdict(list)
+        for index, operation in enumerate(self.operations):
+            grouped[operation.collection].append(index)
+        for name in ORDER:
+            if grouped[name]:
+                await self.apply(name, grouped[name])
+
+        await self.apply_done_hours()
+        await apply_deltas(merge_deltas(self.rollups))
+        await apply_bucket_deltas(merge_bucket_deltas(self.buckets))
+
+        succeeded = sum(1 for result in self.results if result["status"] < 400)
+        return {"results": self.results, "succeeded": succeeded, "failed": len(self.results) - succeeded}
+
+    def prepare(self, target: Target, operation: BatchOperation) -> Dict[str, Any]:
+        """Validate one operation's payload into the fields to write"""
+        if operation.op == "create":
+            doc = target.model.model_validate(operation.data).model_dump(exclude=set(target.exclude))
+            doc["id"] = str(uuid.uuid4())
+            doc["createdAt"] = self.now
+            if operation.collection in SEARCH_COLLECTIONS:
+                doc.update(search_fields(doc))
+            return doc
+        if not operation.id:
+            raise ValueError(f"{operation.op} needs an id")
+        if operation.op == "update":
+            if target.update_model is None:
+                raise ValueError(f"{operation.collection} cannot be updated")
+            fields = target.update_model.model_validate(operation.data).model_dump(exclude_unset=True)
+            fields["updatedAt"] = self.now
+            if operation.collection in SEARCH_COLLECTIONS:
+                fields.update(search_fields(fields))
+            return fields
+        return {}
+
+    async def apply(self, name: str, indexes: List[int]) -> None:
+        target = TARGETS[name]
+        creates: List[Tuple[int, Dict[str, Any]]] = []
+        updates: List[Tuple[int, Dict[str, Any]]] = []
+        deletes: List[int] = []
+        for index in indexes:
+            operation = self.operations[index]
+            try:
+                payload = self.prepare(target, operation)
+            except ValidationError as exc:
+                self.fail(index, 422, exc.errors(include_url=False, include_context=False, include_input=False))
+                continue
+            except ValueError as exc:
+                self.fail(index, 400, str(exc))
+                continue
+            if operation.op == "create":
+                creates.append((index, payload))
+            elif operation.op == "update":
+                updates.append((index, payload))
+            else:
+                deletes.append(index)
+
+        if name == "timeEntries" and creates:
+            await self.assign_entries([doc for _, doc in creates])
+        await self.create(name, target, creates)
+        await self.update(name, target, updates)
+        await self.delete(name, target, deletes)
+
+    async def create(self, name: str, target: Target, creates: List[Tuple[int, Dict[str, Any]]]) -> None:
+        errors = await _bulk_write(target.repository, [InsertOne(doc) for _, doc in creates])
+        for position, (index, doc) in enumerate(creates):
+            if position in errors:
+                self.write_failed(index, errors[position])
+                continue
+            self.succeed(index, 201, doc["id"], doc)
+            self.changed(name, None, doc)
+
+    def updated(self, name: str, before: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """The document as an update of ``fields`` leaves it"""
+        after = {**before, **fields}
+        if name == "sprints" and "status" in fields:
+            # As derived by the sprint_update_operation pipeline
+            rollup = after.get("rollup") or {}
+            after["acceptedPoints"] = accepted_points(after["status"], rollup.get("doneHours", 0))
+        return after
+
+    async def update(self, name: str, target: Target, updates: List[Tuple[int, Dict[str, Any]]]) -> None:
+        if not updates:
+            return
+        if await store.supports_transactions():
+            try:
+                outcomes = await _transactionally(partial(self.update_together, name, target, updates))
+            except OperationFailure as exc:
+                # The transaction rolled back every update to this collection
+                for index, _ in updates:
+                    self.write_failed(index, {"code": exc.code, "errmsg": str(exc)})
+                return
+        else:
+            outcomes = await self.update_each(name, target, updates)
+
+        for index, before, after in outcomes:
+            if before is None:
+                self.fail(index, 404, f"{target.label} not found")
+                continue
+            self.succeed(index, 200, after["id"], after)
+            self.changed(name, before, after)
+
+    async def update_together(
+        self, name: str, target: Target, updates: List[Tuple[int, Dict[str, Any]]], session
+    ) -> Outcomes:
+        """One read of the pre-images and one ordered bulk write, in the caller's transaction"""
+        ids = list({self.operations[index].id for index, _ in updates})
+        found = await target.repository.find_many({"id": {"$in": ids}}, {"_id": 0}, session=session)
+        current = {doc["id"]: doc for doc in found}
+        requests = []
+        outcomes: Outcomes = []
+        for index, fields in updates:
+            doc_id = self.operations[index].id
+            before = current.get(doc_id)
+            if before is None:
+                outcomes.append((index, None, None))
+                continue
+            update = sprint_update_operation(fields) if name == "sprints" else {"$set": fields}
+            requests.append(UpdateOne({"id": doc_id}, update))
+            # A later operation on the same document starts from this one's result
+            current[doc_id] = after = self.updated(name, before, fields)
+            outcomes.append((index, before, after))
+        if requests:
+            await target.repository.bulk_write(requests, session=session)
+        return outcomes
+
+    async def update_each(self, name: str, target: Target, updates: List[Tuple[int, Dict[str, Any]]]) -> Outcomes:
+        """One atomic update per operation, each returning its own pre-image"""
+        outcomes: Outcomes = []
+
+        async def update_one(index: int, fields: Dict[str, Any]) -> None:
+            update = sprint_update_operation(fields) if name == "sprints" else {"$set": fields}
+            try:
+                before = await target.repository.find_one_and_update(
+                    {"id": self.operations[index].id}, update, {"_id": 0}, return_after=False, invalidate=False
+                )
+            except OperationFailure as exc:
+                self.write_failed(index, {"code": exc.code, "errmsg": str(exc)})
+                return
+            outcomes.append((index, before, before and self.updated(name, before, fields)))
+
+        await _per_document([
+            (self.operations[index].id, partial(update_one, index, fields))
+            for index, fields in updates
+        ])
+        await target.repository.invalidate()
+        return outcomes
+
+    async def delete(self, name: str, target: Target, deletes: List[int]) -> None:
+        if not deletes:
+            return
+        if await store.supports_transactions():
+            outcomes = await _transactionally(partial(self.delete_together, name, target, deletes))
+        else:
+            outcomes = await self.delete_each(name, target, deletes)
+
+        for index, before, _ in outcomes:
+            if before is None:
+                # Also a document deleted earlier in the batch or by another request
+                self.fail(index, 404, f"{target.label} not found")
+                continue
+            self.succeed(index, 200, before["id"])
+            self.changed(name, before, None)
+
+    async def delete_together(self, name: str, target: Target, deletes: List[int], session) -> Outcomes:
+        """One read of the pre-images and one bulk delete, with the cascades, in the caller's transaction"""
+        ids = list({self.operations[index].id for index in deletes})
+        found = await target.repository.find_many({"id": {"$in": ids}}, {"_id": 0}, session=session)
+        current = {doc["id"]: doc for doc in found}
+        # A repeated id is deleted by its first operation
+        outcomes: Outcomes = [(index, current.pop(self.operations[index].id, None), None) for index in deletes]
+        deleted = [before["id"] for _, before, _ in outcomes if before is not None]
+        if deleted:
+            requests = [DeleteOne({"id": doc_id}) for doc_id in deleted]
+            await target.repository.bulk_write(requests, ordered=False, session=session)
+            await self.cascade(name, target, deleted, session)
+        return outcomes
+
+    async def delete_each(self, name: str, target: Target, deletes: List[int]) -> Outcomes:
+        """One atomic delete per operation, each returning its own pre-image"""
+        outcomes: Outcomes = []
+
+        async def delete_one(index: int) -> None:
+            doc = await target.repository.find_one_and_delete({"id": self.operations[index].id}, {"_id": 0})
+            outcomes.append((index, doc, None))
+
+        await _per_document([(self.operations[index].id, partial(delete_one, index)) for index in deletes])
+        await self.cascade(name, target, [before["id"] for _, before, _ in outcomes if before is not None], None)
+        await target.repository.invalidate()
+        return outcomes
+
+    async def cascade(self, name: str, target: Target, ids: List[str], session) -> None:
+        """Tombstones and the single-delete cascades for deleted documents"""
+        await target.repository.record_deletions(ids, session=session)
+        if name in CASCADES and ids:
+            await CASCADES[name](ids, session)
+
+    def changed(self, name: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """Record the rollup and hours side effects of one applied write"""
+        if name in ROLLUP_COLLECTIONS:
+            self.rollups.append(item_deltas(before, after))
+        elif name == "timeEntries":
+            entry, sign = (after, 1) if after is not None else (before, -1)
+            key = (entry.get("isTaskEntry", True) is not False, str(entry.get("taskId")))
+            self.done_hours[key] += sign * float(entry.get("hours") or 0)
+            self.buckets.append(entry_deltas([entry], sign))
+
+    async def assign_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """Stamp new time entries with their item's assignee, which picks their time bucket"""
+        for is_task, items in ((True, store.tasks), (False, store.bugs)):
+            group = [entry for entry in entries if (entry.get("isTaskEntry", True) is not False) == is_task]
+            if not group:
+                continue
+            found = await items.find_many(
+                {"id": {"$in": list({str(entry.get("taskId")) for entry in group})}},
+                {"_id": 0, "id": 1, "assigneeId": 1},
+            )
+            assignees = {item["id"]: item.get("assigneeId") for item in found}
+            for entry in group:
+                entry["assigneeId"] = assignees.get(str(entry.get("taskId")))
+
+    def add_hours(self, hours: float) -> List[Dict[str, Any]]:
+        return [{"$set": {
+            "actualHours": {"$max": [0, {"$add": [{"$ifNull": ["$actualHours", 0]}, hours]}]},
+            "updatedAt": self.now,
+        }}]
+
+    async def apply_done_hours(self) -> None:
+        """Add logged hours to completed items, floored at zero, like the time-entry endpoints"""
+        for is_task, items in ((True, store.tasks), (False, store.bugs)):
+            changes = {
+                item_id: hours
+                for (task_entry, item_id), hours in self.done_hours.items()
+                if task_entry == is_task and hours
+            }
+            if not changes:
+                continue
+            if await store.supports_transactions():
+                added = await _transactionally(partial(self.add_done_hours_together, items, changes))
+            else:
+                added = await self.add_done_hours_each(items, changes)
+            # The pre-image says whether the item was Done and what it had logged
+            for item, hours in added:
+                previous = float(item.get("actualHours") or 0)
+                self.rollups.append(done_hours_deltas(item, max(0, previous + hours) - previous))
+
+    async def add_done_hours_together(
+        self, items: Repository, changes: Dict[str, float], session
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        done = await items.find_many({"id": {"$in": list(changes)}, "status": DONE}, DONE_HOURS_FIELDS, session=session)
+        if done:
+            await items.bulk_write(
+                [UpdateOne({"id": item["id"], "status": DONE}, self.add_hours(changes[item["id"]])) for item in done],
+                ordered=False,
+                session=session,
+            )
+        return [(item, changes[item["id"]]) for item in done]
+
+    async def add_done_hours_each(
+        self, items: Repository, changes: Dict[str, float]
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        added = []
+
+        async def add_one(item_id: str, hours: float) -> None:
+            item = await items.find_one_and_update(
+                {"id": item_id, "status": DONE}, self.add_hours(hours), DONE_HOURS_FIELDS,
+                return_after=False, invalidate=False,
+            )
+            if item is not None:
+                added.append((item, hours))
+
+        await _per_document([(item_id, partial(add_one, item_id, hours)) for item_id, hours in changes.items()])
+        if added:
+            await items.invalidate()
+        return added
@@ -0,0 +1,346 @@
+"""Read-through cache for repository lookups.
+
+Repositories cache single documents under ``<collection>:<generation>:id:<id>``
+and list results under ``<collection>:<generation>:list:<normalized query>``.
+A write to one document deletes its entry and bumps the collection's list
+generation, so every cached list for that collection becomes unreachable at
+once and ages out of the LRU; bulk writes bump the entity generation too.
+A value loaded while the list generation moved is returned but not cached,
+so a read racing a write cannot put the older document back after the
+write's delete; ``set_if_generation`` makes that check and the store one
+atomic step.
+
+Backends implement the async ``CacheBackend`` interface so the in-process
+LRU can be swapped for a shared store without touching the repositories.
+``RedisCache`` keeps values and generation stamps in Redis so every uvicorn
+worker sees the same entries; generation bumps are also published so each
+worker's local copy of the stamps is updated within milliseconds.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import bson
+
+logger = logging.getLogger(__name__)
+
+# Returned by CacheBackend.get when a key is absent, since None is cacheable
+MISSING = object()
+
+
+def normalize_key(*parts: Any) -> str:
+    """Stable text form of a query so equivalent queries share a cache entry"""
+    return json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+class CacheBackend:
+    """Interface every cache backend implements"""
+
+    async def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def set_if_generation(self, key: str, value: Any, namespace: str, generation: int) -> bool:
+        """Store ``value`` only if ``namespace`` is still at ``generation``; True if stored"""
+        # Nothing awaits between the check and the set, so in-process backends are atomic
+        if await self.generation(namespace) != generation:
+            return False
+        await self.set(key, value)
+        return True
+
+    async def generation(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    async def version(self, namespace: str) -> str:
+        """Opaque stamp that changes whenever ``namespace`` is bumped, across restarts too"""
+        return f"{self.epoch}.{await self.generation(namespace)}"
+
+    async def bump(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """Called once the event loop is running, before the first request"""
+
+    async def close(self) -> None:
+        """Called on shutdown"""
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """Backend used when caching is disabled; still tracks generations for ETags"""
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Any:
+        return MISSING
+
+    async def set(self, key: str, value: Any) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    async def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "none"}
+
+
+class LRUCache(CacheBackend):
+    """Bounded in-process LRU whose entries also expire after ``ttl`` seconds"""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        # Generations restart at 0 with the process; the epoch keeps versions unique
+        self.epoch = uuid.uuid4().hex[:8]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self.invalidations += 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker through a Redis-compatible server.
+
+    Values live in Redis with a TTL, so a document deleted by one worker is
+    gone for all of them. Generation stamps are kept in a Redis hash; each
+    worker mirrors them locally and applies bumps published by the others,
+    which lets a lookup cost a single Redis round trip. The mirror may lag a
+    bump by a few milliseconds, so caching a loaded value compares against
+    the hash itself, in the same Lua script that stores the value.
+    """
+
+    # KEYS: generations hash, value key; ARGV: namespace, generation, value, ttl in ms
+    SET_IF_GENERATION = """
+    if tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0') ~= tonumber(ARGV[2]) then
+        return 0
+    end
+    redis.call('SET', KEYS[2], ARGV[3], 'PX', ARGV[4])
+    return 1
+    """
+
+    def __init__(self, redis, ttl: float = 30.0, prefix: str = "agile_tracker:cache"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self.channel = f"{prefix}:invalidations"
+        self.generations_key = f"{prefix}:generations"
+        self.epoch_key = f"{prefix}:epoch"
+        self.epoch: Optional[str] = None
+        self._generations: Dict[str, int] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._set_if_generation = redis.register_script(self.SET_IF_GENERATION)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:value:{key}"
+
+    async def get(self, key: str) -> Any:
+        raw = await self.redis.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return bson.decode(raw)["v"]
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.redis.set(self._key(key), bson.encode({"v": value}), px=self._ttl_ms())
+
+    async def set_if_generation(self, key: str, value: Any, namespace: str, generation: int) -> bool:
+        stored = await self._set_if_generation(
+            keys=[self.generations_key, self._key(key)],
+            args=[namespace, generation, bson.encode({"v": value}), self._ttl_ms()],
+        )
+        return bool(stored)
+
+    def _ttl_ms(self) -> int:
+        return max(1, int(self.ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        if await self.redis.delete(self._key(key)):
+            self.invalidations += 1
+
+    async def generation(self, namespace: str) -> int:
+        if self._listener is None:
+            # Not subscribed, so the local mirror cannot be trusted
+            value = await self.redis.hget(self.generations_key, namespace)
+            return int(value or 0)
+        return self._generations.get(namespace, 0)
+
+    async def version(self, namespace: str) -> str:
+        if self.epoch is None:
+            await self._load_epoch()
+        return await super().version(namespace)
+
+    async def _load_epoch(self) -> None:
+        # Shared by all workers; a flushed Redis gets a new epoch
+        await self.redis.set(self.epoch_key, uuid.uuid4().hex[:8], nx=True)
+        epoch = await self.redis.get(self.epoch_key)
+        self.epoch = epoch.decode() if isinstance(epoch, bytes) else epoch
+
+    async def bump(self, namespace: str) -> None:
+        value = await self.redis.hincrby(self.generations_key, namespace, 1)
+        self._apply(namespace, value)
+        await self.redis.publish(self.channel, json.dumps([namespace, value]))
+        self.invalidations += 1
+
+    async def clear(self) -> None:
+        async for key in self.redis.scan_iter(match=self._key("*")):
+            await self.redis.delete(key)
+
+    def _apply(self, namespace: str, value: int) -> None:
+        # Stamps only move forward, whatever order messages arrive in
+        if value > self._generations.get(namespace, 0):
+            self._generations[namespace] = value
+
+    async def _load_generations(self) -> None:
+        for namespace, value in (await self.redis.hgetall(self.generations_key)).items():
+            if isinstance(namespace, bytes):
+                namespace = namespace.decode()
+            self._apply(namespace, int(value))
+
+    async def start(self) -> None:
+        self._pubsub = self.redis.pubsub()
+        # Subscribe before loading so no bump can fall between the two
+        await self._pubsub.subscribe(self.channel)
+        await self._load_epoch()
+        await self._load_generations()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                namespace, value = json.loads(message["data"])
+                self._apply(namespace, int(value))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation listener failed; resynchronizing")
+                await asyncio.sleep(1)
+                try:
+                    await self._load_epoch()
+                    await self._load_generations()
+                except Exception:
+                    logger.exception("Could not reload cache generations")
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "subscribed": self._listener is not None,
+        }
+
+
+def create_cache(backend: str, ttl: float, max_entries: int, redis_url: Optional[str] = None) -> CacheBackend:
+    """Build the configured cache backend; redis is only imported when used"""
+    if ttl <= 0 or backend == "none":
+        return NullCache()
+    if backend == "redis":
+        import redis.asyncio as redis
+
+        return RedisCache(redis.from_url(redis_url or "redis://localhost:6379/0"), ttl)
+    if backend == "memory":
+        return LRUCache(max_entries, ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,170 @@
+"""Response compression middleware.
+
+List endpoints return large JSON bodies that repeat the same status,
+priority and assignee strings on every document, which compress by an
+order of magnitude. ``CompressionMiddleware`` negotiates Brotli (when the
+optional ``brotli`` package is installed) or gzip from ``Accept-Encoding``
+and compresses responses of at least ``minimum_size`` bytes. Streaming
+responses such as the bulk export are compressed chunk by chunk with a
+sync flush after each, so memory stays flat and clients still receive data
+as it is produced. A compressed body is a different byte sequence from the
+plain one, so any strong ``ETag`` on it is sent as a weak one.
+"""
+import zlib
+from typing import Dict, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+def weak_etag(etag: str) -> str:
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def parse_encodings(value: Optional[str]) -> Tuple[str, ...]:
+    """Encodings from a comma separated setting; unset means all supported, "none" disables"""
+    if value is None:
+        return SUPPORTED_ENCODINGS
+    if value.strip().lower() in ("", "none"):
+        return ()
+    return tuple(encoding.strip().lower() for encoding in value.split(",") if encoding.strip())
+
+
+def negotiate(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """Pick the first of ``encodings`` the client accepts with a non-zero q-value"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        # wbits 16 + MAX_WBITS writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses of at least ``minimum_size`` bytes"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        encodings: Sequence[str] = SUPPORTED_ENCODINGS,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        unknown = [encoding for encoding in encodings if encoding not in SUPPORTED_ENCODINGS]
+        if unknown:
+            raise ValueError(f"Unsupported compression encodings: {', '.join(unknown)}")
+        self.encodings = tuple(encodings)
+
+    def encoder(self, encoding: str):
+        if encoding == "br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, CompressingSender(self, encoding, send).send)
+
+
+class CompressingSender:
+    """Wraps ``send`` for one response, deciding on the first body message"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._encoder = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body message shows how large the response is
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start is not None:
+            start, self._start = self._start, None
+            headers = MutableHeaders(raw=start["headers"])
+            if "content-encoding" in headers or (not more_body and len(body) < self.middleware.minimum_size):
+                self._passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self._encoder = self.middleware.encoder(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                # The same tag is sent for every encoding of the response
+                headers["ETag"] = weak_etag(headers["etag"])
+            if more_body:
+                del headers["content-length"]
+                body = self._encoder.compress(body)
+            else:
+                body = self._encoder.finish(body)
+                headers["Content-Length"] = str(len(body))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self._passthrough:
+            await self._send(message)
+            return
+        body = self._encoder.compress(body) if more_body else self._encoder.finish(body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
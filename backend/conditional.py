@@ -0,0 +1,63 @@
+"""Conditional GET support.
+
+Every write through a repository bumps its collection's change counter, so
+an ETag built from the counters of the collections a response reads from
+changes whenever the response could. ``Conditional`` runs as a route
+dependency: it compares the client's ``If-None-Match`` with the current
+ETag and answers ``304 Not Modified`` before the handler reads anything.
+
+Detail routes use the same counters. Their bodies come from the entity
+cache, which never keeps a document loaded while the counter moved, so a
+tag is never paired with a body older than the writes it counts.
+
+Counters are only as coherent as the cache backend that keeps them; run
+several workers with ``CACHE_BACKEND=redis`` so they share one set.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from database import Repository
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def last_modified(doc: Optional[Dict[str, Any]]) -> Optional[str]:
+    """HTTP date of a document's last write; stored datetimes are treated as UTC"""
+    if not doc:
+        return None
+    stamp = doc.get("updatedAt") or doc.get("createdAt")
+    if not isinstance(stamp, datetime):
+        return None
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return format_datetime(stamp.astimezone(timezone.utc), usegmt=True)
+
+
+class Conditional:
+    """Route dependency adding an ETag and answering a matching If-None-Match with 304"""
+
+    def __init__(self, *repositories: Repository):
+        self.repositories = repositories
+
+    async def etag(self) -> str:
+        versions = [await repository.version() for repository in self.repositories]
+        return '"' + "-".join(versions) + '"'
+
+    async def __call__(self, request: Request, response: Response) -> str:
+        # Read before the handler so a write landing in between can only make the tag stale
+        etag = await self.etag()
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return etag
@@ -0,0 +1,324 @@
+"""Async MongoDB data layer for the Agile Tracker API.
+
+Every request handler in server.py reaches Mongo through the repositories
+defined here, so all round trips are awaited on the Motor client instead of
+blocking the event loop. Lookups by id and list queries are served through a
+read-through cache that the repository write methods invalidate.
+"""
+import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+from cache import MISSING, CacheBackend, create_cache, normalize_key
+from metrics import command_metrics, pool_metrics
+from settings import settings
+from slow_queries import SlowQueryLog
+
+# Log commands slower than SLOW_QUERY_MS (negative disables), explaining each
+# new filter shape at most once per SLOW_QUERY_EXPLAIN_INTERVAL seconds
+slow_query_log = SlowQueryLog(
+    threshold_ms=float(os.environ.get("SLOW_QUERY_MS", "100")),
+    max_entries=int(os.environ.get("SLOW_QUERY_LOG_SIZE", "200")),
+    explain=os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() not in ("0", "false", "no"),
+    explain_interval=float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", "300")),
+)
+
+# Configure MongoDB client; pooling, timeouts and compression come from settings.py
+client = AsyncIOMotorClient(
+    settings.mongo_url,
+    event_listeners=[command_metrics, pool_metrics, slow_query_log],
+    **settings.client_options(),
+)
+db = client[settings.db_name]
+
+# Configure the read-through cache; a TTL of 0 disables it. Use the redis
+# backend when running several workers so they share one coherent cache.
+cache: CacheBackend = create_cache(
+    os.environ.get("CACHE_BACKEND", "memory"),
+    ttl=float(os.environ.get("CACHE_TTL_SECONDS", "30")),
+    max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", "10000")),
+    redis_url=os.environ.get("CACHE_REDIS_URL"),
+)
+
+# Repositories written to inside the current transaction, invalidated after it ends
+_transaction_writes: ContextVar[Optional[Set["Repository"]]] = ContextVar("transaction_writes", default=None)
+
+
+def _copy(value: Any) -> Any:
+    """Shallow-copy cached documents so callers cannot mutate the cached ones"""
+    if isinstance(value, list):
+        return [dict(doc) for doc in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class Repository:
+    """Async CRUD access to one collection keyed by the string ``id`` field"""
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        cache: CacheBackend,
+        analytics_read_preference=None,
+        tombstones: Optional[AsyncIOMotorCollection] = None,
+    ):
+        self.collection = collection
+        self.cache = cache
+        self.name = collection.name
+        # Deletes leave a record here so delta sync clients learn about them
+        self.tombstones = tombstones
+        # Reporting reads that tolerate replication lag may be served by secondaries
+        self.analytics = (
+            collection.with_options(read_preference=analytics_read_preference)
+            if analytics_read_preference is not None
+            else collection
+        )
+
+    async def _entity_key(self, doc_id: Any) -> str:
+        generation = await self.cache.generation(f"{self.name}:entities")
+        return f"{self.name}:{generation}:id:{normalize_key(doc_id)}"
+
+    async def _list_key(self, *parts: Any) -> str:
+        generation = await self.cache.generation(f"{self.name}:lists")
+        return f"{self.name}:{generation}:list:{normalize_key(*parts)}"
+
+    async def invalidate(self, doc_id: Any = None) -> None:
+        """Drop cached lists and the given document, or every document if no id is known"""
+        if _transaction_writes.get() is not None:
+            _transaction_writes.get().add(self)
+        # Bump before deleting, so a load that re-checks the list generation
+        # after the delete (see _cached) always sees it moved
+        await self.cache.bump(f"{self.name}:lists")
+        if doc_id is None:
+            await self.cache.bump(f"{self.name}:entities")
+        else:
+            await self.cache.delete(await self._entity_key(doc_id))
+
+    async def version(self) -> str:
+        """Change stamp for the collection; every write through the repository moves it"""
+        return await self.cache.version(f"{self.name}:lists")
+
+    async def _cached(self, key: str, load) -> Any:
+        value = await self.cache.get(key)
+        if value is MISSING:
+            # Every write bumps the list generation, including single-document
+            # ones whose entity key does not change. A write that lands while
+            # this load is in flight may already have deleted the key, so a
+            # possibly older copy is only cached if the generation held still,
+            # checked by the backend in the same step as the store.
+            namespace = f"{self.name}:lists"
+            generation = await self.cache.generation(namespace)
+            value = await load()
+            await self.cache.set_if_generation(key, _copy(value), namespace, generation)
+            return value
+        return _copy(value)
+
+    async def list(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        async def load():
+            cursor = self.collection.find(query or {}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list(length=limit)
+
+        return await self._cached(await self._list_key(query, projection, sort, limit), load)
+
+    async def iterate(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+        analytics: bool = False,
+        session=None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield matching documents one cursor batch at a time"""
+        collection = self.analytics if analytics else self.collection
+        async for doc in collection.find(query or {}, projection, session=session).batch_size(batch_size):
+            yield doc
+
+    async def find_one(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one(query)
+
+    async def find_many(
+        self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, session=None
+    ) -> List[Dict[str, Any]]:
+        """Uncached read of every matching document, for one-off lookups"""
+        return await self.collection.find(query, projection, session=session).to_list(length=None)
+
+    async def distinct(self, field: str, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        return await self.collection.distinct(field, query or {})
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return await self._cached(
+            await self._entity_key(doc_id),
+            lambda: self.collection.find_one({"id": doc_id}),
+        )
+
+    async def create(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        # insert_one fills in _id, so the inserted document is the response
+        await self.collection.insert_one(doc)
+        await self.invalidate(doc.get("id"))
+        return doc
+
+    async def set(self, doc_id: str, fields: Dict[str, Any]) -> int:
+        result = await self.collection.update_one({"id": doc_id}, {"$set": fields})
+        await self.invalidate(doc_id)
+        return result.matched_count
+
+    async def apply_update(self, doc_id: str, update: Any) -> int:
+        """Apply an arbitrary update document or pipeline to one document"""
+        result = await self.collection.update_one({"id": doc_id}, update)
+        await self.invalidate(doc_id)
+        return result.matched_count
+
+    async def update(
+        self, doc_id: str, update_data: Dict[str, Any], return_after: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """$set fields and return the document after (or before) the update, or None if missing"""
+        return await self.find_one_and_update({"id": doc_id}, {"$set": update_data}, return_after=return_after)
+
+    async def find_one_and_update(
+        self,
+        query: Dict[str, Any],
+        update: Any,
+        projection: Optional[Dict[str, Any]] = None,
+        return_after: bool = True,
+        invalidate: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """Update one document atomically; callers writing many pass ``invalidate=False`` and invalidate once"""
+        doc = await self.collection.find_one_and_update(
+            query,
+            update,
+            projection=projection,
+            return_document=ReturnDocument.AFTER if return_after else ReturnDocument.BEFORE,
+        )
+        if invalidate:
+            doc_id = query.get("id")
+            await self.invalidate(doc_id if isinstance(doc_id, str) else None)
+        return doc
+
+    async def find_one_and_delete(
+        self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, session=None
+    ) -> Optional[Dict[str, Any]]:
+        """Delete one document and return it; the caller records its tombstone and invalidates"""
+        return await self.collection.find_one_and_delete(query, projection=projection, session=session)
+
+    async def delete(self, doc_id: str, session=None) -> Optional[Dict[str, Any]]:
+        """Delete a document and return it, or None if it did not exist"""
+        doc = await self.collection.find_one_and_delete({"id": doc_id}, session=session)
+        if doc:
+            await self.record_deletions([doc_id], session=session)
+            await self.invalidate(doc_id)
+        return doc
+
+    async def record_deletions(self, doc_ids: List[str], session=None) -> None:
+        """Leave a tombstone for each deleted document"""
+        if self.tombstones is None or not doc_ids:
+            return
+        deleted_at = datetime.now()
+        await self.tombstones.insert_many(
+            [{"collection": self.name, "id": doc_id, "deletedAt": deleted_at} for doc_id in doc_ids],
+            ordered=False,
+            session=session,
+        )
+
+    async def aggregate(
+        self, pipeline: List[Dict[str, Any]], analytics: bool = False, session=None
+    ) -> List[Dict[str, Any]]:
+        collection = self.analytics if analytics else self.collection
+        return await collection.aggregate(pipeline, session=session).to_list(length=None)
+
+    async def bulk_write(self, operations: List[Any], ordered: bool = True, session=None):
+        try:
+            return await self.collection.bulk_write(operations, ordered=ordered, session=session)
+        finally:
+            # Unordered batches may partially apply even when they raise
+            await self.invalidate()
+
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any], session=None) -> int:
+        result = await self.collection.update_many(query, update, session=session)
+        if result.modified_count:
+            await self.invalidate()
+        return result.modified_count
+
+    async def delete_many(self, query: Dict[str, Any], session=None, batch_size: int = 1000) -> int:
+        if self.tombstones is not None:
+            # Streamed from a cursor before the delete, so memory does not grow
+            # with the number of matches. Inside a transaction both see the same
+            # snapshot; outside one, a document matching only in between is
+            # deleted without a tombstone.
+            doc_ids = []
+            async for doc in self.iterate(query, {"_id": 0, "id": 1}, batch_size=batch_size, session=session):
+                doc_ids.append(doc.get("id"))
+                if len(doc_ids) >= batch_size:
+                    await self.record_deletions(doc_ids, session=session)
+                    doc_ids = []
+            await self.record_deletions(doc_ids, session=session)
+        result = await self.collection.delete_many(query, session=session)
+        if result.deleted_count:
+            await self.invalidate()
+        return result.deleted_count
+
+
+class Store:
+    """Repositories for every collection used by the API"""
+
+    def __init__(self, database, cache: CacheBackend, analytics_read_preference=None):
+        self.db = database
+        self.cache = cache
+        self._supports_transactions: Optional[bool] = None
+        self.tombstones = database.tombstones
+        # Derived from the time entries by time_buckets; not a repository of its own
+        self.time_buckets = database.time_buckets
+        options = {"analytics_read_preference": analytics_read_preference, "tombstones": self.tombstones}
+        self.projects = Repository(database.projects, cache, **options)
+        self.sprints = Repository(database.sprints, cache, **options)
+        self.tasks = Repository(database.tasks, cache, **options)
+        self.bugs = Repository(database.bugs, cache, **options)
+        self.team = Repository(database.team, cache, **options)
+        self.time_entries = Repository(database.time_entries, cache, **options)
+
+    async def supports_transactions(self) -> bool:
+        """Transactions need a replica set or sharded cluster, not a standalone mongod"""
+        if self._supports_transactions is None:
+            hello = await self.db.client.admin.command("hello")
+            self._supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        return self._supports_transactions
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Yield a session inside a transaction, or None where transactions are unavailable.
+
+        Repository calls given the session commit or abort together; an
+        exception raised inside the block aborts the transaction.
+        """
+        if not await self.supports_transactions():
+            yield None
+            return
+        written = set()
+        token = _transaction_writes.set(written)
+        try:
+            async with await self.db.client.start_session() as session:
+                async with session.start_transaction():
+                    yield session
+        finally:
+            _transaction_writes.reset(token)
+            # Readers may have re-cached pre-commit state while the transaction was open
+            for repository in written:
+                await repository.invalidate()
+
+
+store = Store(db, cache, settings.analytics_read_preference())
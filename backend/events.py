@@ -0,0 +1,288 @@
+"""Real-time change feed served as Server-Sent Events by ``GET /api/events``.
+
+One ``EventHub`` per process watches the tracker collections with a single
+Mongo change stream and fans every change out to the connected subscribers
+whose ``projectId`` / ``sprintId`` / collection filters match. Each change
+is encoded to an SSE frame once and the same bytes are queued for every
+subscriber, so a change costs one JSON encoding however many tabs are open.
+
+Change streams need a replica set or sharded cluster. Against a standalone
+mongod the hub polls the repositories' cache versions instead, and sends an
+``invalidate`` event naming each collection that was written. Clients then
+refetch it, and ETags keep the refetch cheap. Like ETags, polling only sees
+writes from other workers when they share the redis cache backend.
+
+Deletes and moves between sprints are only scoped precisely when the
+collections have change stream pre-images enabled (MongoDB 6.0+). Without
+them, a delete reaches every subscriber of its collection as an
+``invalidate`` event.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database import Store, store
+from search import SEARCH_FIELDS
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Mongo collection -> the name clients use, as in exports and batches
+COLLECTIONS = {
+    "projects": "projects",
+    "sprints": "sprints",
+    "tasks": "tasks",
+    "bugs": "bugs",
+    "team": "team",
+    "time_entries": "timeEntries",
+}
+
+OPERATIONS = ("insert", "update", "replace", "delete")
+
+# Frames buffered per subscriber before it is told to resync instead
+QUEUE_SIZE = 256
+
+# Comment frames keep idle connections open through proxies
+HEARTBEAT_SECONDS = 15
+
+# Change stream errors after which the resume token is useless
+HISTORY_LOST = {280, 286}
+
+RETRY_FRAME = b"retry: 3000\n\n"
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def frame(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """One SSE frame; orjson output never contains raw newlines"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return head.encode() + b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def _scope(collection: str, docs: Iterable[Optional[Dict[str, Any]]]):
+    projects: Set[str] = set()
+    sprints: Set[str] = set()
+    for doc in docs:
+        if not doc:
+            continue
+        project_id = doc.get("id") if collection == "projects" else doc.get("projectId")
+        sprint_id = doc.get("id") if collection == "sprints" else doc.get("sprintId")
+        if project_id is not None:
+            projects.add(str(project_id))
+        if sprint_id is not None:
+            sprints.add(str(sprint_id))
+    return frozenset(projects), frozenset(sprints)
+
+
+@dataclass(frozen=True)
+class Event:
+    collection: str
+    frame: bytes
+    project_ids: FrozenSet[str] = frozenset()
+    sprint_ids: FrozenSet[str] = frozenset()
+    # False when the affected documents are unknown, e.g. a delete without a pre-image
+    scoped: bool = True
+
+
+class Subscription:
+    """One connected client: its filters and a bounded queue of frames"""
+
+    def __init__(
+        self,
+        project_id: Optional[str] = None,
+        sprint_id: Optional[str] = None,
+        collections: Optional[Iterable[str]] = None,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        self.project_id = project_id
+        self.sprint_id = sprint_id
+        self.collections = frozenset(collections) if collections else None
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(queue_size)
+
+    def matches(self, event: Event) -> bool:
+        if self.collections is not None and event.collection not in self.collections:
+            return False
+        if not event.scoped:
+            return True
+        if self.project_id is not None and self.project_id not in event.project_ids:
+            return False
+        if self.sprint_id is not None and self.sprint_id not in event.sprint_ids:
+            return False
+        return True
+
+    def deliver(self, data: bytes) -> None:
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # A client this far behind refetches rather than replaying every change
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(frame("resync", {}))
+
+
+class EventHub:
+    """Shared change watcher for the process, started by the first subscriber"""
+
+    def __init__(self, store: Store, poll_interval: float = 1.0):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.subscribers: Set[Subscription] = set()
+        # Subscribers by their project filter (None for unfiltered), so a
+        # change only visits the subscribers that could want it
+        self._by_project: Dict[Optional[str], Set[Subscription]] = {}
+        self.mode: Optional[str] = None
+        self.sequence = 0
+        self._task: Optional[asyncio.Task] = None
+        self._before_change: Optional[str] = "whenAvailable"
+
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running():
+            return
+        change_streams = await self.store.supports_transactions()
+        if self.running():
+            return
+        # Change streams need the same replica set or sharded cluster as transactions
+        self.mode = "change-stream" if change_streams else "polling"
+        self._task = asyncio.create_task(self._run(self._watch if change_streams else self._poll))
+
+    def add(self, subscription: Subscription) -> Subscription:
+        self.subscribers.add(subscription)
+        self._by_project.setdefault(subscription.project_id, set()).add(subscription)
+        return subscription
+
+    async def subscribe(self, **filters) -> Subscription:
+        subscription = self.add(Subscription(**filters))
+        await self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+        group = self._by_project.get(subscription.project_id)
+        if group is not None:
+            group.discard(subscription)
+            if not group:
+                del self._by_project[subscription.project_id]
+
+    def publish(self, event: Event) -> None:
+        if event.scoped:
+            candidates = [self._by_project.get(key, ()) for key in (None, *event.project_ids)]
+        else:
+            candidates = [self.subscribers]
+        for group in candidates:
+            for subscription in list(group):
+                if subscription.matches(event):
+                    subscription.deliver(event.frame)
+
+    def broadcast(self, event: str, data: Dict[str, Any]) -> None:
+        encoded = frame(event, data)
+        for subscription in list(self.subscribers):
+            subscription.deliver(encoded)
+
+    def _next_id(self) -> int:
+        self.sequence += 1
+        return self.sequence
+
+    def publish_change(self, change: Dict[str, Any]) -> None:
+        """Fan out one change stream document"""
+        collection = COLLECTIONS.get(change.get("ns", {}).get("coll"))
+        if collection is None:
+            return
+        operation = change["operationType"]
+        after = change.get("fullDocument")
+        before = change.get("fullDocumentBeforeChange")
+        known = after or before
+        if known is None:
+            # Deleted with no pre-image, or gone before the update was looked up
+            self.publish_invalidate(collection)
+            return
+        document = {key: value for key, value in after.items() if key != "_id" and key not in SEARCH_FIELDS} if after else None
+        data = {"type": operation, "collection": collection, "id": known.get("id"), "document": document}
+        project_ids, sprint_ids = _scope(collection, (before, after))
+        self.publish(Event(collection, frame("change", data, self._next_id()), project_ids, sprint_ids))
+
+    def publish_invalidate(self, collection: str) -> None:
+        self.publish(Event(collection, frame("invalidate", {"collection": collection}, self._next_id()), scoped=False))
+
+    async def _run(self, source) -> None:
+        try:
+            await source()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Event feed stopped")
+            self.broadcast("resync", {})
+
+    async def _watch(self) -> None:
+        pipeline = [{"$match": {"ns.coll": {"$in": list(COLLECTIONS)}, "operationType": {"$in": list(OPERATIONS)}}}]
+        resume_token = None
+        delay = 0.5
+        while True:
+            try:
+                async with self.store.db.watch(
+                    pipeline,
+                    full_document="updateLookup",
+                    full_document_before_change=self._before_change,
+                    resume_after=resume_token,
+                ) as stream:
+                    delay = 0.5
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self.publish_change(change)
+            except OperationFailure as exc:
+                if self._before_change and resume_token is None and "fullDocumentBeforeChange" in str(exc):
+                    # Servers before 6.0 do not know pre-images
+                    self._before_change = None
+                    continue
+                if exc.code in HISTORY_LOST:
+                    resume_token = None
+                    self.broadcast("resync", {})
+                logger.warning("Change stream failed, reopening: %s", exc)
+            except PyMongoError as exc:
+                logger.warning("Change stream interrupted, resuming: %s", exc)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def _poll(self) -> None:
+        # Store attributes are named after the collections
+        repositories = {name: getattr(self.store, attribute) for attribute, name in COLLECTIONS.items()}
+        versions = {name: await repository.version() for name, repository in repositories.items()}
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for name, repository in repositories.items():
+                version = await repository.version()
+                if version != versions[name]:
+                    versions[name] = version
+                    self.publish_invalidate(name)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self.subscribers.clear()
+        self._by_project.clear()
+
+
+async def stream_events(hub: "EventHub", subscription: Subscription, heartbeat: float = HEARTBEAT_SECONDS):
+    """SSE body for one subscriber; unsubscribes when the client goes away"""
+    try:
+        yield RETRY_FRAME + frame("ready", {"mode": hub.mode})
+        while True:
+            try:
+                data = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                data = KEEPALIVE_FRAME
+            yield data
+    finally:
+        hub.unsubscribe(subscription)
+
+
+hub = EventHub(store)
@@ -0,0 +1,144 @@
+"""Index definitions provisioned when the API starts.
+
+Every collection gets a unique index on its string ``id`` and compound indexes
+matching the filter shapes used by the list endpoints and cascade deletes, so
+none of the hot queries fall back to a collection scan. List filters end in
+``createdAt, _id``, so their pages come back in keyset order without an
+in-memory sort, even for the ``$in`` of both forms of a ref. ``createdAt`` and
+``updatedAt`` indexes, with a sparse one on the ``importedAt`` stamp, let
+delta sync read only what changed, and deletion tombstones expire after
+``TOMBSTONE_TTL_SECONDS``. Tasks and bugs carry the text and term indexes
+behind ``/api/search``, and time buckets are keyed uniquely and ranged by
+day per member, project or sprint.
+"""
+from typing import Dict, List
+
+from pymongo import ASCENDING, TEXT, IndexModel
+
+
+def _unique_id() -> IndexModel:
+    return IndexModel([("id", ASCENDING)], name="id_unique", unique=True)
+
+
+def _page_order() -> IndexModel:
+    """Backs the (createdAt, _id) keyset order used by paginated lists"""
+    return IndexModel([("createdAt", ASCENDING), ("_id", ASCENDING)], name="createdAt_id")
+
+
+def _paged(*fields: str) -> IndexModel:
+    """Backs a list filtered on ``fields`` and read in (createdAt, _id) page order"""
+    keys = [(field, ASCENDING) for field in fields] + [("createdAt", ASCENDING), ("_id", ASCENDING)]
+    return IndexModel(keys, name="_".join(fields) + "_createdAt_id")
+
+
+def _updated_at() -> IndexModel:
+    """With createdAt_id, serves the delta sync query for changes since a token"""
+    return IndexModel([("updatedAt", ASCENDING)], name="updatedAt")
+
+
+def _imported_at() -> IndexModel:
+    """Serves delta sync for imported documents, which keep their own updatedAt"""
+    return IndexModel([("importedAt", ASCENDING)], name="importedAt", sparse=True)
+
+
+def _search() -> List[IndexModel]:
+    """Text index for whole-word search, term indexes for prefix matches"""
+    return [
+        IndexModel(
+            [("title", TEXT), ("description", TEXT)],
+            name="title_description_text",
+            # Title words count five times as much as description words
+            weights={"title": 10, "description": 2},
+        ),
+        IndexModel([("titleTerms", ASCENDING)], name="titleTerms"),
+        IndexModel([("descriptionTerms", ASCENDING)], name="descriptionTerms"),
+    ]
+
+
+# Delta sync clients whose token is older than this re-download everything
+TOMBSTONE_TTL_SECONDS = 30 * 24 * 3600
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "projects": [
+        _unique_id(),
+        _page_order(),
+        _updated_at(),
+        _imported_at(),
+    ],
+    "sprints": [
+        _unique_id(),
+        _page_order(),
+        _updated_at(),
+        _imported_at(),
+        _paged("projectId"),
+    ],
+    "tasks": [
+        _unique_id(),
+        _page_order(),
+        _updated_at(),
+        _imported_at(),
+        _paged("projectId"),
+        _paged("projectId", "sprintId"),
+        _paged("sprintId"),
+        IndexModel([("sprintId", ASCENDING), ("status", ASCENDING)], name="sprintId_status"),
+        IndexModel([("assigneeId", ASCENDING), ("id", ASCENDING)], name="assigneeId_id"),
+        *_search(),
+    ],
+    "bugs": [
+        _unique_id(),
+        _page_order(),
+        _updated_at(),
+        _imported_at(),
+        _paged("projectId"),
+        _paged("projectId", "sprintId"),
+        _paged("sprintId"),
+        _paged("taskId"),
+        IndexModel([("sprintId", ASCENDING), ("status", ASCENDING)], name="sprintId_status"),
+        IndexModel([("assigneeId", ASCENDING), ("id", ASCENDING)], name="assigneeId_id"),
+        *_search(),
+    ],
+    "team": [
+        _unique_id(),
+        _page_order(),
+        _updated_at(),
+        _imported_at(),
+        _paged("projectId"),
+        _paged("projectId", "sprintId"),
+        _paged("sprintId"),
+    ],
+    "time_entries": [
+        _unique_id(),
+        _page_order(),
+        _updated_at(),
+        _imported_at(),
+        _paged("projectId"),
+        _paged("projectId", "sprintId"),
+        _paged("sprintId"),
+        # Each branch of the assignee filter's $or
+        _paged("taskId"),
+        IndexModel([("taskId", ASCENDING), ("isBugEntry", ASCENDING)], name="taskId_isBugEntry"),
+    ],
+    "time_buckets": [
+        # One bucket per key; also serves day ranges across every member
+        IndexModel(
+            [("day", ASCENDING), ("projectId", ASCENDING), ("sprintId", ASCENDING), ("assigneeId", ASCENDING)],
+            name="bucket_key_unique",
+            unique=True,
+        ),
+        IndexModel([("assigneeId", ASCENDING), ("day", ASCENDING)], name="assigneeId_day"),
+        IndexModel([("projectId", ASCENDING), ("day", ASCENDING)], name="projectId_day"),
+        IndexModel([("sprintId", ASCENDING), ("day", ASCENDING)], name="sprintId_day"),
+    ],
+    "tombstones": [
+        IndexModel([("deletedAt", ASCENDING)], name="deletedAt_ttl", expireAfterSeconds=TOMBSTONE_TTL_SECONDS),
+    ],
+}
+
+
+async def ensure_indexes(database) -> Dict[str, List[str]]:
+    """Create any missing indexes and return the index names per collection"""
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        created[collection_name] = await database[collection_name].create_indexes(indexes)
+    return created
@@ -0,0 +1,356 @@
+"""Request and Mongo command instrumentation in Prometheus text format.
+
+``MetricsMiddleware`` records per-route latency histograms, request counts
+by status and the number of requests in flight. ``CommandMetrics`` is a
+pymongo ``CommandListener`` recording per-collection, per-command latency,
+failures and document counts, and ``PoolMetrics`` records how long
+operations wait to check a connection out of the driver's pool. Everything is rendered by ``render()`` in the
+Prometheus text exposition format for ``GET /api/metrics``.
+
+Metrics are kept per process; with several workers, scrape each one or put
+them behind a single-process deployment.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+START_TIME = time.time()
+
+# Scope of the request being handled; Motor copies the context into its
+# worker threads, so command listeners can attribute commands to a route
+current_scope: ContextVar[Optional[Scope]] = ContextVar("current_scope", default=None)
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow scans
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def uptime_seconds() -> float:
+    return time.time() - START_TIME
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # pymongo calls listeners from the driver's worker threads
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join(self.header() + list(self.samples()))
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (non-cumulative), sum, count
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            counts, totals = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0, 0]))
+            index = len(self.buckets)
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = position
+                    break
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, labels: Labels = ()) -> int:
+        entry = self._values.get(labels)
+        return int(entry[1][1]) if entry else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), list(totals))) for labels, (counts, totals) in self._values.items())
+        names = self.labelnames + ("le",)
+        for labels, (counts, (total, count)) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {int(count)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status"),
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"),
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled",
+))
+mongo_command_duration = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command", "collection"),
+))
+mongo_command_failures = registry.register(Counter(
+    "mongo_command_failures_total", "MongoDB commands that failed", ("command", "collection"),
+))
+mongo_documents = registry.register(Counter(
+    "mongo_documents_total", "Documents returned or written by MongoDB commands", ("command", "collection"),
+))
+mongo_pool_wait = registry.register(Histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting to check out a pooled MongoDB connection", ("address",),
+))
+mongo_pool_checkout_failures = registry.register(Counter(
+    "mongo_pool_checkout_failures_total", "Connection check-outs that failed", ("address", "reason"),
+))
+mongo_pool_checked_out = registry.register(Gauge(
+    "mongo_pool_connections_checked_out", "Pooled MongoDB connections currently in use", ("address",),
+))
+uptime = registry.register(Gauge(
+    "process_uptime_seconds", "Seconds since the API process started",
+))
+
+
+def render() -> str:
+    uptime.set(uptime_seconds())
+    return registry.render()
+
+
+def route_label(scope: Scope) -> str:
+    """The matched route template, so /api/tasks/{task_id} is one series"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def current_route() -> Optional[str]:
+    """``METHOD /route/template`` of the request issuing the current call, if any"""
+    scope = current_scope.get()
+    if scope is None:
+        return None
+    return f"{scope['method']} {route_label(scope)}"
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and counts it by route and status"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        token = current_scope.set(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_scope.reset(token)
+            http_in_flight.dec()
+            # The router fills in the matched route while handling the request
+            route = route_label(scope)
+            http_request_duration.observe(elapsed, (scope["method"], route))
+            http_requests.inc((scope["method"], route, str(status)))
+
+
+def _collection(command_name: str, command: dict) -> str:
+    if command_name == "getMore":
+        target = command.get("collection")
+    else:
+        target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+
+def document_count(command_name: str, reply: dict) -> Optional[int]:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") is not None else 0
+    if command_name == "distinct":
+        return len(reply.get("values", []))
+    if command_name in ("insert", "update", "delete", "count"):
+        return reply.get("n")
+    return None
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records latency, failures and document counts for every Mongo command"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = _collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event) -> Tuple[str, str]:
+        with self._lock:
+            collection = self._pending.pop((event.connection_id, event.request_id), "")
+        labels = (event.command_name, collection)
+        mongo_command_duration.observe(event.duration_micros / 1e6, labels)
+        return labels
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        labels = self._finish(event)
+        count = document_count(event.command_name, event.reply)
+        if count:
+            mongo_documents.inc(labels, count)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        mongo_command_failures.inc(self._finish(event))
+
+
+command_metrics = CommandMetrics()
+
+
+def _address(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Records connection pool wait time, check-out failures and connections in use"""
+
+    def __init__(self):
+        # Check-out events are published on the thread doing the check-out
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._local.started = time.perf_counter()
+
+    def _waited(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        address = _address(event.address)
+        mongo_pool_wait.observe(self._waited(), (address,))
+        mongo_pool_checked_out.inc((address,))
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        address = _address(event.address)
+        mongo_pool_wait.observe(self._waited(), (address,))
+        mongo_pool_checkout_failures.inc((address, str(event.reason)))
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        mongo_pool_checked_out.dec((_address(event.address),))
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+
+pool_metrics = PoolMetrics()
@@ -0,0 +1,156 @@
+"""Request and response schemas for the tracker entities.
+
+The same models validate request bodies and describe responses. Writes are
+validated in full; reads are trusted rather than re-validated: detail
+handlers pass the stored document to ``document_response``, which drops
+fields the model does not declare, and list endpoints project the model's
+fields in Mongo and encode the raw documents without touching Pydantic at
+all.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, ConfigDict, Field, create_model, model_validator
+
+# Documents created here carry uuid strings, while records created offline
+# by the frontend carry Dexie's auto-increment integers
+Ref = Union[int, str]
+
+
+def ref_values(value: Ref) -> List[Any]:
+    """Values a Ref given as a query parameter may be stored as"""
+    value = str(value)
+    return [value, int(value)] if value.isdigit() else [value]
+
+# Assigned by the server, never taken from a request body
+SERVER_FIELDS = ("id", "createdAt", "updatedAt")
+
+
+class Document(BaseModel):
+    # Unknown fields are dropped rather than stored
+    model_config = ConfigDict(extra="ignore")
+
+
+class Project(Document):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    status: str
+    priority: str
+    startDate: datetime
+    endDate: datetime
+    createdAt: datetime = Field(default_factory=datetime.now)
+    updatedAt: Optional[datetime] = None
+
+
+class Sprint(Document):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    projectId: Ref
+    name: str
+    startDate: datetime
+    endDate: datetime
+    status: str
+    committedPoints: int = 0
+    # Derived by the server from the status and the rollup's done hours
+    acceptedPoints: int = 0
+    addedPoints: int = 0
+    descopedPoints: int = 0
+    # Maintained by sprint_rollups; read-only for clients
+    rollup: Optional[Dict[str, Any]] = None
+    createdAt: datetime = Field(default_factory=datetime.now)
+    updatedAt: Optional[datetime] = None
+
+
+class Task(Document):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    projectId: Ref
+    sprintId: Optional[Ref] = None
+    title: str
+    description: Optional[str] = None
+    status: str
+    priority: str
+    assigneeId: Optional[Ref] = None
+    assignee: Optional[str] = None
+    estimatedHours: float = 0
+    actualHours: float = 0
+    createdAt: datetime = Field(default_factory=datetime.now)
+    updatedAt: Optional[datetime] = None
+
+
+class Bug(Document):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    taskId: Optional[Ref] = None
+    projectId: Ref
+    sprintId: Optional[Ref] = None
+    title: str
+    description: Optional[str] = None
+    status: str
+    priority: str
+    severity: str
+    assigneeId: Optional[Ref] = None
+    assignee: Optional[str] = None
+    estimatedHours: float = 0
+    actualHours: float = 0
+    createdAt: datetime = Field(default_factory=datetime.now)
+    updatedAt: Optional[datetime] = None
+
+
+class TeamMember(Document):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    role: str
+    capacity: int
+    avatar: Optional[str] = None
+    projectId: Optional[Ref] = None
+    sprintId: Optional[Ref] = None
+    createdAt: datetime = Field(default_factory=datetime.now)
+    updatedAt: Optional[datetime] = None
+
+
+class TimeEntry(Document):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    taskId: Ref
+    projectId: Ref
+    sprintId: Optional[Ref] = None
+    isTaskEntry: bool = True
+    isBugEntry: bool = False
+    date: str
+    hours: float
+    description: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.now)
+
+
+def partial_model(
+    model: Type[Document], exclude: Tuple[str, ...] = SERVER_FIELDS, derived: Tuple[str, ...] = ()
+) -> Type[Document]:
+    """Variant of ``model`` for partial updates: fields may be omitted, but null only where the model allows it.
+
+    ``derived`` fields are computed by the server from others; unlike the
+    excluded ones, which are silently dropped, sending them is an error.
+    """
+    fields = {
+        name: (field.annotation, None)
+        for name, field in model.model_fields.items()
+        if name not in exclude and name not in derived
+    }
+
+    def reject_derived(cls, data: Any) -> Any:
+        sent = [name for name in derived if isinstance(data, dict) and name in data]
+        if sent:
+            raise ValueError(f"{', '.join(sent)} is derived by the server and cannot be set")
+        return data
+
+    validators = {"reject_derived": model_validator(mode="before")(reject_derived)} if derived else {}
+    return create_model(f"{model.__name__}Update", __base__=Document, __validators__=validators, **fields)
+
+
+ProjectUpdate = partial_model(Project)
+SprintUpdate = partial_model(Sprint, SERVER_FIELDS + ("rollup",), derived=("acceptedPoints",))
+TaskUpdate = partial_model(Task)
+BugUpdate = partial_model(Bug)
+TeamMemberUpdate = partial_model(TeamMember)
+
+
+def projection(model: Type[Document]) -> Dict[str, int]:
+    """Mongo projection returning exactly the model's fields"""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
@@ -0,0 +1,138 @@
+"""Keyset pagination and field projection for the list endpoints.
+
+Pages are ordered by ``(createdAt, _id)`` and continued with an opaque cursor
+that encodes the sort key of the last document returned, so each page is a
+bounded index range scan no matter how deep the client has paged.
+"""
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from bson.decimal128 import Decimal128
+from bson.json_util import CANONICAL_JSON_OPTIONS
+from bson.objectid import ObjectId
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Sort order shared by every paginated list
+PAGE_SORT = [("createdAt", 1), ("_id", 1)]
+
+# Always returned so clients can address and page through projected documents
+ALWAYS_PROJECTED = ("id", "createdAt")
+
+# $type aliases in the order Mongo sorts their values, after null and missing.
+# createdAt is normally a date, but imported or offline records may carry
+# epoch numbers or unparseable strings, which sort before every date. Cursors
+# on a createdAt of any other type are rejected rather than guessed at.
+SORT_TYPES = ("number", "string", "object", "array", "binData", "objectId", "bool", "date")
+
+CursorKey = Tuple[Any, ObjectId]
+
+
+def sort_type(value: Any) -> str:
+    """The SORT_TYPES entry a non-null createdAt value sorts among"""
+    # bool before int, which it subclasses
+    for types, name in (
+        (bool, "bool"), ((int, float, Decimal128), "number"), (str, "string"), (dict, "object"),
+        ((list, tuple), "array"), (bytes, "binData"), (ObjectId, "objectId"), (datetime, "date"),
+    ):
+        if isinstance(value, types):
+            return name
+    raise ValueError(f"Unsortable createdAt: {value!r}")
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Build the cursor that resumes after ``doc``"""
+    # Extended JSON keeps the createdAt value's BSON type, so its sort position survives
+    payload = {"c": doc.get("createdAt"), "i": doc["_id"]}
+    raw = json_util.dumps(payload, json_options=CANONICAL_JSON_OPTIONS).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """Parse a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()), json_options=CANONICAL_JSON_OPTIONS)
+        created_at, object_id = payload["c"], payload["i"]
+        if created_at is not None:
+            sort_type(created_at)
+        if not isinstance(object_id, ObjectId):
+            raise TypeError(object_id)
+        return created_at, object_id
+    except Exception as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+
+
+def keyset_filter(after: CursorKey) -> Dict[str, Any]:
+    """Filter matching documents that sort strictly after ``after``"""
+    created_at, object_id = after
+    if created_at is None:
+        # Documents without createdAt sort first; page through them by _id
+        return {"$or": [
+            {"createdAt": {"$ne": None}},
+            {"createdAt": None, "_id": {"$gt": object_id}},
+        ]}
+    after_key = [
+        {"createdAt": {"$gt": created_at}},
+        {"createdAt": created_at, "_id": {"$gt": object_id}},
+    ]
+    # $gt only compares values of the same type, so later types are matched by $type
+    later = SORT_TYPES[SORT_TYPES.index(sort_type(created_at)) + 1:]
+    if later:
+        after_key.append({"createdAt": {"$type": list(later)}})
+    return {"$or": after_key}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    """Turn a comma separated ``fields=`` parameter into a Mongo projection"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if not names:
+        return None
+    projection = {name: 1 for name in names}
+    for name in ALWAYS_PROJECTED:
+        projection[name] = 1
+    return projection
+
+
+class PageParams:
+    """Query parameters shared by every list endpoint.
+
+    Without ``limit`` or ``after`` the endpoint returns the full list, as it
+    always has; passing either switches it to keyset pagination.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.fields = fields
+        self.projection = parse_fields(fields)
+        try:
+            self.after = decode_cursor(after) if after else None
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.after is not None
+
+    @property
+    def page_size(self) -> int:
+        return self.limit or DEFAULT_PAGE_SIZE
+
+
+def split_page(docs: List[Dict[str, Any]], page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead document fetched past the page and build the next cursor"""
+    if len(docs) <= page_size:
+        return docs, None
+    docs = docs[:page_size]
+    return docs, encode_cursor(docs[-1])
@@ -0,0 +1,235 @@
+"""Full-text search over task and bug titles and descriptions.
+
+``GET /api/search?q=`` is backed by two kinds of index on each collection:
+
+* a weighted text index on ``title`` and ``description``. Complete words in
+  the query are matched through it, with stemming, and ranked by Mongo's
+  ``textScore``;
+* multikey indexes on ``titleTerms`` and ``descriptionTerms``, the lowercased
+  words of each field, stored with the document whenever the field is
+  written. The text index cannot match partial words, so the word still
+  being typed (the last one, unless the query ends in a space) is matched
+  as an anchored prefix over these arrays, which is an index range scan.
+
+Each collection is searched with one aggregation that ranks the matches and
+counts them by ``projectId`` / ``sprintId`` / ``status`` in the same pass. The
+two result lists are then merged by score. Queries that are only a prefix
+have no text score to rank by, so they score title matches above description
+matches.
+
+Every match is scored, but sorting keeps only the best ``MAX_CANDIDATES``
+per collection in memory (Mongo coalesces the ``$sort`` and ``$limit`` into a
+top-k sort), and only those are counted and faceted. This bounds memory and
+faceting work for words found in most documents without dropping better
+hits. Such responses are flagged ``truncated``, and their totals and facets
+are lower bounds.
+"""
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pymongo import UpdateOne
+
+from database import Repository, store
+from models import Bug, Task, projection, ref_values
+
+# Searched collections by the result type clients see
+SEARCHABLE: Dict[str, Tuple[Repository, Type[BaseModel]]] = {
+    "task": (store.tasks, Task),
+    "bug": (store.bugs, Bug),
+}
+
+TEXT_FIELDS = ("title", "description")
+
+# Stored per text field; internal, never returned to clients
+SEARCH_FIELDS = tuple(f"{field}Terms" for field in TEXT_FIELDS)
+
+# Long descriptions keep their first distinct words only
+MAX_TERMS = 256
+
+# Shorter prefixes match too much of the corpus to be useful
+MIN_PREFIX = 2
+
+# Matches ranked per collection before giving up on an exact total
+MAX_CANDIDATES = 5000
+
+TITLE_PREFIX_SCORE = 2.0
+DESCRIPTION_PREFIX_SCORE = 1.0
+
+FACETS = ("projectId", "sprintId", "status")
+
+MAX_LIMIT = 100
+# Deeper pages cost a larger sort on every request; refine the query instead
+MAX_OFFSET = 1000
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _WORD.findall(text.lower()) if text else []
+
+
+def search_terms(text: Optional[str]) -> List[str]:
+    """Distinct words of ``text`` in first-seen order"""
+    return list(dict.fromkeys(tokenize(text)))[:MAX_TERMS]
+
+
+def search_fields(doc: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Term arrays for the text fields present in ``doc``, to write alongside them"""
+    return {f"{field}Terms": search_terms(doc[field]) for field in TEXT_FIELDS if field in doc}
+
+
+def parse_query(q: str) -> Tuple[List[str], Optional[str]]:
+    """Split a query into complete words and the trailing prefix being typed"""
+    words = tokenize(q)
+    prefix = None
+    if words and not q[-1:].isspace():
+        prefix = words.pop()
+        if len(prefix) < MIN_PREFIX:
+            # Too short to narrow anything; treat it as a word instead
+            words.append(prefix)
+            prefix = None
+    return words, prefix
+
+
+def build_match(words: List[str], prefix: Optional[str], filters: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    match: Dict[str, Any] = {}
+    if words:
+        match["$text"] = {"$search": " ".join(words)}
+    if prefix:
+        pattern = {"$regex": "^" + re.escape(prefix)}
+        match["$or"] = [{"titleTerms": pattern}, {"descriptionTerms": pattern}]
+    for field, value in filters.items():
+        if value is None:
+            continue
+        match[field] = value if field == "status" else {"$in": ref_values(value)}
+    return match
+
+
+def _score(words: List[str], prefix: Optional[str]) -> Any:
+    score: Any = {"$meta": "textScore"} if words else 0
+    if prefix:
+        in_title = {"$anyElementTrue": [{"$map": {
+            "input": {"$ifNull": ["$titleTerms", []]},
+            "in": {"$eq": [{"$substrCP": ["$$this", 0, len(prefix)]}, prefix]},
+        }}]}
+        score = {"$add": [score, {"$cond": [in_title, TITLE_PREFIX_SCORE, DESCRIPTION_PREFIX_SCORE]}]}
+    return score
+
+
+def build_pipeline(
+    words: List[str],
+    prefix: Optional[str],
+    filters: Dict[str, Optional[str]],
+    model: Type[BaseModel],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """Top ``limit`` matches of one collection, with match counts and facets"""
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": build_match(words, prefix, filters)},
+        {"$addFields": {"_score": _score(words, prefix)}},
+        # Ranked before capping, so the cap drops the worst matches. One past
+        # the cap, so a capped result can be told from an exact one
+        {"$sort": {"_score": -1, "_id": 1}},
+        {"$limit": MAX_CANDIDATES + 1},
+    ]
+    facets: Dict[str, List[Dict[str, Any]]] = {
+        # $facet keeps the ranked order
+        "hits": [
+            {"$limit": limit},
+            {"$project": {**projection(model), "_score": 1}},
+        ],
+        "total": [{"$count": "count"}],
+    }
+    for field in FACETS:
+        facets[field] = [{"$sortByCount": f"${field}"}]
+    pipeline.append({"$facet": facets})
+    return pipeline
+
+
+def _merge_counts(target: Dict[Any, int], counts: List[Dict[str, Any]]) -> None:
+    for count in counts:
+        target[count["_id"]] = target.get(count["_id"], 0) + count["count"]
+
+
+def _facet(counts: Dict[Any, int]) -> List[Dict[str, Any]]:
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+    return [{"value": value, "count": count} for value, count in ordered]
+
+
+async def _search_one(
+    kind: str,
+    words: List[str],
+    prefix: Optional[str],
+    filters: Dict[str, Optional[str]],
+    limit: int,
+) -> Tuple[str, Dict[str, Any]]:
+    repository, model = SEARCHABLE[kind]
+    [result] = await repository.aggregate(build_pipeline(words, prefix, filters, model, limit))
+    return kind, result
+
+
+async def search(
+    q: str,
+    types: Optional[List[str]] = None,
+    project_id: Optional[str] = None,
+    sprint_id: Optional[str] = None,
+    status: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 20,
+) -> Dict[str, Any]:
+    """Ranked page of matching tasks and bugs, with facet counts over every match"""
+    words, prefix = parse_query(q)
+    kinds = types or list(SEARCHABLE)
+    response: Dict[str, Any] = {"query": q, "offset": offset, "limit": limit, "total": 0, "truncated": False}
+    facets: Dict[str, Dict[Any, int]] = {field: {} for field in ("type", *FACETS)}
+    if not words and not prefix:
+        response.update(results=[], facets={field: [] for field in facets})
+        return response
+
+    filters = {"projectId": project_id, "sprintId": sprint_id, "status": status}
+    # Each collection's top offset + limit covers the merged page
+    results = await asyncio.gather(*(
+        _search_one(kind, words, prefix, filters, offset + limit) for kind in kinds
+    ))
+
+    hits = []
+    for kind, result in results:
+        total = result["total"][0]["count"] if result["total"] else 0
+        if total > MAX_CANDIDATES:
+            response["truncated"] = True
+            total = MAX_CANDIDATES
+        response["total"] += total
+        if total:
+            facets["type"][kind] = total
+        for field in FACETS:
+            _merge_counts(facets[field], result[field])
+        for doc in result["hits"]:
+            score = doc.pop("_score")
+            hits.append({"type": kind, "score": round(score, 4), "document": doc})
+
+    hits.sort(key=lambda hit: -hit["score"])
+    response["results"] = hits[offset:offset + limit]
+    response["facets"] = {field: _facet(counts) for field, counts in facets.items()}
+    return response
+
+
+async def reindex_search_terms(batch_size: int = 1000) -> Dict[str, int]:
+    """Backfill term arrays on documents written before search existed"""
+    updated = {}
+    for kind, (repository, _) in SEARCHABLE.items():
+        missing = {"$or": [{field: {"$exists": False}} for field in SEARCH_FIELDS]}
+        requests = []
+        updated[kind] = 0
+        async for doc in repository.iterate(missing, {"_id": 1, **{field: 1 for field in TEXT_FIELDS}}):
+            fields = search_fields({field: doc.get(field) for field in TEXT_FIELDS})
+            requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+            if len(requests) >= batch_size:
+                await repository.bulk_write(requests, ordered=False)
+                updated[kind] += len(requests)
+                requests = []
+        if requests:
+            await repository.bulk_write(requests, ordered=False)
+            updated[kind] += len(requests)
+    return updated
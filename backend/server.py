@@ -1,15 +1,38 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo import MongoClient
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from bson.objectid import ObjectId
-from pydantic import BaseModel, Field
+import asyncio
+import json
 import os
 import uuid
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Union
 
+from batch import Batch, BatchRequest
+from compression import CompressionMiddleware, parse_encodings
+from conditional import Conditional, last_modified
+from database import client, slow_query_log, store
+from events import COLLECTIONS as EVENT_COLLECTIONS, hub, stream_events
+from indexes import ensure_indexes
+from metrics import MetricsMiddleware, render as render_metrics, uptime_seconds
+from models import (
+    Bug, BugUpdate, Project, ProjectUpdate, Sprint, SprintUpdate, Task, TaskUpdate, TeamMember,
+    TeamMemberUpdate, TimeEntry, projection, ref_values,
+)
+from pagination import PAGE_SORT, PageParams, keyset_filter, split_page
+from search import (
+    MAX_LIMIT as SEARCH_MAX_LIMIT, MAX_OFFSET as SEARCH_MAX_OFFSET, SEARCHABLE, reindex_search_terms, search, search_fields,
+)
+from serialization import FastJSONResponse
+from sprint_metrics import get_sprint_metrics, hours_to_points
+from sprint_rollups import reconcile_sprint_rollups, record_done_hours, record_item_change, sprint_update_operation
+from sync import decode_token, sync_changes
+from time_buckets import delete_entries, parse_day, reconcile_time_buckets, record_entries, timesheet
+from transfer import EXPORT_FORMATS, Importer, resolve_collections, stream_export
+
 # Create FastAPI app
-app = FastAPI(title="Agile Tracker API")
+app = FastAPI(title="Agile Tracker API", default_response_class=FastJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -18,92 +41,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
+)
+
+# Compress large responses; COMPRESSION_ENCODINGS=none turns it off
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("COMPRESSION_MINIMUM_SIZE", "1024")),
+    gzip_level=int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4")),
+    encodings=parse_encodings(os.environ.get("COMPRESSION_ENCODINGS")),
 )
 
-# Configure MongoDB client
-mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-client = MongoClient(mongo_url)
-db = client.agile_tracker
-
-# Models
-class Project(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    status: str
-    priority: str
-    startDate: datetime
-    endDate: datetime
-    createdAt: datetime = Field(default_factory=datetime.now)
-    updatedAt: Optional[datetime] = None
-
-class Sprint(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    projectId: int
-    name: str
-    startDate: datetime
-    endDate: datetime
-    status: str
-    committedPoints: int = 0
-    acceptedPoints: int = 0
-    addedPoints: int = 0
-    descopedPoints: int = 0
-    createdAt: datetime = Field(default_factory=datetime.now)
-    updatedAt: Optional[datetime] = None
-
-class Task(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    projectId: int
-    sprintId: Optional[int] = None
-    title: str
-    description: Optional[str] = None
-    status: str
-    priority: str
-    assigneeId: Optional[str] = None
-    assignee: Optional[str] = None
-    estimatedHours: float = 0
-    actualHours: float = 0
-    createdAt: datetime = Field(default_factory=datetime.now)
-    updatedAt: Optional[datetime] = None
-
-class Bug(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    taskId: Optional[int] = None
-    projectId: int
-    sprintId: Optional[int] = None
-    title: str
-    description: Optional[str] = None
-    status: str
-    priority: str
-    severity: str
-    assigneeId: Optional[str] = None
-    assignee: Optional[str] = None
-    estimatedHours: float = 0
-    actualHours: float = 0
-    createdAt: datetime = Field(default_factory=datetime.now)
-    updatedAt: Optional[datetime] = None
-
-class TeamMember(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    role: str
-    capacity: int
-    avatar: Optional[str] = None
-    projectId: Optional[int] = None
-    sprintId: Optional[int] = None
-    createdAt: datetime = Field(default_factory=datetime.now)
-    updatedAt: Optional[datetime] = None
-
-class TimeEntry(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    taskId: int
-    projectId: int
-    sprintId: Optional[int] = None
-    isTaskEntry: bool = True
-    isBugEntry: bool = False
-    date: str
-    hours: float
-    description: Optional[str] = None
-    createdAt: datetime = Field(default_factory=datetime.now)
+# Outermost, so recorded latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
 
 # Root endpoint
 @app.get("/api")
@@ -118,382 +69,499 @@ async def health_check():
 # Status check endpoint
 @app.get("/api/status")
 async def status():
+    uptime = int(uptime_seconds())
+    days, remainder = divmod(uptime, 86400)
     return {
         "status": "operational",
         "version": "1.0.0",
-        "uptime": "N/A",
+        "uptime": f"{days}d {remainder // 3600:02d}:{remainder % 3600 // 60:02d}:{remainder % 60:02d}",
+        "uptimeSeconds": uptime,
         "timestamp": datetime.now().isoformat()
     }
 
+# Prometheus metrics endpoint
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Slow query log
+@app.get("/api/admin/slow-queries")
+async def get_slow_queries(limit: int = 50):
+    return {
+        "thresholdMs": slow_query_log.threshold_ms,
+        "enabled": slow_query_log.enabled,
+        "entries": slow_query_log.recent(max(limit, 0)),
+    }
+
+@app.delete("/api/admin/slow-queries")
+async def clear_slow_queries():
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
+
 # Projects endpoints
-@app.get("/api/projects")
-async def get_projects():
-    projects = list(db.projects.find())
-    return [format_document(project) for project in projects]
-
-@app.get("/api/projects/{project_id}")
-async def get_project(project_id: str):
-    project = db.projects.find_one({"id": project_id})
+@app.get("/api/projects", response_model=List[Project], dependencies=[Depends(Conditional(store.projects))])
+async def get_projects(response: Response, page: PageParams = Depends()):
+    return await list_documents(store.projects, {}, page, response, Project)
+
+@app.get("/api/projects/{project_id}", response_model=Project, dependencies=[Depends(Conditional(store.projects))])
+async def get_project(project_id: str, response: Response):
+    project = await store.projects.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return format_document(project)
+    set_last_modified(response, project)
+    return document_response(project, Project, response)
 
-@app.post("/api/projects", status_code=201)
-async def create_project(project: dict):
+@app.post("/api/projects", response_model=Project, status_code=201)
+async def create_project(project: Project):
+    project = project.model_dump()
     project["id"] = str(uuid.uuid4())
     project["createdAt"] = datetime.now()
-    result = db.projects.insert_one(project)
-    return format_document(project)
+    created_project = await store.projects.create(project)
+    return format_document(created_project)
 
-@app.put("/api/projects/{project_id}")
-async def update_project(project_id: str, project_update: dict):
-    project = db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    update_data = {k: v for k, v in project_update.items() if k != "id"}
+@app.put("/api/projects/{project_id}", response_model=Project)
+async def update_project(project_id: str, project_update: ProjectUpdate):
+    update_data = project_update.model_dump(exclude_unset=True)
     update_data["updatedAt"] = datetime.now()
     
-    db.projects.update_one({"id": project_id}, {"$set": update_data})
-    updated_project = db.projects.find_one({"id": project_id})
+    updated_project = await store.projects.update(project_id, update_data)
+    if not updated_project:
+        raise HTTPException(status_code=404, detail="Project not found")
     return format_document(updated_project)
 
 @app.delete("/api/projects/{project_id}")
 async def delete_project(project_id: str):
-    project = db.projects.find_one({"id": project_id})
+    project = await store.projects.delete(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.projects.delete_one({"id": project_id})
     return {"message": "Project deleted successfully"}
 
 # Sprints endpoints
-@app.get("/api/sprints")
-async def get_sprints(project_id: Optional[int] = None):
+@app.get("/api/sprints", response_model=List[Sprint], dependencies=[Depends(Conditional(store.sprints))])
+async def get_sprints(response: Response, project_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if project_id:
-        query["projectId"] = project_id
-    sprints = list(db.sprints.find(query))
-    return [format_document(sprint) for sprint in sprints]
+        query["projectId"] = {"$in": ref_values(project_id)}
+    return await list_documents(store.sprints, query, page, response, Sprint)
 
-@app.post("/api/sprints", status_code=201)
-async def create_sprint(sprint: dict):
+@app.post("/api/sprints", response_model=Sprint, status_code=201)
+async def create_sprint(sprint: Sprint):
+    sprint = sprint.model_dump(exclude={"rollup"})
     sprint["id"] = str(uuid.uuid4())
     sprint["createdAt"] = datetime.now()
-    
-    # Convert dates to datetime objects if they are strings
-    if isinstance(sprint.get("startDate"), str):
-        sprint["startDate"] = datetime.fromisoformat(sprint["startDate"].replace("Z", "+00:00"))
-    if isinstance(sprint.get("endDate"), str):
-        sprint["endDate"] = datetime.fromisoformat(sprint["endDate"].replace("Z", "+00:00"))
-    
-    result = db.sprints.insert_one(sprint)
-    created_sprint = db.sprints.find_one({"_id": result.inserted_id})
+    created_sprint = await store.sprints.create(sprint)
     return format_document(created_sprint)
 
-@app.get("/api/sprints/{sprint_id}")
-async def get_sprint(sprint_id: str):
-    sprint = db.sprints.find_one({"id": sprint_id})
-    if not sprint:
-        raise HTTPException(status_code=404, detail="Sprint not found")
-    return format_document(sprint)
+@app.get("/api/sprints/metrics", dependencies=[Depends(Conditional(store.sprints, store.tasks, store.bugs))])
+async def sprint_metrics(project_id: Optional[str] = None):
+    return await get_sprint_metrics(project_id)
 
-@app.put("/api/sprints/{sprint_id}")
-async def update_sprint(sprint_id: str, update_data: dict):
-    sprint = db.sprints.find_one({"id": sprint_id})
+@app.post("/api/sprints/rollups/reconcile")
+async def reconcile_rollups(dry_run: bool = False):
+    return await reconcile_sprint_rollups(dry_run=dry_run)
+
+@app.get("/api/sprints/{sprint_id}", response_model=Sprint, dependencies=[Depends(Conditional(store.sprints))])
+async def get_sprint(sprint_id: str, response: Response):
+    sprint = await store.sprints.get(sprint_id)
     if not sprint:
         raise HTTPException(status_code=404, detail="Sprint not found")
-    
+    set_last_modified(response, sprint)
+    return document_response(sprint, Sprint, response)
+
+@app.put("/api/sprints/{sprint_id}", response_model=Sprint)
+async def update_sprint(sprint_id: str, sprint_update: SprintUpdate):
+    update_data = sprint_update.model_dump(exclude_unset=True)
     update_data["updatedAt"] = datetime.now()
-    
-    # Convert dates to datetime objects if they are strings
-    if isinstance(update_data.get("startDate"), str):
-        update_data["startDate"] = datetime.fromisoformat(update_data["startDate"].replace("Z", "+00:00"))
-    if isinstance(update_data.get("endDate"), str):
-        update_data["endDate"] = datetime.fromisoformat(update_data["endDate"].replace("Z", "+00:00"))
-    
-    db.sprints.update_one({"id": sprint_id}, {"$set": update_data})
-    updated_sprint = db.sprints.find_one({"id": sprint_id})
+    updated_sprint = await store.sprints.find_one_and_update({"id": sprint_id}, sprint_update_operation(update_data))
+    if not updated_sprint:
+        raise HTTPException(status_code=404, detail="Sprint not found")
     return format_document(updated_sprint)
 
 @app.delete("/api/sprints/{sprint_id}")
 async def delete_sprint(sprint_id: str):
-    sprint = db.sprints.find_one({"id": sprint_id})
-    if not sprint:
-        raise HTTPException(status_code=404, detail="Sprint not found")
-    
-    # Check for related tasks and bugs
-    tasks = list(db.tasks.find({"sprintId": sprint_id}))
-    bugs = list(db.bugs.find({"sprintId": sprint_id}))
-    
-    # Update tasks and bugs to remove the sprint association
-    if tasks:
-        db.tasks.update_many({"sprintId": sprint_id}, {"$set": {"sprintId": None}})
-    
-    if bugs:
-        db.bugs.update_many({"sprintId": sprint_id}, {"$set": {"sprintId": None}})
+    async with store.transaction() as session:
+        sprint = await store.sprints.delete(sprint_id, session=session)
+        if not sprint:
+            raise HTTPException(status_code=404, detail="Sprint not found")
+        
+        # Update tasks and bugs to remove the sprint association
+        unlink = {"$set": {"sprintId": None, "updatedAt": datetime.now()}}
+        tasks_updated = await store.tasks.update_many({"sprintId": sprint_id}, unlink, session=session)
+        bugs_updated = await store.bugs.update_many({"sprintId": sprint_id}, unlink, session=session)
     
-    # Delete the sprint
-    db.sprints.delete_one({"id": sprint_id})
-    return {"message": "Sprint deleted successfully"}
+    return {
+        "message": "Sprint deleted successfully",
+        "affected": {"tasks": tasks_updated, "bugs": bugs_updated}
+    }
 
 # Tasks endpoints
-@app.get("/api/tasks")
-async def get_tasks(project_id: Optional[int] = None, sprint_id: Optional[int] = None):
+@app.get("/api/tasks", response_model=List[Task], dependencies=[Depends(Conditional(store.tasks))])
+async def get_tasks(response: Response, project_id: Optional[str] = None, sprint_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if project_id:
-        query["projectId"] = project_id
+        query["projectId"] = {"$in": ref_values(project_id)}
     if sprint_id:
-        query["sprintId"] = sprint_id
-    tasks = list(db.tasks.find(query))
-    return [format_document(task) for task in tasks]
+        query["sprintId"] = {"$in": ref_values(sprint_id)}
+    return await list_documents(store.tasks, query, page, response, Task)
 
-@app.post("/api/tasks", status_code=201)
-async def create_task(task: dict):
+@app.post("/api/tasks", response_model=Task, status_code=201)
+async def create_task(task: Task):
+    task = task.model_dump()
     task["id"] = str(uuid.uuid4())
     task["createdAt"] = datetime.now()
-    result = db.tasks.insert_one(task)
-    created_task = db.tasks.find_one({"_id": result.inserted_id})
+    task.update(search_fields(task))
+    created_task = await store.tasks.create(task)
+    await record_item_change(None, created_task)
     return format_document(created_task)
 
-@app.get("/api/tasks/{task_id}")
-async def get_task(task_id: str):
-    task = db.tasks.find_one({"id": task_id})
+@app.get("/api/tasks/{task_id}", response_model=Task, dependencies=[Depends(Conditional(store.tasks))])
+async def get_task(task_id: str, response: Response):
+    task = await store.tasks.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return format_document(task)
+    set_last_modified(response, task)
+    return document_response(task, Task, response)
 
-@app.put("/api/tasks/{task_id}")
-async def update_task(task_id: str, update_data: dict):
-    task = db.tasks.find_one({"id": task_id})
+@app.put("/api/tasks/{task_id}", response_model=Task)
+async def update_task(task_id: str, task_update: TaskUpdate):
+    update_data = task_update.model_dump(exclude_unset=True)
+    update_data["updatedAt"] = datetime.now()
+    update_data.update(search_fields(update_data))
+    # The pre-update document feeds the sprint rollup; the response is built from it locally
+    task = await store.tasks.update(task_id, update_data, return_after=False)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    update_data["updatedAt"] = datetime.now()
-    db.tasks.update_one({"id": task_id}, {"$set": update_data})
-    updated_task = db.tasks.find_one({"id": task_id})
+    updated_task = {**task, **update_data}
+    await record_item_change(task, updated_task)
     return format_document(updated_task)
 
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str):
-    task = db.tasks.find_one({"id": task_id})
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    # Check for related bugs and time entries
-    bugs = list(db.bugs.find({"taskId": task_id}))
-    time_entries = list(db.time_entries.find({"taskId": task_id}))
-    
-    # Update bugs to remove the task association
-    if bugs:
-        db.bugs.update_many({"taskId": task_id}, {"$set": {"taskId": None}})
-    
-    # Delete related time entries
-    if time_entries:
-        db.time_entries.delete_many({"taskId": task_id})
+    async with store.transaction() as session:
+        task = await store.tasks.delete(task_id, session=session)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        
+        # Update bugs to remove the task association
+        unlink = {"$set": {"taskId": None, "updatedAt": datetime.now()}}
+        bugs_updated = await store.bugs.update_many({"taskId": task_id}, unlink, session=session)
+        
+        # Delete related time entries
+        entries_deleted = await delete_entries({"taskId": task_id}, session=session)
     
-    # Delete the task
-    db.tasks.delete_one({"id": task_id})
-    return {"message": "Task deleted successfully"}
+    await record_item_change(task, None)
+    return {
+        "message": "Task deleted successfully",
+        "affected": {"bugs": bugs_updated, "timeEntries": entries_deleted}
+    }
 
 # Bugs endpoints
-@app.get("/api/bugs")
-async def get_bugs(project_id: Optional[int] = None, sprint_id: Optional[int] = None, task_id: Optional[int] = None):
+@app.get("/api/bugs", response_model=List[Bug], dependencies=[Depends(Conditional(store.bugs))])
+async def get_bugs(response: Response, project_id: Optional[str] = None, sprint_id: Optional[str] = None, task_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if project_id:
-        query["projectId"] = project_id
+        query["projectId"] = {"$in": ref_values(project_id)}
     if sprint_id:
-        query["sprintId"] = sprint_id
+        query["sprintId"] = {"$in": ref_values(sprint_id)}
     if task_id:
-        query["taskId"] = task_id
-    bugs = list(db.bugs.find(query))
-    return [format_document(bug) for bug in bugs]
+        query["taskId"] = {"$in": ref_values(task_id)}
+    return await list_documents(store.bugs, query, page, response, Bug)
 
-@app.post("/api/bugs", status_code=201)
-async def create_bug(bug: dict):
+@app.post("/api/bugs", response_model=Bug, status_code=201)
+async def create_bug(bug: Bug):
+    bug = bug.model_dump()
     bug["id"] = str(uuid.uuid4())
     bug["createdAt"] = datetime.now()
-    result = db.bugs.insert_one(bug)
-    created_bug = db.bugs.find_one({"_id": result.inserted_id})
+    bug.update(search_fields(bug))
+    created_bug = await store.bugs.create(bug)
+    await record_item_change(None, created_bug)
     return format_document(created_bug)
 
-@app.get("/api/bugs/{bug_id}")
-async def get_bug(bug_id: str):
-    bug = db.bugs.find_one({"id": bug_id})
+@app.get("/api/bugs/{bug_id}", response_model=Bug, dependencies=[Depends(Conditional(store.bugs))])
+async def get_bug(bug_id: str, response: Response):
+    bug = await store.bugs.get(bug_id)
     if not bug:
         raise HTTPException(status_code=404, detail="Bug not found")
-    return format_document(bug)
+    set_last_modified(response, bug)
+    return document_response(bug, Bug, response)
 
-@app.put("/api/bugs/{bug_id}")
-async def update_bug(bug_id: str, update_data: dict):
-    bug = db.bugs.find_one({"id": bug_id})
+@app.put("/api/bugs/{bug_id}", response_model=Bug)
+async def update_bug(bug_id: str, bug_update: BugUpdate):
+    update_data = bug_update.model_dump(exclude_unset=True)
+    update_data["updatedAt"] = datetime.now()
+    update_data.update(search_fields(update_data))
+    # The pre-update document feeds the sprint rollup; the response is built from it locally
+    bug = await store.bugs.update(bug_id, update_data, return_after=False)
     if not bug:
         raise HTTPException(status_code=404, detail="Bug not found")
-    
-    update_data["updatedAt"] = datetime.now()
-    db.bugs.update_one({"id": bug_id}, {"$set": update_data})
-    updated_bug = db.bugs.find_one({"id": bug_id})
+    updated_bug = {**bug, **update_data}
+    await record_item_change(bug, updated_bug)
     return format_document(updated_bug)
 
 @app.delete("/api/bugs/{bug_id}")
 async def delete_bug(bug_id: str):
-    bug = db.bugs.find_one({"id": bug_id})
-    if not bug:
-        raise HTTPException(status_code=404, detail="Bug not found")
-    
-    # Delete related time entries
-    time_entries = list(db.time_entries.find({"taskId": bug_id, "isBugEntry": True}))
-    if time_entries:
-        db.time_entries.delete_many({"taskId": bug_id, "isBugEntry": True})
+    async with store.transaction() as session:
+        bug = await store.bugs.delete(bug_id, session=session)
+        if not bug:
+            raise HTTPException(status_code=404, detail="Bug not found")
+        
+        # Delete related time entries
+        entries_deleted = await delete_entries({"taskId": bug_id, "isBugEntry": True}, session=session)
     
-    # Delete the bug
-    db.bugs.delete_one({"id": bug_id})
-    return {"message": "Bug deleted successfully"}
+    await record_item_change(bug, None)
+    return {
+        "message": "Bug deleted successfully",
+        "affected": {"timeEntries": entries_deleted}
+    }
 
 # Team members endpoints
-@app.get("/api/team")
-async def get_team_members(project_id: Optional[int] = None, sprint_id: Optional[int] = None):
+@app.get("/api/team", response_model=List[TeamMember], dependencies=[Depends(Conditional(store.team))])
+async def get_team_members(response: Response, project_id: Optional[str] = None, sprint_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if project_id:
-        query["projectId"] = project_id
+        query["projectId"] = {"$in": ref_values(project_id)}
     if sprint_id:
-        query["sprintId"] = sprint_id
-    team_members = list(db.team.find(query))
-    return [format_document(member) for member in team_members]
+        query["sprintId"] = {"$in": ref_values(sprint_id)}
+    return await list_documents(store.team, query, page, response, TeamMember)
 
-@app.post("/api/team", status_code=201)
-async def create_team_member(member: dict):
+@app.post("/api/team", response_model=TeamMember, status_code=201)
+async def create_team_member(member: TeamMember):
+    member = member.model_dump()
     member["id"] = str(uuid.uuid4())
     member["createdAt"] = datetime.now()
-    result = db.team.insert_one(member)
-    created_member = db.team.find_one({"_id": result.inserted_id})
+    created_member = await store.team.create(member)
     return format_document(created_member)
 
-@app.get("/api/team/{member_id}")
-async def get_team_member(member_id: str):
-    member = db.team.find_one({"id": member_id})
+@app.get("/api/team/{member_id}", response_model=TeamMember, dependencies=[Depends(Conditional(store.team))])
+async def get_team_member(member_id: str, response: Response):
+    member = await store.team.get(member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Team member not found")
-    return format_document(member)
+    set_last_modified(response, member)
+    return document_response(member, TeamMember, response)
 
-@app.put("/api/team/{member_id}")
-async def update_team_member(member_id: str, update_data: dict):
-    member = db.team.find_one({"id": member_id})
-    if not member:
-        raise HTTPException(status_code=404, detail="Team member not found")
-    
+@app.put("/api/team/{member_id}", response_model=TeamMember)
+async def update_team_member(member_id: str, member_update: TeamMemberUpdate):
+    update_data = member_update.model_dump(exclude_unset=True)
     update_data["updatedAt"] = datetime.now()
-    db.team.update_one({"id": member_id}, {"$set": update_data})
-    updated_member = db.team.find_one({"id": member_id})
+    updated_member = await store.team.update(member_id, update_data)
+    if not updated_member:
+        raise HTTPException(status_code=404, detail="Team member not found")
     return format_document(updated_member)
 
 @app.delete("/api/team/{member_id}")
 async def delete_team_member(member_id: str):
-    member = db.team.find_one({"id": member_id})
-    if not member:
-        raise HTTPException(status_code=404, detail="Team member not found")
-    
-    # Check for related tasks and bugs
-    tasks = list(db.tasks.find({"assigneeId": member_id}))
-    bugs = list(db.bugs.find({"assigneeId": member_id}))
-    
-    # Update tasks and bugs to remove the assignee
-    if tasks:
-        db.tasks.update_many({"assigneeId": member_id}, {"$set": {"assigneeId": None, "assignee": None}})
-    
-    if bugs:
-        db.bugs.update_many({"assigneeId": member_id}, {"$set": {"assigneeId": None, "assignee": None}})
+    async with store.transaction() as session:
+        member = await store.team.delete(member_id, session=session)
+        if not member:
+            raise HTTPException(status_code=404, detail="Team member not found")
+        
+        # Update tasks and bugs to remove the assignee
+        unassign = {"$set": {"assigneeId": None, "assignee": None, "updatedAt": datetime.now()}}
+        tasks_updated = await store.tasks.update_many({"assigneeId": member_id}, unassign, session=session)
+        bugs_updated = await store.bugs.update_many({"assigneeId": member_id}, unassign, session=session)
     
-    # Delete the team member
-    db.team.delete_one({"id": member_id})
-    return {"message": "Team member deleted successfully"}
+    return {
+        "message": "Team member deleted successfully",
+        "affected": {"tasks": tasks_updated, "bugs": bugs_updated}
+    }
 
 # Time tracking endpoints
-@app.get("/api/time-entries")
-async def get_time_entries(project_id: Optional[int] = None, sprint_id: Optional[int] = None, assignee_id: Optional[str] = None):
+@app.get("/api/time-entries", response_model=List[TimeEntry], dependencies=[Depends(Conditional(store.time_entries, store.tasks, store.bugs))])
+async def get_time_entries(response: Response, project_id: Optional[str] = None, sprint_id: Optional[str] = None, assignee_id: Optional[str] = None, page: PageParams = Depends()):
     query = {}
     if project_id:
-        query["projectId"] = project_id
+        query["projectId"] = {"$in": ref_values(project_id)}
     if sprint_id:
-        query["sprintId"] = sprint_id
+        query["sprintId"] = {"$in": ref_values(sprint_id)}
     
-    # For assignee filtering, we need to join with tasks or bugs
-    time_entries = list(db.time_entries.find(query))
-    
-    # If assignee_id is provided, filter further
+    # For assignee filtering, prefetch the assignee's task and bug ids and
+    # match entries against them server-side instead of one lookup per entry
     if assignee_id:
-        filtered_entries = []
-        for entry in time_entries:
-            item_id = entry.get("taskId")
-            if entry.get("isTaskEntry", True):
-                item = db.tasks.find_one({"id": item_id})
-            else:
-                item = db.bugs.find_one({"id": item_id})
-            
-            if item and item.get("assigneeId") == assignee_id:
-                filtered_entries.append(entry)
-        
-        time_entries = filtered_entries
-    
-    return [format_document(entry) for entry in time_entries]
-
-@app.post("/api/time-entries", status_code=201)
-async def create_time_entry(entry: dict):
+        assignee = {"assigneeId": {"$in": ref_values(assignee_id)}}
+        task_ids = await store.tasks.distinct("id", assignee)
+        bug_ids = await store.bugs.distinct("id", assignee)
+        query["$or"] = [
+            {"isTaskEntry": {"$ne": False}, "taskId": {"$in": task_ids}},
+            {"isTaskEntry": False, "taskId": {"$in": bug_ids}},
+        ]
+    
+    return await list_documents(store.time_entries, query, page, response, TimeEntry)
+
+@app.post("/api/time-entries", response_model=TimeEntry, status_code=201)
+async def create_time_entry(entry: TimeEntry):
+    entry = entry.model_dump()
     entry["id"] = str(uuid.uuid4())
     entry["createdAt"] = datetime.now()
     
-    # If the entry is for a completed task/bug, update the actual hours
+    # If the entry is for a completed task/bug, add the hours atomically. The
+    # same write reads the item's assignee, whose time bucket the entry joins
     task_id = entry.get("taskId")
-    if entry.get("isTaskEntry", True):
-        task = db.tasks.find_one({"id": str(task_id)})
-        if task and task.get("status") == "Done":
-            current_hours = float(task.get("actualHours", 0))
-            new_hours = current_hours + float(entry.get("hours", 0))
-            db.tasks.update_one({"id": str(task_id)}, {"$set": {"actualHours": new_hours}})
-    else:
-        bug = db.bugs.find_one({"id": str(task_id)})
-        if bug and bug.get("status") == "Done":
-            current_hours = float(bug.get("actualHours", 0))
-            new_hours = current_hours + float(entry.get("hours", 0))
-            db.bugs.update_one({"id": str(task_id)}, {"$set": {"actualHours": new_hours}})
-    
-    result = db.time_entries.insert_one(entry)
-    created_entry = db.time_entries.find_one({"_id": result.inserted_id})
+    hours = float(entry.get("hours", 0))
+    items = store.tasks if entry.get("isTaskEntry", True) else store.bugs
+    done = {"$eq": ["$status", "Done"]}
+    item = await items.find_one_and_update(
+        {"id": str(task_id)},
+        [{"$set": {
+            "actualHours": {"$cond": [done, {"$add": [{"$ifNull": ["$actualHours", 0]}, hours]}, "$actualHours"]},
+            "updatedAt": {"$cond": [done, datetime.now(), "$updatedAt"]},
+        }}],
+        projection={"sprintId": 1, "status": 1, "assigneeId": 1},
+        invalidate=False,
+    )
+    if item and item.get("status") == "Done":
+        # Items that are not Done were only read, so their cached lists and ETags stay valid
+        await items.invalidate(str(task_id))
+    await record_done_hours(item, hours)
+    
+    entry["assigneeId"] = item.get("assigneeId") if item else None
+    created_entry = await store.time_entries.create(entry)
+    await record_entries([created_entry])
     return format_document(created_entry)
 
-@app.get("/api/time-entries/{entry_id}")
-async def get_time_entry(entry_id: str):
-    entry = db.time_entries.find_one({"id": entry_id})
+@app.get("/api/time-entries/buckets", dependencies=[Depends(Conditional(store.time_entries))])
+async def get_time_buckets(start: str, end: str, assignee_id: Optional[str] = None, project_id: Optional[str] = None, sprint_id: Optional[str] = None):
+    try:
+        return await timesheet(parse_day(start), parse_day(end), assignee_id=assignee_id, project_id=project_id, sprint_id=sprint_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.post("/api/time-entries/buckets/reconcile")
+async def reconcile_buckets(dry_run: bool = False):
+    return await reconcile_time_buckets(dry_run=dry_run)
+
+@app.get("/api/time-entries/{entry_id}", response_model=TimeEntry, dependencies=[Depends(Conditional(store.time_entries))])
+async def get_time_entry(entry_id: str, response: Response):
+    entry = await store.time_entries.get(entry_id)
     if not entry:
         raise HTTPException(status_code=404, detail="Time entry not found")
-    return format_document(entry)
+    set_last_modified(response, entry)
+    return document_response(entry, TimeEntry, response)
 
 @app.delete("/api/time-entries/{entry_id}")
 async def delete_time_entry(entry_id: str):
-    entry = db.time_entries.find_one({"id": entry_id})
+    # Deleting first means concurrent deletes of one entry subtract its hours once
+    entry = await store.time_entries.delete(entry_id)
     if not entry:
         raise HTTPException(status_code=404, detail="Time entry not found")
     
-    # If the entry was for a completed task/bug, update the actual hours
+    # If the entry was for a completed task/bug, subtract the hours atomically, floored at zero
     task_id = entry.get("taskId")
-    hours = entry.get("hours", 0)
+    hours = float(entry.get("hours", 0))
+    items = store.tasks if entry.get("isTaskEntry", True) else store.bugs
+    item = await items.find_one_and_update(
+        {"id": task_id, "status": "Done"},
+        [{"$set": {
+            "actualHours": {"$max": [0, {"$subtract": [{"$ifNull": ["$actualHours", 0]}, hours]}]},
+            "updatedAt": datetime.now(),
+        }}],
+        projection={"sprintId": 1, "status": 1, "actualHours": 1},
+        return_after=False
+    )
+    if item:
+        previous_hours = float(item.get("actualHours") or 0)
+        await record_done_hours(item, max(0, previous_hours - hours) - previous_hours)
+    
+    await record_entries([entry], -1)
+    return {"message": "Time entry deleted successfully"}
+
+# Real-time change feed
+@app.get("/api/events")
+async def events(project_id: Optional[str] = None, sprint_id: Optional[str] = None, collections: Optional[str] = None):
+    names = [name.strip() for name in collections.split(",") if name.strip()] if collections else None
+    unknown = [name for name in names or [] if name not in EVENT_COLLECTIONS.values()]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(unknown)}")
+    
+    subscription = await hub.subscribe(project_id=project_id, sprint_id=sprint_id, collections=names)
+    return StreamingResponse(
+        stream_events(hub, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Delta sync endpoint
+@app.get("/api/sync")
+async def sync(since: Optional[str] = None, collections: Optional[str] = None):
+    try:
+        names = resolve_collections(collections)
+        since_time = decode_token(since) if since else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return StreamingResponse(sync_changes(names, since_time), media_type="application/json")
+
+# Search endpoints
+@app.get("/api/search")
+async def search_items(
+    q: str,
+    type: Optional[str] = None,
+    project_id: Optional[str] = None,
+    sprint_id: Optional[str] = None,
+    status: Optional[str] = None,
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT)
+):
+    types = [name.strip() for name in type.split(",") if name.strip()] if type else None
+    unknown = [name for name in types or [] if name not in SEARCHABLE]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(unknown)}")
+    return await search(q, types, project_id=project_id, sprint_id=sprint_id, status=status, offset=offset, limit=limit)
+
+@app.post("/api/search/reindex")
+async def reindex_search():
+    return {"updated": await reindex_search_terms()}
+
+# Batch mutation endpoint
+@app.post("/api/batch")
+async def apply_batch(batch: BatchRequest):
+    return await Batch(batch.operations).run()
+
+# Cache endpoints
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return store.cache.stats()
+
+@app.post("/api/cache/clear")
+async def clear_cache():
+    await store.cache.clear()
+    return {"message": "Cache cleared"}
+
+# Bulk export endpoint
+@app.get("/api/export")
+async def export_data(format: str = "ndjson", collections: Optional[str] = None):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    try:
+        names = resolve_collections(collections)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    
+    filename = f"agile_tracker_export_{datetime.now().strftime('%Y-%m-%d')}.{format}"
+    return StreamingResponse(
+        stream_export(names, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Bulk import endpoint
+@app.post("/api/import")
+async def import_data(request: Request, upsert: bool = False):
+    importer = Importer(upsert=upsert)
     
-    if entry.get("isTaskEntry", True):
-        task = db.tasks.find_one({"id": task_id})
-        if task and task.get("status") == "Done":
-            current_hours = task.get("actualHours", 0)
-            new_hours = max(0, current_hours - hours)
-            db.tasks.update_one({"id": task_id}, {"$set": {"actualHours": new_hours}})
+    # NDJSON is consumed as it arrives; a JSON export has to be parsed whole
+    if "ndjson" in request.headers.get("content-type", ""):
+        await importer.load_ndjson(request.stream())
     else:
-        bug = db.bugs.find_one({"id": task_id})
-        if bug and bug.get("status") == "Done":
-            current_hours = bug.get("actualHours", 0)
-            new_hours = max(0, current_hours - hours)
-            db.bugs.update_one({"id": task_id}, {"$set": {"actualHours": new_hours}})
+        try:
+            data = json.loads(await request.body())
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {exc}")
+        if not isinstance(data, dict):
+            raise HTTPException(status_code=400, detail="Expected an object keyed by collection name")
+        await importer.load_json(data)
     
-    # Delete the time entry
-    db.time_entries.delete_one({"id": entry_id})
-    return {"message": "Time entry deleted successfully"}
+    return await importer.finish()
 
 # Helper functions
 def format_document(doc):
@@ -507,19 +575,62 @@ def format_document(doc):
     
     return doc
 
-def update_sprint_accepted_points(sprint_id):
+def set_last_modified(response: Response, doc):
+    """Advertise when a document was last written"""
+    stamp = last_modified(doc)
+    if stamp:
+        response.headers["Last-Modified"] = stamp
+
+async def list_documents(repository, query, page: PageParams, response: Response, model):
+    """Run a list query, paginating and projecting it when the client asked to.
+    
+    Documents are projected to the model's fields in Mongo and encoded as
+    they come back, so the list matches the response schema without a
+    per-document validation pass.
+    """
+    fields = page.projection or projection(model)
+    if not page.paginated:
+        docs = await repository.list(query, {**fields, "_id": 0})
+        return json_response(docs, response)
+    
+    if page.after is not None:
+        after_filter = keyset_filter(page.after)
+        query = {"$and": [query, after_filter]} if query else after_filter
+    
+    # Fetch one document past the page to know whether another page follows
+    # _id is only fetched to build the cursor
+    docs = await repository.list(query, {**fields, "_id": 1}, sort=PAGE_SORT, limit=page.page_size + 1)
+    docs, next_cursor = split_page(docs, page.page_size)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    for doc in docs:
+        del doc["_id"]
+    return json_response(docs, response)
+
+def document_response(doc, model, response: Response):
+    """Encode one raw document with only the model's fields, as list_documents does"""
+    fields = projection(model)
+    return json_response({key: value for key, value in doc.items() if fields.get(key)}, response)
+
+def json_response(content, response: Response):
+    """Encode raw documents directly, skipping FastAPI's jsonable_encoder pass"""
+    # A returned Response bypasses the headers dependencies set on ``response``
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return FastJSONResponse(content, headers=headers)
+
+async def update_sprint_accepted_points(sprint_id):
     """Update sprint accepted points based on completed tasks and bugs"""
     # Get all completed tasks for this sprint
-    completed_tasks = list(db.tasks.find({
+    completed_tasks = await store.tasks.list({
         "sprintId": sprint_id,
         "status": "Done"
-    }))
+    })
     
     # Get all completed bugs for this sprint
-    completed_bugs = list(db.bugs.find({
+    completed_bugs = await store.bugs.list({
         "sprintId": sprint_id,
         "status": "Done"
-    }))
+    })
     
     # Calculate total actual hours
     task_hours = sum(task.get("actualHours", 0) for task in completed_tasks)
@@ -527,19 +638,23 @@ def update_sprint_accepted_points(sprint_id):
     total_hours = task_hours + bug_hours
     
     # Convert to story points (8 hours = 1 story point)
-    accepted_points = round(total_hours / 8)
+    accepted_points = hours_to_points(total_hours)
     
     # Update sprint accepted points
-    db.sprints.update_one(
-        {"id": sprint_id}, 
-        {"$set": {"acceptedPoints": accepted_points, "updatedAt": datetime.now()}}
+    await store.sprints.set(
+        sprint_id,
+        {"acceptedPoints": accepted_points, "updatedAt": datetime.now()}
     )
 
 # Database events
 @app.on_event("startup")
 async def startup_db_client():
-    pass
+    await ensure_indexes(store.db)
+    await store.cache.start()
+    slow_query_log.start(client, asyncio.get_running_loop())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await hub.close()
+    await store.cache.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""MongoDB connection settings.
+
+Read once from the environment, after loading ``backend/.env`` and the
+repository-level ``.env`` if they exist (values already in the environment
+win). ``DB_NAME`` is only taken from the real environment: the committed
+``backend/.env`` names a scratch database, and deployments that predate
+these settings must keep using ``agile_tracker``.
+
+``Settings.client_options()`` turns them into ``AsyncIOMotorClient`` keyword
+arguments; ``Settings.analytics_read_preference()`` is the read
+preference for reporting queries that can tolerate replication lag.
+"""
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Tuple
+
+from dotenv import dotenv_values
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+
+BACKEND_DIR = Path(__file__).parent
+
+ENV_FILES = (BACKEND_DIR / ".env", BACKEND_DIR.parent / ".env")
+
+# Never read from .env files, so a committed file cannot switch databases
+ENVIRONMENT_ONLY = frozenset({"DB_NAME"})
+
+
+def load_env_files(paths=ENV_FILES, environ: MutableMapping[str, str] = os.environ) -> None:
+    """Fill ``environ`` from .env files without overriding what is already set"""
+    for path in paths:
+        for name, value in dotenv_values(path).items():
+            if value is not None and name not in ENVIRONMENT_ONLY:
+                environ.setdefault(name, value)
+
+
+load_env_files()
+
+
+def _optional_int(environ: Mapping[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+    value = environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+def _list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@dataclass(frozen=True)
+class Settings:
+    mongo_url: str = "mongodb://localhost:27017"
+    db_name: str = "agile_tracker"
+    app_name: str = "agile-tracker-api"
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    # None waits for a pooled connection until the operation's own timeout
+    wait_queue_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: int = 5000
+    connect_timeout_ms: int = 10000
+    socket_timeout_ms: Optional[int] = None
+    # Wire compression in order of preference: any of zstd, snappy, zlib
+    compressors: Tuple[str, ...] = ()
+    zlib_compression_level: int = -1
+    # Reporting reads (sprint metrics, exports) go here; a standalone
+    # server or a set without secondaries falls back to the primary
+    analytics_read_preference_mode: str = "secondaryPreferred"
+    analytics_max_staleness_seconds: int = -1
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        defaults = cls()
+        return cls(
+            mongo_url=environ.get("MONGO_URL", defaults.mongo_url),
+            db_name=environ.get("DB_NAME", defaults.db_name),
+            app_name=environ.get("MONGO_APP_NAME", defaults.app_name),
+            max_pool_size=_optional_int(environ, "MONGO_MAX_POOL_SIZE", defaults.max_pool_size),
+            min_pool_size=_optional_int(environ, "MONGO_MIN_POOL_SIZE", defaults.min_pool_size),
+            max_idle_time_ms=_optional_int(environ, "MONGO_MAX_IDLE_TIME_MS"),
+            wait_queue_timeout_ms=_optional_int(environ, "MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+            server_selection_timeout_ms=_optional_int(
+                environ, "MONGO_SERVER_SELECTION_TIMEOUT_MS", defaults.server_selection_timeout_ms
+            ),
+            connect_timeout_ms=_optional_int(environ, "MONGO_CONNECT_TIMEOUT_MS", defaults.connect_timeout_ms),
+            socket_timeout_ms=_optional_int(environ, "MONGO_SOCKET_TIMEOUT_MS"),
+            compressors=tuple(_list(environ.get("MONGO_COMPRESSORS", ""))),
+            zlib_compression_level=_optional_int(environ, "MONGO_ZLIB_LEVEL", defaults.zlib_compression_level),
+            analytics_read_preference_mode=environ.get(
+                "MONGO_ANALYTICS_READ_PREFERENCE", defaults.analytics_read_preference_mode
+            ),
+            analytics_max_staleness_seconds=_optional_int(
+                environ, "MONGO_ANALYTICS_MAX_STALENESS_SECONDS", defaults.analytics_max_staleness_seconds
+            ),
+        )
+
+    def client_options(self) -> Dict[str, Any]:
+        """Keyword arguments for the Motor client; unset options keep the driver defaults"""
+        options = {
+            "appname": self.app_name,
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+        }
+        if self.compressors:
+            # pymongo warns and skips any compressor whose library is not installed
+            options["compressors"] = ",".join(self.compressors)
+            if "zlib" in self.compressors:
+                options["zlibCompressionLevel"] = self.zlib_compression_level
+        return {name: value for name, value in options.items() if value is not None}
+
+    def analytics_read_preference(self):
+        """pymongo read preference for reporting reads"""
+        try:
+            mode = read_pref_mode_from_name(self.analytics_read_preference_mode)
+        except ValueError:
+            raise ValueError(f"Unknown analytics read preference {self.analytics_read_preference_mode!r}") from None
+        return make_read_preference(mode, None, self.analytics_max_staleness_seconds)
+
+
+settings = Settings.from_env()
@@ -0,0 +1,240 @@
+"""Slow Mongo query log.
+
+``SlowQueryLog`` is a pymongo ``CommandListener`` that records every
+command slower than a threshold, with the route that issued it, the shape
+of its filter (values replaced by ``"?"`` so equal queries group together)
+and the documents it returned. The first time a shape is seen (and again
+after ``explain_interval`` seconds) the command is re-run through
+``explain`` in the background, and the summary -- documents and keys
+examined, winning plan stages and indexes -- is attached to the entry.
+
+Entries are kept in a bounded in-memory ring per process and are served by
+``GET /api/admin/slow-queries``.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from bson import SON
+from pymongo import monitoring
+
+from metrics import current_route, document_count
+
+logger = logging.getLogger(__name__)
+
+# Commands that carry a filter worth logging and explaining
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Driver and session fields explain rejects or does not need
+_SESSION_FIELDS = {
+    "lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern", "readConcern",
+    "apiVersion", "apiStrict", "apiDeprecationErrors",
+}
+
+ShapeKey = Tuple[str, str, str]
+
+
+def filter_shape(value: Any) -> Any:
+    """The filter with every literal replaced by ``"?"``, keeping operators and field names"""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in / $or lists collapse to one element so their length does not split shapes
+        return [filter_shape(value[0])] if value else []
+    return "?"
+
+
+def command_filter(command_name: str, command: dict) -> Optional[dict]:
+    if command_name == "find":
+        return command.get("filter", {})
+    if command_name in ("count", "distinct", "findAndModify"):
+        return command.get("query", {})
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        return statements[0].get("q", {})
+    if command_name == "aggregate":
+        for stage in command.get("pipeline", []):
+            if "$match" in stage:
+                return stage["$match"]
+        return {}
+    return None
+
+
+def _stages(plan: dict) -> List[dict]:
+    """Flatten a (queryPlanner or executionStats) plan tree, root first"""
+    stages = []
+    pending = [plan]
+    while pending:
+        stage = pending.pop(0)
+        if not isinstance(stage, dict):
+            continue
+        stages.append(stage)
+        for child in ("inputStage", "queryPlan"):
+            if child in stage:
+                pending.append(stage[child])
+        pending.extend(stage.get("inputStages", []))
+    return stages
+
+
+def _find_key(value: Any, key: str) -> Any:
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            found = _find_key(item, key)
+            if found is not None:
+                return found
+    return None
+
+
+def summarize_explain(explain: dict) -> Dict[str, Any]:
+    """The parts of an executionStats explain worth keeping in the log"""
+    stats = _find_key(explain, "executionStats") or {}
+    planner = _find_key(explain, "queryPlanner") or {}
+    plan = planner.get("winningPlan", {})
+    stages = _stages(plan)
+    names = [stage.get("stage") for stage in stages if stage.get("stage")]
+    indexes = sorted({stage["indexName"] for stage in stages if stage.get("indexName")})
+    return {
+        "docsExamined": stats.get("totalDocsExamined"),
+        "keysExamined": stats.get("totalKeysExamined"),
+        "nReturned": stats.get("nReturned"),
+        "executionTimeMs": stats.get("executionTimeMillis"),
+        "stages": names,
+        "indexes": indexes,
+        "collectionScan": "COLLSCAN" in names,
+    }
+
+
+def _explain_command(command: dict) -> SON:
+    inner = SON((key, value) for key, value in command.items() if not key.startswith("$") and key not in _SESSION_FIELDS)
+    return SON([("explain", inner), ("verbosity", "executionStats")])
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Records Mongo commands slower than ``threshold_ms``; a negative threshold disables it"""
+
+    def __init__(
+        self,
+        threshold_ms: float = 100,
+        max_entries: int = 200,
+        explain: bool = True,
+        explain_interval: float = 300,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._pending: Dict[Tuple[object, int], Tuple[dict, Optional[str]]] = {}
+        self._plans: Dict[ShapeKey, Dict[str, Any]] = {}
+        self._explained: Dict[ShapeKey, float] = {}
+        self._lock = threading.Lock()
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms >= 0
+
+    def start(self, client, loop: asyncio.AbstractEventLoop) -> None:
+        """Give the log a Motor client and loop to run explains on"""
+        self._client = client
+        self._loop = loop
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Newest entries first"""
+        with self._lock:
+            entries = [dict(entry) for entry in reversed(self.entries)]
+        return entries[:limit] if limit is not None else entries
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if not self.enabled or event.command_name not in EXPLAINABLE:
+            return
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (event.command, current_route())
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        with self._lock:
+            self._pending.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        command, route = pending
+        self.record(event.command_name, event.database_name, command, route, duration_ms, event.reply)
+
+    def record(
+        self,
+        command_name: str,
+        database: str,
+        command: dict,
+        route: Optional[str],
+        duration_ms: float,
+        reply: dict,
+    ) -> Dict[str, Any]:
+        collection = command.get(command_name, "")
+        shape = filter_shape(command_filter(command_name, command))
+        key: ShapeKey = (collection, command_name, json.dumps(shape, sort_keys=True, default=str))
+        with self._lock:
+            plan = self._plans.get(key)
+            due = time.monotonic() - self._explained.get(key, float("-inf")) >= self.explain_interval
+            if due and self.explain and self._loop is not None:
+                self._explained[key] = time.monotonic()
+            else:
+                due = False
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "command": command_name,
+            "collection": collection,
+            "route": route,
+            "durationMs": round(duration_ms, 3),
+            "filterShape": shape,
+            "docsReturned": document_count(command_name, reply),
+            "docsExamined": plan["docsExamined"] if plan else None,
+            "explain": plan,
+        }
+        with self._lock:
+            self.entries.append(entry)
+        logger.warning(
+            "Slow Mongo %s on %s took %.1fms (route %s, filter %s)",
+            command_name, collection, duration_ms, route or "-", key[2],
+        )
+        if due:
+            try:
+                asyncio.run_coroutine_threadsafe(self._explain(key, database, command, entry), self._loop)
+            except RuntimeError:
+                # The loop is closed; explains simply stop during shutdown
+                pass
+        return entry
+
+    async def _explain(self, key: ShapeKey, database: str, command: dict, entry: Dict[str, Any]) -> None:
+        try:
+            explain = await self._client[database].command(_explain_command(command))
+        except Exception as exc:
+            logger.info("Could not explain slow %s on %s: %s", key[1], key[0], exc)
+            return
+        summary = summarize_explain(explain)
+        with self._lock:
+            self._plans[key] = summary
+            entry["explain"] = summary
+            entry["docsExamined"] = summary["docsExamined"]
+        logger.warning(
+            "Slow Mongo %s on %s examined %s documents for %s returned (plan %s)",
+            key[1], key[0], summary["docsExamined"], summary["nReturned"], " <- ".join(summary["stages"]),
+        )
@@ -0,0 +1,93 @@
+"""Server-side sprint metrics.
+
+Tasks and bugs are rolled up per sprint in a single ``$group`` pipeline
+(tasks ``$unionWith`` bugs) and merged with the sprint documents, so a
+dashboard gets committed/accepted/added/descoped points and hour totals for
+every sprint without downloading the items themselves.
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+from database import store
+from models import ref_values
+
+# 8 hours of completed work count as one story point
+HOURS_PER_POINT = 8
+
+# Sprints in this status have not accepted anything yet
+PLANNING = "Planning"
+
+SPRINT_FIELDS = {
+    "_id": 0,
+    "id": 1,
+    "projectId": 1,
+    "name": 1,
+    "status": 1,
+    "committedPoints": 1,
+    "addedPoints": 1,
+    "descopedPoints": 1,
+}
+
+
+def hours_to_points(hours: float) -> int:
+    """Convert completed hours to story points, rounding half up like the frontend"""
+    return int(math.floor(hours / HOURS_PER_POINT + 0.5))
+
+
+def accepted_points(status: Optional[str], done_hours: float) -> int:
+    """Points a sprint has accepted: its completed hours, unless it is still being planned"""
+    return 0 if status == PLANNING else hours_to_points(done_hours)
+
+
+def rollup_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    item_fields = {"_id": 0, "sprintId": 1, "status": 1, "estimatedHours": 1, "actualHours": 1}
+    is_done = {"$eq": ["$status", "Done"]}
+    return [
+        {"$match": match},
+        {"$project": item_fields},
+        {"$unionWith": {"coll": "bugs", "pipeline": [{"$match": match}, {"$project": item_fields}]}},
+        {"$group": {
+            "_id": "$sprintId",
+            "itemCount": {"$sum": 1},
+            "doneCount": {"$sum": {"$cond": [is_done, 1, 0]}},
+            "estimatedHours": {"$sum": {"$ifNull": ["$estimatedHours", 0]}},
+            "actualHours": {"$sum": {"$ifNull": ["$actualHours", 0]}},
+            "doneHours": {"$sum": {"$cond": [is_done, {"$ifNull": ["$actualHours", 0]}, 0]}},
+        }},
+    ]
+
+
+async def get_sprint_metrics(project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    sprint_query = {}
+    item_match: Dict[str, Any] = {"sprintId": {"$ne": None}}
+    if project_id:
+        sprint_query["projectId"] = {"$in": ref_values(project_id)}
+        item_match["projectId"] = {"$in": ref_values(project_id)}
+
+    sprints = await store.sprints.list(sprint_query, SPRINT_FIELDS)
+    # A lagging secondary can briefly report the rollups from before the last
+    # write; set MONGO_ANALYTICS_READ_PREFERENCE=primary if that matters
+    rollups = {
+        row["_id"]: row for row in await store.tasks.aggregate(rollup_pipeline(item_match), analytics=True)
+    }
+
+    metrics = []
+    for sprint in sprints:
+        rollup = rollups.get(sprint.get("id"), {})
+        done_hours = rollup.get("doneHours", 0)
+        metrics.append({
+            "sprintId": sprint.get("id"),
+            "projectId": sprint.get("projectId"),
+            "name": sprint.get("name"),
+            "status": sprint.get("status"),
+            "committedPoints": sprint.get("committedPoints", 0),
+            "acceptedPoints": accepted_points(sprint.get("status"), done_hours),
+            "addedPoints": sprint.get("addedPoints", 0),
+            "descopedPoints": sprint.get("descopedPoints", 0),
+            "itemCount": rollup.get("itemCount", 0),
+            "doneCount": rollup.get("doneCount", 0),
+            "estimatedHours": rollup.get("estimatedHours", 0),
+            "actualHours": rollup.get("actualHours", 0),
+            "doneHours": done_hours,
+        })
+    return metrics
@@ -0,0 +1,235 @@
+"""Incrementally maintained per-sprint rollups.
+
+Each sprint document carries a ``rollup`` subdocument with the number of
+tasks and bugs in the sprint, their counts by status and the actual hours of
+completed items, plus ``acceptedPoints`` derived from those hours. The task,
+bug and time-entry write paths apply deltas to it as they happen instead of
+rescanning the sprint; ``reconcile_sprint_rollups`` re-derives everything in
+batch to repair and report drift (e.g. after a bulk import). Like the
+sprint metrics, sprints still in Planning accept no points whatever their
+completed hours.
+
+Statuses are free-form, so in ``statusCounts`` keys a "." and a leading "$",
+which Mongo would read as a path separator or an operator, are replaced by
+their full-width forms "．" and "＄".
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from database import store
+from sprint_metrics import HOURS_PER_POINT, PLANNING, accepted_points
+
+DONE = "Done"
+
+# Stand-ins for the characters a field name cannot safely contain
+DOT = "\uff0e"
+DOLLAR = "\uff04"
+
+# Float sums of hours may differ in the last bits without being real drift
+HOURS_TOLERANCE = 1e-6
+
+
+def status_key(status: Any) -> str:
+    """The ``statusCounts`` field name for ``status``"""
+    key = str(status or "Unknown").replace(".", DOT)
+    return DOLLAR + key[1:] if key.startswith("$") else key
+
+
+def _status_key_expression() -> Dict[str, Any]:
+    """``status_key`` as an aggregation expression"""
+    status = {"$toString": {"$ifNull": ["$status", ""]}}
+    status = {"$cond": [{"$eq": [status, ""]}, "Unknown", status]}
+    key = {"$replaceAll": {"input": status, "find": ".", "replacement": DOT}}
+    return {"$cond": [
+        {"$eq": [{"$substrCP": [key, 0, 1]}, "$"]},
+        {"$concat": [DOLLAR, {"$substrCP": [key, 1, {"$strLenCP": key}]}]},
+        key,
+    ]}
+
+
+def contribution(item: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """The rollup fields one task or bug contributes to its sprint"""
+    if not item or item.get("sprintId") is None:
+        return {}
+    fields = {
+        "rollup.itemCount": 1,
+        f"rollup.statusCounts.{status_key(item.get('status'))}": 1,
+    }
+    if item.get("status") == DONE:
+        fields["rollup.doneHours"] = float(item.get("actualHours") or 0)
+    return fields
+
+
+def item_deltas(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Dict[Any, Dict[str, float]]:
+    """Per-sprint field deltas for an item going from ``old`` to ``new``"""
+    deltas: Dict[Any, Dict[str, float]] = defaultdict(dict)
+    for item, sign in ((old, -1), (new, 1)):
+        for field, value in contribution(item).items():
+            sprint_deltas = deltas[item["sprintId"]]
+            sprint_deltas[field] = sprint_deltas.get(field, 0) + sign * value
+    return {
+        sprint_id: {field: value for field, value in fields.items() if value}
+        for sprint_id, fields in deltas.items()
+        if any(fields.values())
+    }
+
+
+def _accepted_points_stage() -> Dict[str, Any]:
+    """``accepted_points`` of the sprint's status and rollup hours, as a pipeline stage"""
+    points = {"$toInt": {"$floor": {"$add": [
+        {"$divide": [{"$ifNull": ["$rollup.doneHours", 0]}, HOURS_PER_POINT]},
+        0.5,
+    ]}}}
+    accepted = {"$cond": [{"$eq": ["$status", PLANNING]}, 0, points]}
+    return {"$set": {"acceptedPoints": accepted, "updatedAt": datetime.now()}}
+
+
+def increment_pipeline(deltas: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Atomically add ``deltas`` and recompute acceptedPoints in one update.
+
+    Equivalent to ``$inc`` on the rollup fields, expressed as an update
+    pipeline so the derived acceptedPoints is computed from the incremented
+    hours inside the same document write.
+    """
+    increments = {
+        field: {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}
+        for field, delta in deltas.items()
+    }
+    return [{"$set": increments}, _accepted_points_stage()]
+
+
+def sprint_update_operation(fields: Dict[str, Any]) -> Any:
+    """Update setting ``fields`` on a sprint; a new status also re-derives acceptedPoints"""
+    if "status" not in fields:
+        return {"$set": fields}
+    return [{"$set": {field: {"$literal": value} for field, value in fields.items()}}, _accepted_points_stage()]
+
+
+def done_hours_deltas(item: Optional[Dict[str, Any]], hours: float) -> Dict[Any, Dict[str, float]]:
+    """Per-sprint deltas for ``hours`` logged against (or removed from) a completed item"""
+    if not item or item.get("sprintId") is None or item.get("status") != DONE or not hours:
+        return {}
+    return {item["sprintId"]: {"rollup.doneHours": hours}}
+
+
+def merge_deltas(changes: Iterable[Dict[Any, Dict[str, float]]]) -> Dict[Any, Dict[str, float]]:
+    """Sum several per-sprint delta maps so each sprint is written once"""
+    merged: Dict[Any, Dict[str, float]] = defaultdict(dict)
+    for deltas in changes:
+        for sprint_id, fields in deltas.items():
+            for field, value in fields.items():
+                merged[sprint_id][field] = merged[sprint_id].get(field, 0) + value
+    return {
+        sprint_id: {field: value for field, value in fields.items() if value}
+        for sprint_id, fields in merged.items()
+        if any(fields.values())
+    }
+
+
+async def apply_deltas(deltas: Dict[Any, Dict[str, float]]) -> None:
+    deltas = {sprint_id: fields for sprint_id, fields in deltas.items() if fields}
+    if len(deltas) == 1:
+        [(sprint_id, fields)] = deltas.items()
+        await store.sprints.apply_update(sprint_id, increment_pipeline(fields))
+    elif deltas:
+        # One round trip however many sprints a batch of changes touched
+        await store.sprints.bulk_write(
+            [UpdateOne({"id": sprint_id}, increment_pipeline(fields)) for sprint_id, fields in deltas.items()],
+            ordered=False,
+        )
+
+
+async def record_item_change(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+    """Update sprint rollups after a task or bug is created, changed or deleted"""
+    await apply_deltas(item_deltas(old, new))
+
+
+async def record_done_hours(item: Optional[Dict[str, Any]], hours: float) -> None:
+    """Update the sprint rollup after hours are logged against a completed item"""
+    await apply_deltas(done_hours_deltas(item, hours))
+
+
+def expected_rollups_pipeline() -> List[Dict[str, Any]]:
+    item_fields = {"_id": 0, "sprintId": 1, "status": 1, "actualHours": 1}
+    match = {"sprintId": {"$ne": None}}
+    return [
+        {"$match": match},
+        {"$project": item_fields},
+        {"$unionWith": {"coll": "bugs", "pipeline": [{"$match": match}, {"$project": item_fields}]}},
+        {"$group": {
+            "_id": {"sprintId": "$sprintId", "status": _status_key_expression()},
+            "count": {"$sum": 1},
+            "doneHours": {"$sum": {"$cond": [
+                {"$eq": ["$status", DONE]}, {"$ifNull": ["$actualHours", 0]}, 0,
+            ]}},
+        }},
+        {"$group": {
+            "_id": "$_id.sprintId",
+            "itemCount": {"$sum": "$count"},
+            "doneHours": {"$sum": "$doneHours"},
+            "statusCounts": {"$push": {"k": "$_id.status", "v": "$count"}},
+        }},
+        {"$project": {
+            "itemCount": 1,
+            "doneHours": 1,
+            "statusCounts": {"$arrayToObject": "$statusCounts"},
+        }},
+    ]
+
+
+def _normalize(rollup: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    rollup = rollup or {}
+    return {
+        "itemCount": rollup.get("itemCount", 0),
+        "doneHours": float(rollup.get("doneHours", 0)),
+        "statusCounts": {status: count for status, count in (rollup.get("statusCounts") or {}).items() if count},
+    }
+
+
+def _drifted(expected: Dict[str, Any], actual: Dict[str, Any]) -> bool:
+    return (
+        expected["itemCount"] != actual["itemCount"]
+        or expected["statusCounts"] != actual["statusCounts"]
+        or abs(expected["doneHours"] - actual["doneHours"]) > HOURS_TOLERANCE
+    )
+
+
+async def reconcile_sprint_rollups(dry_run: bool = False, batch_size: int = 500) -> Dict[str, Any]:
+    """Re-derive every sprint rollup, correct drifted ones and report them"""
+    expected_by_sprint = {
+        row["_id"]: _normalize(row) for row in await store.tasks.aggregate(expected_rollups_pipeline())
+    }
+
+    checked = 0
+    drift = []
+    corrections = []
+    fields = {"_id": 0, "id": 1, "status": 1, "rollup": 1, "acceptedPoints": 1}
+    async for sprint in store.sprints.iterate({}, fields, batch_size=batch_size):
+        checked += 1
+        expected = expected_by_sprint.get(sprint.get("id"), _normalize(None))
+        actual = _normalize(sprint.get("rollup"))
+        expected_points = accepted_points(sprint.get("status"), expected["doneHours"])
+        if not _drifted(expected, actual) and sprint.get("acceptedPoints") == expected_points:
+            continue
+
+        drift.append({"sprintId": sprint.get("id"), "expected": expected, "actual": actual})
+        corrections.append(UpdateOne(
+            {"id": sprint.get("id")},
+            {"$set": {"rollup": expected, "acceptedPoints": expected_points, "updatedAt": datetime.now()}},
+        ))
+        if not dry_run and len(corrections) >= batch_size:
+            await store.sprints.bulk_write(corrections, ordered=False)
+            corrections = []
+
+    if not dry_run and corrections:
+        await store.sprints.bulk_write(corrections, ordered=False)
+
+    return {
+        "checked": checked,
+        "drifted": len(drift),
+        "corrected": 0 if dry_run else len(drift),
+        "drift": drift,
+    }
@@ -0,0 +1,284 @@
+"""Incrementally maintained time-entry buckets for timesheet queries.
+
+The ``time_buckets`` collection holds one document per
+``(projectId, sprintId, assigneeId, day)`` with the hours logged and the
+number of entries. Creating or deleting time entries adds or subtracts
+deltas, so a quarterly timesheet for one member reads about one small
+document per day instead of every raw entry joined to its task.
+
+Each entry records the ``assigneeId`` of its task or bug when it is logged.
+Its bucket therefore does not move if the item is reassigned later, and
+deleting the entry subtracts from the bucket it was added to. Entries
+written before buckets existed carry no ``assigneeId``. They are left out
+until ``reconcile_time_buckets`` fills it in from their items and rebuilds
+every bucket, which also repairs drift after a bulk import. Days are
+normalized from the entry's free-form ``date``; entries whose date cannot
+be parsed are not bucketed.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DeleteOne, UpdateOne
+
+from database import store
+from models import ref_values
+from sprint_rollups import HOURS_TOLERANCE
+
+# Formats tried after ISO 8601 when normalizing an entry's date
+DATE_FORMATS = ("%m/%d/%Y", "%d.%m.%Y")
+
+# Longest range one timesheet request may cover
+MAX_RANGE_DAYS = 366
+
+KEY_FIELDS = ("projectId", "sprintId", "assigneeId", "day")
+
+# Entry fields a bucket is derived from
+ENTRY_FIELDS = {"_id": 0, "id": 1, "projectId": 1, "sprintId": 1, "assigneeId": 1, "date": 1, "hours": 1}
+
+BucketKey = Tuple[Any, Any, Any, str]
+# Hours and entry count per bucket
+BucketDeltas = Dict[BucketKey, Tuple[float, int]]
+
+
+def bucket_day(value: Any) -> Optional[str]:
+    """The ISO day an entry's ``date`` falls on, or None if it cannot be parsed"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).date().isoformat()
+    except ValueError:
+        pass
+    for pattern in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, pattern).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def bucket_key(entry: Dict[str, Any]) -> Optional[BucketKey]:
+    if "assigneeId" not in entry:
+        # Logged before buckets existed; reconciliation assigns it
+        return None
+    day = bucket_day(entry.get("date"))
+    if day is None:
+        return None
+    return entry.get("projectId"), entry.get("sprintId"), entry.get("assigneeId"), day
+
+
+def entry_deltas(entries: List[Dict[str, Any]], sign: int = 1) -> BucketDeltas:
+    """Per-bucket deltas for adding (``sign=1``) or removing ``entries``"""
+    deltas: Dict[BucketKey, List[float]] = defaultdict(lambda: [0.0, 0])
+    for entry in entries:
+        key = bucket_key(entry)
+        if key is None:
+            continue
+        deltas[key][0] += sign * float(entry.get("hours") or 0)
+        deltas[key][1] += sign
+    return {key: (hours, count) for key, (hours, count) in deltas.items() if count}
+
+
+def merge_bucket_deltas(changes: List[BucketDeltas]) -> BucketDeltas:
+    """Sum several delta maps so each bucket is written once"""
+    merged: Dict[BucketKey, List[float]] = defaultdict(lambda: [0.0, 0])
+    for deltas in changes:
+        for key, (hours, count) in deltas.items():
+            merged[key][0] += hours
+            merged[key][1] += count
+    return {key: (hours, count) for key, (hours, count) in merged.items() if count or abs(hours) > HOURS_TOLERANCE}
+
+
+def _increment(hours: float, count: int) -> Dict[str, Any]:
+    return {"$inc": {"hours": hours, "entries": count}, "$set": {"updatedAt": datetime.now()}}
+
+
+async def apply_bucket_deltas(deltas: BucketDeltas, session=None) -> None:
+    if not deltas:
+        return
+    if len(deltas) == 1:
+        [(key, (hours, count))] = deltas.items()
+        await store.time_buckets.update_one(
+            dict(zip(KEY_FIELDS, key)), _increment(hours, count), upsert=True, session=session
+        )
+    else:
+        # One round trip however many buckets a batch of entries touched
+        requests = [
+            UpdateOne(dict(zip(KEY_FIELDS, key)), _increment(hours, count), upsert=True)
+            for key, (hours, count) in deltas.items()
+        ]
+        await store.time_buckets.bulk_write(requests, ordered=False, session=session)
+    # Timesheet ETags follow the time entries, whose write bumped the version
+    # before the buckets caught up; a timesheet read in between must not keep it
+    await store.time_entries.invalidate()
+
+
+async def record_entries(entries: List[Dict[str, Any]], sign: int = 1, session=None) -> None:
+    """Update buckets after time entries are created (``sign=1``) or deleted (``sign=-1``)"""
+    await apply_bucket_deltas(entry_deltas(entries, sign), session=session)
+
+
+async def delete_entries(query: Dict[str, Any], session=None) -> int:
+    """Delete matching time entries and take them out of their buckets.
+
+    The hours are summed by Mongo per bucket and raw ``date``, so memory grows
+    with the buckets touched rather than with the entries deleted.
+    """
+    group_key = {field: f"${field}" for field in (*KEY_FIELDS[:-1], "date")}
+    pipeline = [
+        {"$match": {"$and": [query, {"assigneeId": {"$exists": True}}]}},
+        {"$group": {"_id": group_key, "hours": {"$sum": "$hours"}, "entries": {"$sum": 1}}},
+    ]
+    deltas: Dict[BucketKey, List[float]] = defaultdict(lambda: [0.0, 0])
+    for group in await store.time_entries.aggregate(pipeline, session=session):
+        # Fields the entries lack are left out of the group key and read as None
+        key = bucket_key(group["_id"])
+        if key is not None:
+            deltas[key][0] -= group["hours"]
+            deltas[key][1] -= group["entries"]
+
+    deleted = await store.time_entries.delete_many(query, session=session)
+    if deleted:
+        await apply_bucket_deltas({key: (hours, count) for key, (hours, count) in deltas.items()}, session=session)
+    return deleted
+
+
+def parse_day(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid day: {value!r}, expected YYYY-MM-DD") from None
+
+
+async def timesheet(
+    start: date,
+    end: date,
+    assignee_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    sprint_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Buckets with hours logged between ``start`` and ``end``, inclusive"""
+    if end < start:
+        raise ValueError("end is before start")
+    if end - start >= timedelta(days=MAX_RANGE_DAYS):
+        raise ValueError(f"Ranges are limited to {MAX_RANGE_DAYS} days")
+
+    query: Dict[str, Any] = {"day": {"$gte": start.isoformat(), "$lte": end.isoformat()}, "entries": {"$gt": 0}}
+    if assignee_id is not None:
+        query["assigneeId"] = {"$in": ref_values(assignee_id)}
+    if project_id is not None:
+        query["projectId"] = {"$in": ref_values(project_id)}
+    if sprint_id is not None:
+        query["sprintId"] = {"$in": ref_values(sprint_id)}
+
+    projection = {"_id": 0, **{field: 1 for field in KEY_FIELDS}, "hours": 1, "entries": 1}
+    buckets = await store.time_buckets.find(query, projection).sort([("day", 1)]).to_list(length=None)
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "totalHours": sum(bucket["hours"] for bucket in buckets),
+        "buckets": buckets,
+    }
+
+
+def _item_key(entry: Dict[str, Any]) -> Tuple[bool, str]:
+    return entry.get("isTaskEntry", True) is not False, str(entry.get("taskId"))
+
+
+async def _assign_entries(batch: List[Dict[str, Any]], dry_run: bool) -> None:
+    """Give entries logged before buckets existed their item's current assignee"""
+    wanted = {_item_key(entry) for entry in batch}
+    assignees = {}
+    for is_task, items in ((True, store.tasks), (False, store.bugs)):
+        ids = [item_id for task_entry, item_id in wanted if task_entry == is_task]
+        if ids:
+            for item in await items.find_many({"id": {"$in": ids}}, {"_id": 0, "id": 1, "assigneeId": 1}):
+                assignees[(is_task, item["id"])] = item.get("assigneeId")
+    requests = []
+    for entry in batch:
+        entry["assigneeId"] = assignees.get(_item_key(entry))
+        requests.append(UpdateOne({"id": entry["id"]}, {"$set": {"assigneeId": entry["assigneeId"]}}))
+    if not dry_run:
+        await store.time_entries.bulk_write(requests, ordered=False)
+
+
+def _drift(key: BucketKey, expected: Tuple[float, int], actual: Tuple[float, int]) -> Dict[str, Any]:
+    return {
+        "bucket": dict(zip(KEY_FIELDS, key)),
+        "expected": {"hours": expected[0], "entries": expected[1]},
+        "actual": {"hours": actual[0], "entries": actual[1]},
+    }
+
+
+async def reconcile_time_buckets(dry_run: bool = False, batch_size: int = 1000) -> Dict[str, Any]:
+    """Re-derive every bucket from the time entries, correct drifted ones and report them"""
+    expected: Dict[BucketKey, List[float]] = defaultdict(lambda: [0.0, 0])
+    assigned = 0
+    unbucketed = 0
+    pending: List[Dict[str, Any]] = []
+
+    def add(entries: List[Dict[str, Any]]) -> None:
+        nonlocal unbucketed
+        for entry in entries:
+            key = bucket_key(entry)
+            if key is None:
+                unbucketed += 1
+                continue
+            expected[key][0] += float(entry.get("hours") or 0)
+            expected[key][1] += 1
+
+    fields = {**ENTRY_FIELDS, "taskId": 1, "isTaskEntry": 1}
+    async for entry in store.time_entries.iterate({}, fields, batch_size=batch_size):
+        if "assigneeId" in entry:
+            add([entry])
+            continue
+        pending.append(entry)
+        if len(pending) >= batch_size:
+            await _assign_entries(pending, dry_run)
+            assigned += len(pending)
+            add(pending)
+            pending = []
+    if pending:
+        await _assign_entries(pending, dry_run)
+        assigned += len(pending)
+        add(pending)
+
+    checked = 0
+    drift = []
+    corrections: List[Any] = []
+    async for bucket in store.time_buckets.find({}, {"updatedAt": 0}):
+        checked += 1
+        key = tuple(bucket.get(field) for field in KEY_FIELDS)
+        hours, count = expected.pop(key, (0.0, 0))
+        actual = (float(bucket.get("hours") or 0), bucket.get("entries", 0))
+        if count == actual[1] and abs(hours - actual[0]) <= HOURS_TOLERANCE:
+            continue
+        drift.append(_drift(key, (hours, count), actual))
+        if count:
+            update = {"$set": {"hours": hours, "entries": count, "updatedAt": datetime.now()}}
+            corrections.append(UpdateOne({"_id": bucket["_id"]}, update))
+        else:
+            # Every entry in it is gone
+            corrections.append(DeleteOne({"_id": bucket["_id"]}))
+    for key, (hours, count) in expected.items():
+        drift.append(_drift(key, (hours, count), (0.0, 0)))
+        corrections.append(UpdateOne(dict(zip(KEY_FIELDS, key)), _increment(hours, count), upsert=True))
+
+    if not dry_run:
+        for start in range(0, len(corrections), batch_size):
+            await store.time_buckets.bulk_write(corrections[start:start + batch_size], ordered=False)
+        if corrections:
+            # Timesheet ETags follow the time entries, which may not have changed
+            await store.time_entries.invalidate()
+
+    return {
+        "checked": checked,
+        "drifted": len(drift),
+        "corrected": 0 if dry_run else len(drift),
+        "assigned": assigned,
+        "unbucketed": unbucketed,
+        "drift": drift,
+    }
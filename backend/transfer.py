@@ -0,0 +1,265 @@
+"""Bulk export and import of the tracker collections.
+
+Documents are streamed straight from Mongo cursors and written out in small
+buffered chunks, so memory stays flat regardless of collection size. Two
+formats are produced: NDJSON, one ``{"collection": ..., "document": ...}``
+record per line, and a chunked JSON object in the same shape the frontend's
+Settings page exports (``{"projects": [...], "timeEntries": [...], ...}``).
+
+Imports accept either format and write them back in unordered ``bulk_write``
+batches, reporting failures per batch instead of aborting the whole load.
+"""
+import json
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List
+
+from bson.objectid import ObjectId
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from database import Repository, store
+from search import SEARCH_FIELDS, TEXT_FIELDS, search_fields
+
+# Export names match the keys the frontend uses for its IndexedDB tables
+COLLECTIONS: Dict[str, Repository] = {
+    "projects": store.projects,
+    "sprints": store.sprints,
+    "tasks": store.tasks,
+    "bugs": store.bugs,
+    "timeEntries": store.time_entries,
+    "team": store.team,
+}
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+# Flush the output buffer once it grows past this many characters
+CHUNK_SIZE = 64 * 1024
+
+# Documents per cursor batch pulled from Mongo
+BATCH_SIZE = 1000
+
+# Stamped on every imported document so delta sync picks it up
+IMPORTED_AT = "importedAt"
+
+# Search terms are derived from the text fields and rebuilt on import; the
+# import stamp is bookkeeping for this database only
+EXPORT_PROJECTION = {"_id": 0, IMPORTED_AT: 0, **{field: 0 for field in SEARCH_FIELDS}}
+
+# Collections whose documents carry search terms
+SEARCH_COLLECTIONS = {"tasks", "bugs"}
+
+
+def json_default(value):
+    """Encode the BSON types json.dumps does not understand"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=json_default, separators=(",", ":"))
+
+
+def resolve_collections(names: str = None) -> List[str]:
+    """Validate a comma separated collection list, defaulting to all collections"""
+    if not names:
+        return list(COLLECTIONS)
+    requested = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in COLLECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown collections: {', '.join(unknown)}")
+    return requested
+
+
+async def _documents(name: str) -> AsyncIterator[dict]:
+    # _id is internal to this database; documents are addressed by id
+    async for doc in COLLECTIONS[name].iterate({}, EXPORT_PROJECTION, batch_size=BATCH_SIZE, analytics=True):
+        yield doc
+
+
+async def stream_ndjson(names: List[str]) -> AsyncIterator[str]:
+    buffer = []
+    size = 0
+    for name in names:
+        async for doc in _documents(name):
+            line = dumps({"collection": name, "document": doc}) + "\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+async def stream_json(names: List[str]) -> AsyncIterator[str]:
+    buffer = ["{"]
+    size = 1
+    for index, name in enumerate(names):
+        buffer.append(("," if index else "") + dumps(name) + ":[")
+        first = True
+        async for doc in _documents(name):
+            item = ("" if first else ",") + dumps(doc)
+            first = False
+            buffer.append(item)
+            size += len(item)
+            if size >= CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        buffer.append("]")
+    buffer.append("}")
+    yield "".join(buffer)
+
+
+def stream_export(names: List[str], export_format: str) -> AsyncIterator[str]:
+    if export_format == "json":
+        return stream_json(names)
+    return stream_ndjson(names)
+
+
+# Fields stored as BSON dates that exports write out as ISO strings
+DATETIME_FIELDS = ("createdAt", "updatedAt", "startDate", "endDate")
+
+
+def parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class Importer:
+    """Accumulates imported documents per collection and writes them in batches"""
+
+    def __init__(self, upsert: bool = False, batch_size: int = BATCH_SIZE):
+        self.upsert = upsert
+        self.batch_size = batch_size
+        self.pending: Dict[str, List[Dict[str, Any]]] = {name: [] for name in COLLECTIONS}
+        self.batch_counts = {name: 0 for name in COLLECTIONS}
+        self.totals = {name: {"received": 0, "written": 0, "failed": 0} for name in COLLECTIONS}
+        self.failed_batches: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.created_at = datetime.now()
+
+    def prepare(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        doc.pop("_id", None)
+        if not doc.get("id"):
+            doc["id"] = str(uuid.uuid4())
+        for field in DATETIME_FIELDS:
+            if isinstance(doc.get(field), str):
+                try:
+                    doc[field] = parse_datetime(doc[field])
+                except ValueError:
+                    pass
+        # One timestamp for the whole import keeps records in insertion order
+        doc.setdefault("createdAt", self.created_at)
+        # A valid incoming updatedAt is the record's own history; keep it
+        if not isinstance(doc.get("updatedAt"), datetime):
+            doc["updatedAt"] = self.created_at
+        # Imported documents are changes delta sync clients have not seen,
+        # whatever their updatedAt says
+        doc[IMPORTED_AT] = self.created_at
+        return doc
+
+    async def add(self, name: str, doc: Any, source: str) -> None:
+        if name not in COLLECTIONS:
+            self.errors.append({"source": source, "message": f"Unknown collection: {name}"})
+            return
+        if not isinstance(doc, dict):
+            self.errors.append({"source": source, "message": "Document must be a JSON object"})
+            return
+        self.totals[name]["received"] += 1
+        doc = self.prepare(doc)
+        if name in SEARCH_COLLECTIONS:
+            doc.update(search_fields({field: doc.get(field) for field in TEXT_FIELDS}))
+        self.pending[name].append(doc)
+        if len(self.pending[name]) >= self.batch_size:
+            await self.flush(name)
+
+    async def flush(self, name: str) -> None:
+        docs = self.pending[name]
+        if not docs:
+            return
+        self.pending[name] = []
+        self.batch_counts[name] += 1
+
+        if self.upsert:
+            operations = [ReplaceOne({"id": doc["id"]}, doc, upsert=True) for doc in docs]
+        else:
+            operations = [InsertOne(doc) for doc in docs]
+
+        try:
+            result = await COLLECTIONS[name].bulk_write(operations, ordered=False)
+            written = result.inserted_count + result.upserted_count + result.modified_count
+            write_errors = []
+        except BulkWriteError as exc:
+            details = exc.details
+            written = details.get("nInserted", 0) + details.get("nUpserted", 0) + details.get("nModified", 0)
+            write_errors = details.get("writeErrors", [])
+
+        failed = len(write_errors)
+        self.totals[name]["written"] += written
+        self.totals[name]["failed"] += failed
+        if failed:
+            self.failed_batches.append({
+                "collection": name,
+                "batch": self.batch_counts[name],
+                "size": len(docs),
+                "written": written,
+                "errors": [
+                    {
+                        "index": error["index"],
+                        "id": docs[error["index"]].get("id"),
+                        "code": error.get("code"),
+                        "message": error.get("errmsg"),
+                    }
+                    for error in write_errors
+                ],
+            })
+
+    async def load_ndjson(self, chunks: AsyncIterator[bytes]) -> None:
+        """Consume an NDJSON byte stream without holding more than one chunk"""
+        remainder = b""
+        line_number = 0
+        async for chunk in chunks:
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            for line in lines:
+                line_number += 1
+                await self.load_line(line, line_number)
+        if remainder:
+            await self.load_line(remainder, line_number + 1)
+
+    async def load_line(self, line: bytes, line_number: int) -> None:
+        if not line.strip():
+            return
+        source = f"line {line_number}"
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            self.errors.append({"source": source, "message": f"Invalid JSON: {exc}"})
+            return
+        if not isinstance(record, dict) or "collection" not in record or "document" not in record:
+            self.errors.append({"source": source, "message": "Expected {\"collection\": ..., \"document\": ...}"})
+            return
+        await self.add(record["collection"], record["document"], source)
+
+    async def load_json(self, data: Dict[str, Iterable[Any]]) -> None:
+        for name, docs in data.items():
+            if not isinstance(docs, list):
+                self.errors.append({"source": name, "message": "Expected a list of documents"})
+                continue
+            for index, doc in enumerate(docs):
+                await self.add(name, doc, f"{name}[{index}]")
+
+    async def finish(self) -> Dict[str, Any]:
+        for name in COLLECTIONS:
+            await self.flush(name)
+        return {
+            "collections": {name: totals for name, totals in self.totals.items() if totals["received"]},
+            "failedBatches": self.failed_batches,
+            "errors": self.errors,
+        }
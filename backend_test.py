@@ -192,8 +192,7 @@ class AgileTrackingAPITester:
         # Update the sprint
         update_data = {
             "name": f"Updated Sprint {datetime.now().strftime('%H%M%S')}",
-            "status": "Completed",
-            "acceptedPoints": 25  # Testing if acceptedPoints update works
+            "status": "Completed"
         }
         
         update_success, _ = self.run_test(
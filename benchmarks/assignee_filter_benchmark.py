@@ -0,0 +1,121 @@
+"""Round-trip benchmark for the assignee filter on GET /api/time-entries.
+
+Seeds a scratch database with tasks, bugs and time entries, then compares the
+previous per-entry lookup (one find_one per time entry) against the current
+handler, which prefetches the assignee's task and bug ids and filters in a
+single query. Mongo round trips are counted with a pymongo CommandListener:
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/assignee_filter_benchmark.py --entries 50000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import orjson
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "agile_tracker_bench")
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+# Must be registered before the Motor client in database.py is created
+monitoring.register(counter)
+
+from fastapi import Response  # noqa: E402
+
+import server  # noqa: E402
+from database import client, store  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from pagination import PageParams  # noqa: E402
+
+
+async def seed(entries, members=20):
+    member_ids = [str(uuid.uuid4()) for _ in range(members)]
+    tasks = [{"id": str(uuid.uuid4()), "projectId": "bench", "assigneeId": member_ids[i % members]} for i in range(members * 10)]
+    bugs = [{"id": str(uuid.uuid4()), "projectId": "bench", "assigneeId": member_ids[i % members]} for i in range(members * 5)]
+    await store.tasks.collection.insert_many(tasks)
+    await store.bugs.collection.insert_many(bugs)
+
+    time_entries = []
+    for i in range(entries):
+        is_task = i % 3 != 0
+        item = tasks[i % len(tasks)] if is_task else bugs[i % len(bugs)]
+        time_entries.append({
+            "id": str(uuid.uuid4()),
+            "taskId": item["id"],
+            "projectId": "bench",
+            "isTaskEntry": is_task,
+            "isBugEntry": not is_task,
+            "date": "2025-01-01",
+            "hours": 1,
+        })
+    await store.time_entries.collection.insert_many(time_entries)
+    return member_ids[0]
+
+
+async def per_entry_lookup(assignee_id):
+    """The filter as it was implemented before: one uncached find_one per time entry"""
+    matched = []
+    for entry in await store.time_entries.find_many({}):
+        items = store.tasks if entry.get("isTaskEntry", True) else store.bugs
+        item = await items.collection.find_one({"id": entry.get("taskId")})
+        if item and item.get("assigneeId") == assignee_id:
+            matched.append(entry)
+    return matched
+
+
+async def current_handler(assignee_id):
+    response = await server.get_time_entries(
+        Response(), assignee_id=assignee_id, page=PageParams(limit=None, after=None, fields=None)
+    )
+    return orjson.loads(response.body)
+
+
+async def measure(label, coro_factory):
+    counter.count = 0
+    start = time.perf_counter()
+    result = await coro_factory()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {len(result):>8} {counter.count:>12} {elapsed * 1000:>12.1f}")
+    return result
+
+
+async def main(entries, skip_baseline):
+    await client.drop_database(store.db.name)
+    await ensure_indexes(store.db)
+    print(f"Seeding {entries} time entries into {store.db.name}...")
+    assignee_id = await seed(entries)
+
+    print(f"\n{'strategy':<22} {'matched':>8} {'round trips':>12} {'elapsed ms':>12}")
+    current = await measure("prefetch ids + $in", lambda: current_handler(assignee_id))
+    if not skip_baseline:
+        baseline = await measure("per-entry find_one", lambda: per_entry_lookup(assignee_id))
+        assert len(baseline) == len(current)
+
+    await client.drop_database(store.db.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--skip-baseline", action="store_true", help="only run the current handler")
+    args = parser.parse_args()
+    asyncio.run(main(args.entries, args.skip_baseline))
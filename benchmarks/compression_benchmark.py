@@ -0,0 +1,84 @@
+"""Bytes-on-wire and CPU cost of response compression.
+
+Encodes representative /api/tasks and /api/time-entries payloads the way
+the API does and compresses them with every encoding and level the
+CompressionMiddleware can be configured with, reporting compressed size,
+ratio and CPU time per megabyte of input. No database is needed:
+
+    python benchmarks/compression_benchmark.py --documents 10000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from compression import SUPPORTED_ENCODINGS, BrotliEncoder, GzipEncoder  # noqa: E402
+from encoding_benchmark import make_tasks  # noqa: E402
+from serialization import dumps  # noqa: E402
+
+LEVELS = {
+    "gzip": [1, 6, 9],
+    "br": [1, 4, 11],
+}
+
+
+def make_time_entries(documents):
+    day = datetime(2025, 1, 6)
+    return [
+        {
+            "id": f"9b7e4c1d-0000-4000-8000-{i:012d}",
+            "taskId": f"3f1c2a9e-0000-4000-8000-{i % 2000:012d}",
+            "projectId": i % 20,
+            "sprintId": i % 50,
+            "isTaskEntry": i % 5 != 0,
+            "isBugEntry": i % 5 == 0,
+            "date": (day + timedelta(days=i % 90)).strftime("%Y-%m-%d"),
+            "hours": 1.5 + i % 6,
+            "description": "Worked on implementation and review",
+            "createdAt": day + timedelta(minutes=i),
+        }
+        for i in range(documents)
+    ]
+
+
+def compress(encoding, level, payload):
+    encoder = BrotliEncoder(level) if encoding == "br" else GzipEncoder(level)
+    return encoder.finish(payload)
+
+
+def measure(encoding, level, payload, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        compressed = compress(encoding, level, payload)
+    cpu = (time.process_time() - start) / repeat
+    megabytes = len(payload) / 1e6
+    print(
+        f"  {encoding:<5} {level:>5} {len(compressed):>12,} {len(payload) / len(compressed):>7.1f}x"
+        f" {cpu * 1000:>9.1f} {cpu * 1000 / megabytes:>9.1f}"
+    )
+
+
+def main(documents, repeat):
+    payloads = {
+        "/api/tasks": dumps(make_tasks(documents)),
+        "/api/time-entries": dumps(make_time_entries(documents)),
+    }
+    for route, payload in payloads.items():
+        print(f"\n{route}: {documents} documents, {len(payload):,} bytes uncompressed")
+        print(f"  {'enc':<5} {'level':>5} {'bytes':>12} {'ratio':>8} {'cpu ms':>9} {'ms/MB':>9}")
+        for encoding in SUPPORTED_ENCODINGS:
+            for level in LEVELS[encoding]:
+                measure(encoding, level, payload, repeat)
+    if "br" not in SUPPORTED_ENCODINGS:
+        print("\nbrotli is not installed; only gzip was measured")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.documents, args.repeat)
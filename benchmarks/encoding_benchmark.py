@@ -0,0 +1,91 @@
+"""Encoding throughput benchmark for list responses.
+
+Builds N task documents shaped like the ones Motor returns (ObjectId _id,
+datetime fields) and times the two ways a list endpoint can turn them into
+a response body: FastAPI's default path (format_document, jsonable_encoder
+and the stdlib json module) and FastJSONResponse (orjson over the raw
+documents). No database is needed:
+
+    python benchmarks/encoding_benchmark.py --documents 10000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from bson.objectid import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from serialization import FastJSONResponse  # noqa: E402
+from server import format_document  # noqa: E402
+
+STATUSES = ["New", "In Progress", "Testing", "Done"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+
+
+def make_tasks(documents):
+    created = datetime(2025, 1, 1, 9, 30, 15, 123000)
+    return [
+        {
+            "_id": ObjectId(),
+            "id": f"3f1c2a9e-0000-4000-8000-{i:012d}",
+            "projectId": i % 20,
+            "sprintId": i % 50,
+            "title": f"Implement feature {i}",
+            "description": "Representative task description with a few sentences of text. " * 3,
+            "status": STATUSES[i % len(STATUSES)],
+            "priority": PRIORITIES[i % len(PRIORITIES)],
+            "assigneeId": f"member-{i % 12}",
+            "assignee": f"Team Member {i % 12}",
+            "estimatedHours": 8,
+            "actualHours": 5.5,
+            "createdAt": created + timedelta(seconds=i),
+            "updatedAt": created + timedelta(seconds=i, minutes=5),
+        }
+        for i in range(documents)
+    ]
+
+
+def default_path(docs):
+    # What a handler returning formatted dicts costs under FastAPI's JSONResponse
+    content = jsonable_encoder([format_document(dict(doc)) for doc in docs])
+    return JSONResponse(content).body
+
+
+def fast_path(docs):
+    return FastJSONResponse(docs).body
+
+
+def measure(label, encode, docs, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(docs)
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    print(f"{label:<28} {median * 1000:>10.1f} {len(docs) / median:>14,.0f} {len(body) / median / 1e6:>10.1f}")
+    return body, median
+
+
+def main(documents, repeat):
+    docs = make_tasks(documents)
+    print(f"{'path':<28} {'median ms':>10} {'docs/s':>14} {'MB/s':>10}")
+    default_body, default_time = measure("jsonable_encoder + json", default_path, docs, repeat)
+    fast_body, fast_time = measure("orjson (FastJSONResponse)", fast_path, docs, repeat)
+    assert orjson.loads(default_body) == orjson.loads(fast_body), "encoders disagree"
+    print(f"\nspeedup: {default_time / fast_time:.1f}x, body {len(fast_body):,} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.documents, args.repeat)
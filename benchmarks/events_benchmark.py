@@ -0,0 +1,83 @@
+"""Fan-out latency of the /api/events change feed.
+
+Connects N in-process subscribers to an EventHub, half of them filtered to
+the project the changes belong to and half to another project. It then
+publishes change stream documents shaped like task updates, and reports
+the time from publishing a change to each matching subscriber receiving its
+frame, plus the publisher's own CPU time per change. No database is needed;
+the change stream itself is not exercised:
+
+    python benchmarks/events_benchmark.py --subscribers 1000 --changes 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from encoding_benchmark import make_tasks  # noqa: E402
+from events import EventHub, Subscription  # noqa: E402
+
+
+async def consume(subscription, changes, received):
+    for _ in range(changes):
+        await subscription.queue.get()
+        received.append(time.perf_counter())
+
+
+async def main(subscribers, changes):
+    hub = EventHub(store=None)
+    matching = []
+    for index in range(subscribers):
+        project_id = "1" if index % 2 == 0 else "2"
+        subscription = Subscription(project_id=project_id, queue_size=changes + 1)
+        hub.add(subscription)
+        if project_id == "1":
+            matching.append(subscription)
+
+    tasks = make_tasks(changes)
+    receipts = [[] for _ in matching]
+    consumers = [
+        asyncio.create_task(consume(subscription, changes, received))
+        for subscription, received in zip(matching, receipts)
+    ]
+    await asyncio.sleep(0)
+
+    published = []
+    publish_cpu = []
+    for task in tasks:
+        task["projectId"] = 1
+        change = {"operationType": "update", "ns": {"db": "bench", "coll": "tasks"}, "fullDocument": task}
+        published.append(time.perf_counter())
+        start = time.process_time()
+        hub.publish_change(change)
+        publish_cpu.append(time.process_time() - start)
+        # Let consumers drain between changes, as a live stream would
+        await asyncio.sleep(0)
+    await asyncio.gather(*consumers)
+
+    latencies = sorted(
+        (received[index] - published[index]) * 1000
+        for received in receipts
+        for index in range(changes)
+    )
+    last_delivery = [
+        (max(received[index] for received in receipts) - published[index]) * 1000
+        for index in range(changes)
+    ]
+    print(f"subscribers {subscribers} ({len(matching)} matching), changes {changes}")
+    print(f"publish CPU per change       {statistics.median(publish_cpu) * 1000:>8.3f} ms")
+    print(f"delivery latency p50         {latencies[len(latencies) // 2]:>8.3f} ms")
+    print(f"delivery latency p99         {latencies[int(len(latencies) * 0.99)]:>8.3f} ms")
+    print(f"last subscriber, median      {statistics.median(last_delivery):>8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--changes", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.changes))
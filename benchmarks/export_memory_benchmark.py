@@ -0,0 +1,71 @@
+"""Peak memory benchmark for the streaming /api/export endpoint.
+
+Seeds a scratch database with N tasks, drains the export stream in process
+and reports peak RSS, so runs at different N can be compared:
+
+    python benchmarks/export_memory_benchmark.py --documents 1000
+    python benchmarks/export_memory_benchmark.py --documents 1000000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "agile_tracker_bench")
+
+from database import client, store  # noqa: E402
+from transfer import stream_export  # noqa: E402
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def seed(documents, batch=10000):
+    for start in range(0, documents, batch):
+        await store.tasks.collection.insert_many([
+            {
+                "id": f"task-{i}",
+                "projectId": "bench",
+                "title": f"Benchmark task {i}",
+                "description": "Representative task description " * 4,
+                "status": "In Progress",
+                "priority": "Medium",
+                "estimatedHours": 4,
+                "actualHours": 2,
+                "createdAt": datetime.now(),
+            }
+            for i in range(start, min(start + batch, documents))
+        ])
+
+
+async def main(documents, export_format):
+    await client.drop_database(store.db.name)
+    await seed(documents)
+    baseline = peak_rss_mb()
+
+    written = 0
+    start = time.perf_counter()
+    async for chunk in stream_export(["tasks"], export_format):
+        written += len(chunk)
+    elapsed = time.perf_counter() - start
+
+    print(f"documents:      {documents}")
+    print(f"bytes streamed: {written}")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"peak RSS:       {peak_rss_mb():.1f} MB (after seeding: {baseline:.1f} MB)")
+
+    await client.drop_database(store.db.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson")
+    args = parser.parse_args()
+    asyncio.run(main(args.documents, args.format))
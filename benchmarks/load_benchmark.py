@@ -0,0 +1,119 @@
+"""Load benchmark for the Agile Tracker API.
+
+Seeds a project with tasks, then hammers a mix of list and detail endpoints at
+1, 16 and 128 concurrent clients and reports requests/sec and latency
+percentiles. Point it at a running backend (``uvicorn server:app`` from the
+backend directory) that is connected to a local mongod or a mongomock-style
+stand-in:
+
+    python benchmarks/load_benchmark.py --base-url http://localhost:8001/api
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+
+class LoadBenchmark:
+    def __init__(self, base_url, requests_per_level=2000, seed_tasks=200):
+        self.base_url = base_url.rstrip("/")
+        self.requests_per_level = requests_per_level
+        self.seed_tasks = seed_tasks
+        self.project_id = None
+        self.task_ids = []
+        self._local = threading.local()
+
+    def session(self):
+        """One keep-alive session per worker thread"""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def seed(self):
+        """Create a project with tasks to read back during the run"""
+        response = requests.post(f"{self.base_url}/projects", json={
+            "name": f"Load Benchmark {datetime.now().strftime('%Y%m%d%H%M%S')}",
+            "status": "In Progress",
+            "priority": "Medium",
+            "startDate": "2025-01-01",
+            "endDate": "2025-12-31"
+        })
+        response.raise_for_status()
+        self.project_id = response.json()["id"]
+
+        for i in range(self.seed_tasks):
+            response = requests.post(f"{self.base_url}/tasks", json={
+                "projectId": self.project_id,
+                "title": f"Benchmark task {i}",
+                "status": "In Progress",
+                "priority": "Medium",
+                "estimatedHours": 4,
+                "actualHours": 0
+            })
+            response.raise_for_status()
+            self.task_ids.append(response.json()["id"])
+
+    def cleanup(self):
+        for task_id in self.task_ids:
+            requests.delete(f"{self.base_url}/tasks/{task_id}")
+        if self.project_id:
+            requests.delete(f"{self.base_url}/projects/{self.project_id}")
+
+    def request(self, i):
+        """Issue one request from the read mix and return its latency in ms"""
+        if i % 4 == 0:
+            url = f"{self.base_url}/tasks"
+        else:
+            url = f"{self.base_url}/tasks/{self.task_ids[i % len(self.task_ids)]}"
+        start = time.perf_counter()
+        response = self.session().get(url)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+        return elapsed
+
+    def run_level(self, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            latencies = list(executor.map(self.request, range(self.requests_per_level)))
+            duration = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            "concurrency": concurrency,
+            "rps": self.requests_per_level / duration,
+            "p50": statistics.median(latencies),
+            "p99": latencies[int(len(latencies) * 0.99) - 1],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001/api")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--seed-tasks", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    args = parser.parse_args()
+
+    benchmark = LoadBenchmark(args.base_url, args.requests, args.seed_tasks)
+    print(f"Seeding {args.seed_tasks} tasks at {benchmark.base_url}...")
+    benchmark.seed()
+
+    try:
+        print(f"\n{'clients':>8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for concurrency in args.concurrency:
+            result = benchmark.run_level(concurrency)
+            print(f"{result['concurrency']:>8} {result['rps']:>10.1f} {result['p50']:>10.2f} {result['p99']:>10.2f}")
+    finally:
+        benchmark.cleanup()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Validation and serialization cost of the response models.
+
+Times, over N task documents shaped like the ones Mongo returns, the ways a
+handler can turn them into a response body: full Pydantic validation (what
+a response_model costs when handlers return dicts), the trusted
+model_construct path used by detail endpoints, and the projected raw
+documents encoded with orjson that list endpoints return. No database is
+needed:
+
+    python benchmarks/model_benchmark.py --documents 10000 --repeat 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from encoding_benchmark import make_tasks  # noqa: E402
+from models import Task, projection  # noqa: E402
+from serialization import dumps  # noqa: E402
+
+TASK_LIST = TypeAdapter(List[Task])
+
+
+def project(docs):
+    fields = [name for name, include in projection(Task).items() if include]
+    return [{name: doc[name] for name in fields if name in doc} for doc in docs]
+
+
+def validate(docs):
+    return TASK_LIST.validate_python(docs)
+
+
+def validate_and_serialize(docs):
+    return TASK_LIST.dump_json(TASK_LIST.validate_python(docs))
+
+
+def construct(docs):
+    return [Task.model_construct(**doc) for doc in docs]
+
+
+def construct_and_serialize(docs):
+    return TASK_LIST.dump_json([Task.model_construct(**doc) for doc in docs])
+
+
+def raw_orjson(docs):
+    return dumps(docs)
+
+
+def measure(label, run, docs, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(docs)
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    print(f"{label:<34} {median * 1000:>10.1f} {len(docs) / median:>14,.0f}")
+
+
+def main(documents, repeat):
+    # Mongo applies the projection, so the raw path starts from projected documents
+    docs = project(make_tasks(documents))
+    print(f"{'path':<34} {'median ms':>10} {'docs/s':>14}")
+    measure("validate", validate, docs, repeat)
+    measure("validate + serialize", validate_and_serialize, docs, repeat)
+    measure("model_construct", construct, docs, repeat)
+    measure("model_construct + serialize", construct_and_serialize, docs, repeat)
+    measure("projected raw docs + orjson", raw_orjson, docs, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    main(args.documents, args.repeat)
@@ -0,0 +1,153 @@
+"""Latency benchmark for GET /api/search on a synthetic corpus.
+
+Seeds a scratch database with tasks and bugs whose titles and descriptions
+are drawn from a Zipf-distributed vocabulary, so a few words are very common
+and most are rare, as in real tracker text. It then times the search handler
+for a mix of query shapes (a common word, a rare word, two words, an
+autocomplete prefix, a word followed by a prefix, and a word filtered to one
+project) and reports p50 / p95 latency per shape against a p95 target:
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/search_benchmark.py --documents 1000000
+
+Seeding a million documents takes a few minutes; pass --keep to reuse the
+corpus on later runs.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "agile_tracker_search_bench")
+
+from database import client, store  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from search import search, search_fields  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vo", "zi", "per", "tran", "log", "sync", "dat", "ex"]
+STATUSES = ["New", "In Progress", "Testing", "Done"]
+PROJECTS = 50
+SPRINTS_PER_PROJECT = 10
+INSERT_BATCH = 10000
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Corpus:
+    def __init__(self, vocabulary_size, seed):
+        self.rng = random.Random(seed)
+        self.vocabulary = make_vocabulary(vocabulary_size, self.rng)
+        # Zipf weights: the n-th most common word appears about 1/n as often as the first
+        self.cumulative = list(itertools.accumulate(1 / rank for rank in range(1, vocabulary_size + 1)))
+
+    def words(self, count):
+        return " ".join(self.rng.choices(self.vocabulary, cum_weights=self.cumulative, k=count))
+
+    def document(self, index, created):
+        project = index % PROJECTS
+        doc = {
+            "id": str(uuid.uuid4()),
+            "projectId": project,
+            "sprintId": f"sprint-{project}-{index % SPRINTS_PER_PROJECT}",
+            "title": self.words(self.rng.randint(4, 8)).capitalize(),
+            "description": self.words(self.rng.randint(15, 40)),
+            "status": STATUSES[index % len(STATUSES)],
+            "priority": "Medium",
+            "estimatedHours": 8,
+            "actualHours": 0,
+            "createdAt": created + timedelta(seconds=index),
+        }
+        if index % 2:
+            doc["severity"] = "Minor"
+        doc.update(search_fields(doc))
+        return doc
+
+
+async def seed(corpus, documents):
+    created = datetime(2025, 1, 1)
+    start = time.perf_counter()
+    for offset in range(0, documents, INSERT_BATCH):
+        batch = [corpus.document(index, created) for index in range(offset, min(offset + INSERT_BATCH, documents))]
+        tasks = [doc for doc in batch if "severity" not in doc]
+        bugs = [doc for doc in batch if "severity" in doc]
+        await asyncio.gather(
+            store.tasks.collection.insert_many(tasks, ordered=False),
+            store.bugs.collection.insert_many(bugs, ordered=False),
+        )
+        print(f"\r  {offset + len(batch):>9} documents", end="", flush=True)
+    print(f"\n  seeded in {time.perf_counter() - start:.0f} s")
+
+
+def query_shapes(corpus, rng):
+    # The vocabulary is in rank order: its first words are the most frequent
+    common = corpus.vocabulary[:20]
+    rare = corpus.vocabulary[len(corpus.vocabulary) // 2:]
+    return {
+        "common word": lambda: {"q": rng.choice(common) + " "},
+        "rare word": lambda: {"q": rng.choice(rare) + " "},
+        "two words": lambda: {"q": f"{rng.choice(common)} {rng.choice(rare)} "},
+        "prefix": lambda: {"q": rng.choice(rare)[:3]},
+        "word + prefix": lambda: {"q": f"{rng.choice(common)} {rng.choice(rare)[:3]}"},
+        "word, one project": lambda: {"q": rng.choice(common) + " ", "project_id": str(rng.randrange(PROJECTS))},
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def main(documents, queries, target_ms, keep, seed_value):
+    corpus = Corpus(vocabulary_size=20000, seed=seed_value)
+    existing = await store.tasks.collection.estimated_document_count() + await store.bugs.collection.estimated_document_count()
+    if not keep or existing != documents:
+        await client.drop_database(store.db.name)
+        await ensure_indexes(store.db)
+        print(f"Seeding {documents} tasks and bugs into {store.db.name}...")
+        await seed(corpus, documents)
+    else:
+        print(f"Reusing {existing} documents in {store.db.name}")
+
+    rng = random.Random(seed_value)
+    print(f"\n{'query':<20} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'avg hits':>9}  p95 <= {target_ms:g} ms")
+    for label, make_params in query_shapes(corpus, rng).items():
+        # Warm the indexes this shape reads before timing it
+        for _ in range(3):
+            await search(**make_params())
+        latencies, totals = [], []
+        for _ in range(queries):
+            params = make_params()
+            start = time.perf_counter()
+            result = await search(**params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            totals.append(result["total"])
+        p95 = percentile(latencies, 0.95)
+        verdict = "ok" if p95 <= target_ms else "SLOW"
+        print(
+            f"{label:<20} {percentile(latencies, 0.5):>9.1f} {p95:>9.1f} {max(latencies):>9.1f} "
+            f"{sum(totals) / len(totals):>9.0f}  {verdict}"
+        )
+
+    if not keep:
+        await client.drop_database(store.db.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=100, help="timed queries per shape")
+    parser.add_argument("--target-ms", type=float, default=100, help="p95 latency target per shape")
+    parser.add_argument("--keep", action="store_true", help="keep the corpus and reuse it on the next run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args.documents, args.queries, args.target_ms, args.keep, args.seed))
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+# Never point the suite at the application database
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "agile_tracker_test")
+
+# Commands that are a database round trip on behalf of a handler
+ROUND_TRIP_COMMANDS = {
+    "find", "getMore", "insert", "update", "delete", "findAndModify", "aggregate", "distinct", "count",
+}
+
+try:
+    from pymongo import monitoring
+except ImportError:
+    monitoring = None
+
+
+class CommandRecorder(monitoring.CommandListener if monitoring else object):
+    """Records (command, collection) pairs for every round trip a test issues"""
+
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        if event.command_name in ROUND_TRIP_COMMANDS:
+            self.commands[(event.command_name, event.command.get(event.command_name))] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.commands.clear()
+
+    @property
+    def total(self):
+        return sum(self.commands.values())
+
+
+command_recorder = CommandRecorder()
+if monitoring:
+    # Registered before database.py creates its client so every command is seen
+    monitoring.register(command_recorder)
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run a coroutine on the single event loop the Motor client is bound to"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def database(run):
+    pytest.importorskip("motor")
+    from database import client, db
+
+    async def ping():
+        # Created inside the loop so Motor binds to it rather than the default loop
+        await asyncio.wait_for(client.admin.command("ping"), timeout=2)
+
+    try:
+        run(ping())
+    except Exception as exc:
+        pytest.skip(f"MongoDB not reachable at {os.environ.get('MONGO_URL', 'localhost')}: {exc}")
+
+    yield db
+    run(client.drop_database(db.name))
+
+
+@pytest.fixture
+def clean_db(run, database):
+    """An empty test database with the application indexes provisioned"""
+    from database import store
+    from indexes import ensure_indexes
+
+    for name in run(database.list_collection_names()):
+        run(database[name].drop())
+    run(ensure_indexes(database))
+    # Tests seed collections directly, behind the repositories' cache
+    run(store.cache.clear())
+    return database
+
+
+@pytest.fixture
+def round_trips(clean_db):
+    """Counts Mongo round trips issued after the fixture is set up"""
+    command_recorder.reset()
+    return command_recorder
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from batch import MAX_OPERATIONS, Batch, BatchOperation  # noqa: E402
+from database import store  # noqa: E402
+from sprint_rollups import merge_deltas, reconcile_sprint_rollups  # noqa: E402
+
+
+def operation(op, collection, id=None, **data):
+    return BatchOperation(op=op, collection=collection, id=id, data=data)
+
+
+def test_merge_deltas_sums_per_sprint():
+    merged = merge_deltas([
+        {"s1": {"rollup.itemCount": -1}, "s2": {"rollup.itemCount": 1}},
+        {"s1": {"rollup.itemCount": 1}, "s2": {"rollup.doneHours": 4}},
+    ])
+    assert merged == {"s2": {"rollup.itemCount": 1, "rollup.doneHours": 4}}
+
+
+def test_invalid_operations_fail_individually(run):
+    result = run(Batch([
+        operation("create", "tasks", title="No status"),
+        operation("update", "tasks"),
+        operation("update", "timeEntries", "e1", hours=2),
+    ]).run())
+    assert [item["status"] for item in result["results"]] == [422, 400, 400]
+    assert {error["loc"][-1] for error in result["results"][0]["error"]} == {"projectId", "status", "priority"}
+    assert result["failed"] == 3
+
+
+def test_oversized_batches_are_rejected():
+    body = {"operations": [{"op": "delete", "collection": "tasks", "id": "t"}] * (MAX_OPERATIONS + 1)}
+    assert TestClient(server.app).post("/api/batch", json=body).status_code == 422
+
+
+def test_board_reshuffle_writes_each_task_once(run, clean_db, round_trips):
+    run(clean_db.sprints.insert_many([{"id": "s1", "status": "Active"}, {"id": "s2", "status": "Planning"}]))
+    created = run(Batch([
+        operation("create", "tasks", projectId=1, sprintId="s1", title=f"T{n}", status="New", priority="Low", actualHours=2)
+        for n in range(50)
+    ]).run())
+    assert created["succeeded"] == 50
+    ids = [item["id"] for item in created["results"]]
+
+    round_trips.reset()
+    moved = run(Batch([operation("update", "tasks", task_id, sprintId="s2", status="Done") for task_id in ids]).run())
+    assert moved["succeeded"] == 50
+    assert moved["results"][0]["document"]["sprintId"] == "s2"
+    if run(store.supports_transactions()):
+        # One read of the pre-images and one bulk write, in a transaction
+        expected = {("find", "tasks"): 1, ("update", "tasks"): 1}
+    else:
+        # Without transactions each update returns its own pre-image
+        expected = {("findAndModify", "tasks"): 50}
+    # Both sprints' rollups are one write
+    assert dict(round_trips.commands) == {**expected, ("update", "sprints"): 1}
+
+    s2 = run(clean_db.sprints.find_one({"id": "s2"}))
+    assert s2["rollup"]["itemCount"] == 50 and s2["rollup"]["doneHours"] == 100
+    assert run(reconcile_sprint_rollups(dry_run=True))["drifted"] == 0
+
+
+def test_mixed_batch_reports_each_operation(run, clean_db):
+    run(clean_db.sprints.insert_one({"id": "s1", "status": "Active"}))
+    run(clean_db.tasks.insert_many([
+        {"id": "t1", "projectId": 1, "sprintId": "s1", "title": "T1", "status": "Done", "actualHours": 3},
+        {"id": "t2", "projectId": 1, "sprintId": "s1", "title": "T2", "status": "New"},
+    ]))
+    run(clean_db.bugs.insert_one({"id": "b1", "taskId": "t2", "title": "B"}))
+    run(clean_db.time_entries.insert_one({"id": "e1", "taskId": "t2", "hours": 1}))
+    run(reconcile_sprint_rollups())
+
+    result = run(Batch([
+        operation("create", "timeEntries", taskId="t1", projectId=1, hours=5, date="2025-01-01"),
+        operation("delete", "tasks", "t2"),
+        operation("update", "tasks", "missing", status="Done"),
+        operation(
+            "create", "projects", name="P", status="Active", priority="High", startDate="2025-01-01", endDate="2025-03-31",
+        ),
+    ]).run())
+
+    assert [item["status"] for item in result["results"]] == [201, 200, 404, 201]
+    assert run(clean_db.tasks.find_one({"id": "t1"}))["actualHours"] == 8
+    # The single-delete cascades ran for the deleted task
+    assert run(clean_db.bugs.find_one({"id": "b1"}))["taskId"] is None
+    assert run(clean_db.time_entries.count_documents({"taskId": "t2"})) == 0
+    assert run(reconcile_sprint_rollups(dry_run=True))["drifted"] == 0
+
+
+def test_racing_deletes_of_one_entry_subtract_its_hours_once(run, clean_db):
+    run(clean_db.sprints.insert_one({"id": "s1", "status": "Active"}))
+    run(clean_db.tasks.insert_one({"id": "t1", "projectId": 1, "sprintId": "s1", "title": "T", "status": "Done"}))
+    created = run(Batch([operation("create", "timeEntries", taskId="t1", projectId=1, hours=4, date="2025-01-01")]).run())
+    entry_id = created["results"][0]["id"]
+    run(clean_db.tasks.update_one({"id": "t1"}, {"$set": {"actualHours": 10}}))
+    run(reconcile_sprint_rollups())
+
+    async def delete_twice():
+        return await asyncio.gather(*[
+            Batch([operation("delete", "timeEntries", entry_id)]).run() for _ in range(2)
+        ])
+
+    results = run(delete_twice())
+    assert sorted(result["results"][0]["status"] for result in results) == [200, 404]
+    assert run(clean_db.tasks.find_one({"id": "t1"}))["actualHours"] == 6
+    assert run(clean_db.tombstones.count_documents({"id": entry_id})) == 1
+    assert run(reconcile_sprint_rollups(dry_run=True))["drifted"] == 0
@@ -0,0 +1,119 @@
+import asyncio
+
+import orjson
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import Response  # noqa: E402
+
+import server  # noqa: E402
+from cache import MISSING, LRUCache  # noqa: E402
+from database import store  # noqa: E402
+from models import Sprint, Task, TaskUpdate  # noqa: E402
+from pagination import PageParams  # noqa: E402
+
+
+def list_tasks(run):
+    response = run(server.get_tasks(Response(), page=PageParams(limit=None, after=None, fields=None)))
+    return orjson.loads(response.body)
+
+
+def get_task(run, task_id):
+    return orjson.loads(run(server.get_task(task_id, Response())).body)
+
+
+def test_lru_evicts_least_recently_used(run):
+    cache = LRUCache(max_entries=2, ttl=60)
+    run(cache.set("a", 1))
+    run(cache.set("b", 2))
+    assert run(cache.get("a")) == 1
+    run(cache.set("c", 3))
+    assert run(cache.get("b")) is MISSING
+    assert run(cache.get("a")) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+
+def test_lru_expires_entries(run):
+    cache = LRUCache(max_entries=10, ttl=0.000001)
+    run(cache.set("a", 1))
+    assert run(cache.get("a")) is MISSING
+    assert cache.stats()["expirations"] == 1
+
+
+def test_repeat_reads_are_served_from_cache(run, round_trips):
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    round_trips.reset()
+
+    for _ in range(3):
+        assert get_task(run, task["id"])["title"] == "T"
+        assert len(list_tasks(run)) == 1
+    assert round_trips.total == 2
+
+
+def test_writes_invalidate_entity_and_lists(run, round_trips):
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    run(server.get_task(task["id"], Response()))
+    list_tasks(run)
+
+    run(server.update_task(task["id"], TaskUpdate(title="Renamed")))
+    assert get_task(run, task["id"])["title"] == "Renamed"
+    assert list_tasks(run)[0]["title"] == "Renamed"
+
+    run(server.create_task(Task(projectId=1, title="Second", status="New", priority="Low")))
+    assert len(list_tasks(run)) == 2
+
+    run(server.delete_task(task["id"]))
+    with pytest.raises(server.HTTPException):
+        run(server.get_task(task["id"], Response()))
+
+
+def test_cascades_invalidate_related_collections(run, round_trips):
+    sprint = run(server.create_sprint(Sprint(projectId=1, name="S", status="Active", startDate="2025-01-06", endDate="2025-01-20")))
+    task = run(server.create_task(Task(projectId=1, sprintId=sprint["id"], title="T", status="New", priority="Low")))
+    assert get_task(run, task["id"])["sprintId"] == sprint["id"]
+
+    run(server.delete_sprint(sprint["id"]))
+    assert get_task(run, task["id"])["sprintId"] is None
+
+
+def test_cached_documents_are_not_shared_with_callers(run, round_trips):
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    run(store.tasks.get(task["id"]))["title"] = "Mutated"
+    assert run(store.tasks.get(task["id"]))["title"] == "T"
+
+
+def test_a_load_racing_an_update_does_not_cache_the_old_document(run, round_trips):
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+
+    async def slow_read_during_update():
+        loaded = asyncio.Event()
+        updated = asyncio.Event()
+
+        async def load():
+            doc = await store.tasks.collection.find_one({"id": task["id"]})
+            loaded.set()
+            # The update commits and invalidates before this load returns
+            await updated.wait()
+            return doc
+
+        async def update():
+            await loaded.wait()
+            await store.tasks.update(task["id"], {"title": "Renamed"})
+            updated.set()
+
+        key = await store.tasks._entity_key(task["id"])
+        stale, _ = await asyncio.gather(store.tasks._cached(key, load), update())
+        return stale
+
+    assert run(slow_read_during_update())["title"] == "T"
+    assert run(store.tasks.get(task["id"]))["title"] == "Renamed"
+
+
+def test_details_return_the_stored_fields_only(run, clean_db):
+    run(clean_db.tasks.insert_one({"id": "t1", "projectId": 1, "title": "Imported", "titleTerms": ["imported"]}))
+    task = get_task(run, "t1")
+    # Nothing filled in from model defaults, nothing internal leaked
+    assert task == {"id": "t1", "projectId": 1, "title": "Imported"}
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+import server  # noqa: E402
+
+LINKED_ITEMS = 2000
+
+
+def test_delete_sprint_detaches_items_without_loading_them(run, clean_db, round_trips):
+    run(clean_db.sprints.insert_one({"id": "s1", "name": "Sprint"}))
+    run(clean_db.tasks.insert_many([{"id": f"t{i}", "sprintId": "s1"} for i in range(LINKED_ITEMS)]))
+    run(clean_db.bugs.insert_many([{"id": f"b{i}", "sprintId": "s1"} for i in range(10)]))
+    round_trips.reset()
+
+    result = run(server.delete_sprint("s1"))
+
+    assert result["affected"] == {"tasks": LINKED_ITEMS, "bugs": 10}
+    assert run(clean_db.tasks.count_documents({"sprintId": "s1"})) == 0
+    assert run(clean_db.sprints.count_documents({})) == 0
+    # One delete and its tombstone plus one update per related collection, no reads of the items
+    assert dict(round_trips.commands) == {
+        ("findAndModify", "sprints"): 1,
+        ("insert", "tombstones"): 1,
+        ("update", "tasks"): 1,
+        ("update", "bugs"): 1,
+    }
+
+
+def test_delete_task_cascades(run, clean_db):
+    run(clean_db.tasks.insert_one({"id": "t1", "title": "Task"}))
+    run(clean_db.bugs.insert_many([{"id": "b1", "taskId": "t1"}, {"id": "b2", "taskId": "other"}]))
+    run(clean_db.time_entries.insert_many([{"id": f"e{i}", "taskId": "t1", "hours": 1} for i in range(3)]))
+
+    result = run(server.delete_task("t1"))
+
+    assert result["affected"] == {"bugs": 1, "timeEntries": 3}
+    assert run(clean_db.bugs.find_one({"id": "b1"}))["taskId"] is None
+    assert run(clean_db.bugs.find_one({"id": "b2"}))["taskId"] == "other"
+    assert run(clean_db.time_entries.count_documents({})) == 0
+
+
+def test_delete_bug_and_team_member_cascade(run, clean_db):
+    run(clean_db.bugs.insert_one({"id": "b1"}))
+    run(clean_db.time_entries.insert_many([
+        {"id": "e1", "taskId": "b1", "isBugEntry": True},
+        {"id": "e2", "taskId": "b1", "isBugEntry": False},
+    ]))
+    assert run(server.delete_bug("b1"))["affected"] == {"timeEntries": 1}
+
+    run(clean_db.team.insert_one({"id": "m1", "name": "Member"}))
+    run(clean_db.tasks.insert_one({"id": "t1", "assigneeId": "m1", "assignee": "Member"}))
+    assert run(server.delete_team_member("m1"))["affected"] == {"tasks": 1, "bugs": 0}
+    assert run(clean_db.tasks.find_one({"id": "t1"}))["assignee"] is None
+
+
+def test_missing_sprint_leaves_items_untouched(run, clean_db):
+    run(clean_db.tasks.insert_one({"id": "t1", "sprintId": "missing"}))
+    with pytest.raises(HTTPException):
+        run(server.delete_sprint("missing"))
+    assert run(clean_db.tasks.find_one({"id": "t1"}))["sprintId"] == "missing"
@@ -0,0 +1,91 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from compression import CompressionMiddleware, negotiate, parse_encodings  # noqa: E402
+
+
+def make_app(chunks, headers=None):
+    async def app(scope, receive, send):
+        raw = [(b"content-type", b"application/json")] + (headers or [])
+        if len(chunks) == 1:
+            raw.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": raw})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+
+def call(run, app, accept_encoding="gzip", **options):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    run(CompressionMiddleware(app, encodings=("gzip",), **options)(scope, receive, send))
+    headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return headers, body
+
+
+def test_negotiation():
+    assert negotiate("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0", ("br", "gzip")) == "gzip"
+    assert negotiate("*", ("gzip",)) == "gzip"
+    assert negotiate("identity", ("br", "gzip")) is None
+    assert negotiate("", ("gzip",)) is None
+
+
+def test_parse_encodings():
+    assert parse_encodings("none") == ()
+    assert parse_encodings(" GZIP ") == ("gzip",)
+    assert parse_encodings(None)
+
+
+def test_large_responses_are_compressed(run):
+    payload = b'{"status":"In Progress"},' * 200
+    headers, body = call(run, make_app([payload]), minimum_size=1024)
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body) < len(payload)
+    assert gzip.decompress(body) == payload
+
+
+def test_compressed_responses_get_weak_etags(run):
+    payload = b'{"status":"In Progress"},' * 200
+    headers, _ = call(run, make_app([payload], [(b"etag", b'"a.1"')]))
+    assert headers["etag"] == 'W/"a.1"'
+    headers, _ = call(run, make_app([b"{}"], [(b"etag", b'"a.1"')]))
+    assert headers["etag"] == '"a.1"'
+
+
+def test_small_responses_are_left_alone(run):
+    headers, body = call(run, make_app([b'{"ok":true}']), minimum_size=1024)
+    assert "content-encoding" not in headers
+    assert body == b'{"ok":true}'
+
+
+def test_clients_without_gzip_get_identity(run):
+    payload = b"x" * 4096
+    headers, body = call(run, make_app([payload]), accept_encoding="identity")
+    assert "content-encoding" not in headers and body == payload
+
+
+def test_streaming_responses_are_compressed_per_chunk(run):
+    chunks = [b'{"id":%d,"status":"Done"}\n' % i * 50 for i in range(5)] + [b""]
+    headers, body = call(run, make_app(chunks), minimum_size=1024)
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert gzip.decompress(body) == b"".join(chunks)
+
+
+def test_precompressed_responses_pass_through(run):
+    payload = gzip.compress(b"x" * 4096)
+    headers, body = call(run, make_app([payload], [(b"content-encoding", b"gzip")]), minimum_size=10)
+    assert body == payload
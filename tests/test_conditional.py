@@ -0,0 +1,101 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException, Response  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+import server  # noqa: E402
+from conditional import Conditional, etag_matches, last_modified  # noqa: E402
+from database import store  # noqa: E402
+from models import Task, TaskUpdate, TeamMember, TimeEntry  # noqa: E402
+from time_buckets import record_entries  # noqa: E402
+
+
+def request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_etag_matching():
+    assert etag_matches('"a.1"', '"a.1"')
+    assert etag_matches('W/"a.1", "b.2"', '"a.1"')
+    assert etag_matches("*", '"a.1"')
+    assert not etag_matches('"a.2"', '"a.1"')
+    assert not etag_matches(None, '"a.1"')
+
+
+def test_last_modified_prefers_updated_at():
+    doc = {"createdAt": datetime(2024, 1, 1), "updatedAt": datetime(2024, 3, 5, 10, 30)}
+    assert last_modified(doc) == "Tue, 05 Mar 2024 10:30:00 GMT"
+    assert last_modified({"createdAt": datetime(2024, 1, 1)}) == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert last_modified({}) is None
+
+
+def test_matching_etag_answers_304_without_reading(run, round_trips):
+    conditional = Conditional(store.tasks)
+    response = Response()
+    etag = run(conditional(request(), response))
+    assert response.headers["ETag"] == etag
+
+    round_trips.reset()
+    with pytest.raises(HTTPException) as exc:
+        run(conditional(request(etag), Response()))
+    assert exc.value.status_code == 304
+    assert exc.value.headers["ETag"] == etag
+    assert round_trips.total == 0
+
+
+def test_writes_change_the_etag(run, clean_db):
+    conditional = Conditional(store.tasks)
+    before = run(conditional.etag())
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    after_create = run(conditional.etag())
+    assert after_create != before
+
+    run(server.update_task(task["id"], TaskUpdate(status="Done")))
+    assert run(conditional.etag()) != after_create
+    # An unrelated collection's tag is untouched
+    assert run(Conditional(store.projects).etag()) == run(Conditional(store.projects).etag())
+
+
+def test_cascades_change_dependent_etags(run, clean_db):
+    member = run(server.create_team_member(TeamMember(name="M", role="Dev", capacity=40)))
+    run(server.create_task(Task(projectId=1, title="T", status="New", assigneeId=member["id"], priority="Low")))
+    tasks = Conditional(store.tasks)
+    before = run(tasks.etag())
+    run(server.delete_team_member(member["id"]))
+    assert run(tasks.etag()) != before
+
+
+def test_logging_time_changes_the_task_etag_only_when_done(run, clean_db):
+    tasks = Conditional(store.tasks)
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    before = run(tasks.etag())
+    run(server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, hours=2, date="2025-01-06")))
+    assert run(tasks.etag()) == before
+
+    run(server.update_task(task["id"], TaskUpdate(status="Done")))
+    before = run(tasks.etag())
+    run(server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, hours=2, date="2025-01-06")))
+    assert run(tasks.etag()) != before
+    assert run(clean_db.tasks.find_one({"id": task["id"]}))["actualHours"] == 2
+
+
+def test_bucket_writes_change_the_timesheet_etag(run, clean_db):
+    # Entries are written before their buckets, so the tag must move again after
+    timesheet = Conditional(store.time_entries)
+    before = run(timesheet.etag())
+    entry = {"projectId": 1, "sprintId": "s1", "assigneeId": "m1", "date": "2025-01-06", "hours": 2}
+    run(record_entries([entry]))
+    assert run(timesheet.etag()) != before
+
+
+def test_detail_sets_last_modified(run, clean_db):
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    response = Response()
+    run(server.get_task(task["id"], response))
+    assert response.headers["Last-Modified"] == last_modified(task)
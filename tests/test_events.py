@@ -0,0 +1,121 @@
+import asyncio
+
+import orjson
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+import server  # noqa: E402
+from database import store  # noqa: E402
+from events import EventHub, Subscription, frame, stream_events  # noqa: E402
+from models import Task  # noqa: E402
+
+
+def change(operation, collection="tasks", after=None, before=None):
+    return {
+        "operationType": operation,
+        "ns": {"db": "test", "coll": collection},
+        "fullDocument": after,
+        "fullDocumentBeforeChange": before,
+    }
+
+
+def frames(subscription):
+    items = []
+    while not subscription.queue.empty():
+        items.append(subscription.queue.get_nowait())
+    return items
+
+
+def payload(data):
+    return orjson.loads(data.split(b"data: ", 1)[1])
+
+
+def test_frames_are_single_sse_events():
+    assert frame("change", {"a": "x\ny"}, 7) == b'id: 7\nevent: change\ndata: {"a":"x\\ny"}\n\n'
+
+
+def test_changes_reach_matching_subscribers():
+    hub = EventHub(store)
+    project = hub.add(Subscription(project_id="1"))
+    other_project = hub.add(Subscription(project_id="2"))
+    sprint = hub.add(Subscription(sprint_id="s1"))
+    bugs_only = hub.add(Subscription(collections=["bugs"]))
+
+    hub.publish_change(change("update", after={"_id": "oid", "id": "t1", "projectId": 1, "sprintId": "s1"}))
+    [data] = frames(project)
+    assert payload(data) == {
+        "type": "update", "collection": "tasks", "id": "t1",
+        "document": {"id": "t1", "projectId": 1, "sprintId": "s1"},
+    }
+    assert frames(sprint) == [data]
+    assert frames(other_project) == [] and frames(bugs_only) == []
+
+
+def test_moves_reach_the_sprint_an_item_left():
+    hub = EventHub(store)
+    old_sprint = hub.add(Subscription(sprint_id="s1"))
+    hub.publish_change(change(
+        "update",
+        before={"id": "t1", "projectId": 1, "sprintId": "s1"},
+        after={"id": "t1", "projectId": 1, "sprintId": "s2"},
+    ))
+    assert len(frames(old_sprint)) == 1
+
+
+def test_deletes_without_pre_images_invalidate_the_collection():
+    hub = EventHub(store)
+    subscription = hub.add(Subscription(project_id="1", sprint_id="s1"))
+    hub.publish_change(change("delete", collection="time_entries"))
+    [data] = frames(subscription)
+    assert b"event: invalidate" in data and payload(data) == {"collection": "timeEntries"}
+
+
+def test_slow_subscribers_are_told_to_resync():
+    subscription = Subscription(queue_size=2)
+    for n in range(3):
+        subscription.deliver(frame("change", {"n": n}))
+    assert frames(subscription) == [frame("resync", {})]
+
+
+def test_unsubscribed_clients_stop_receiving():
+    hub = EventHub(store)
+    subscription = hub.add(Subscription(project_id="1"))
+    hub.unsubscribe(subscription)
+    hub.publish_change(change("insert", after={"id": "t1", "projectId": 1}))
+    assert frames(subscription) == [] and not hub.subscribers
+
+
+def test_stream_starts_with_ready_and_unsubscribes(run):
+    hub = EventHub(store)
+    subscription = hub.add(Subscription())
+
+    async def first_and_close():
+        stream = stream_events(hub, subscription)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    first = run(first_and_close())
+    assert first.startswith(b"retry: 3000\n\nevent: ready\n")
+    assert subscription not in hub.subscribers
+
+
+def test_polling_fallback_invalidates_written_collections(run, clean_db):
+    hub = EventHub(store, poll_interval=0.02)
+
+    async def write_and_receive():
+        subscription = await hub.subscribe(project_id="1")
+        await asyncio.sleep(0.05)
+        await server.create_task(Task(projectId=1, title="T", status="New", priority="Low"))
+        try:
+            return await asyncio.wait_for(subscription.queue.get(), 2)
+        finally:
+            await hub.close()
+
+    data = run(write_and_receive())
+    if hub.mode == "polling":
+        assert payload(data) == {"collection": "tasks"}
+    else:
+        assert payload(data)["collection"] == "tasks"
@@ -0,0 +1,102 @@
+import pytest
+
+pytest.importorskip("motor")
+
+from indexes import INDEXES  # noqa: E402
+from models import ref_values  # noqa: E402
+from pagination import DEFAULT_PAGE_SIZE, PAGE_SORT  # noqa: E402
+
+# Filter shapes issued by the list endpoints, cascade deletes and sprint rollups
+HOT_QUERIES = [
+    ("projects", {"id": "p1"}),
+    ("sprints", {"id": "s1"}),
+    ("sprints", {"projectId": "p1"}),
+    ("tasks", {"id": "t1"}),
+    ("tasks", {"projectId": "p1"}),
+    ("tasks", {"projectId": "p1", "sprintId": "s1"}),
+    ("tasks", {"sprintId": "s1"}),
+    ("tasks", {"sprintId": "s1", "status": "Done"}),
+    ("tasks", {"assigneeId": "m1"}),
+    ("bugs", {"id": "b1"}),
+    ("bugs", {"projectId": "p1", "sprintId": "s1"}),
+    ("bugs", {"sprintId": "s1", "status": "Done"}),
+    ("bugs", {"taskId": "t1"}),
+    ("bugs", {"assigneeId": "m1"}),
+    ("team", {"id": "m1"}),
+    ("team", {"projectId": "p1", "sprintId": "s1"}),
+    ("team", {"sprintId": "s1"}),
+    ("time_entries", {"id": "e1"}),
+    ("time_entries", {"projectId": "p1", "sprintId": "s1"}),
+    ("time_entries", {"sprintId": "s1"}),
+    ("time_entries", {"taskId": "t1"}),
+    ("time_entries", {"taskId": "b1", "isBugEntry": True}),
+    ("time_buckets", {"assigneeId": "m1", "day": "2025-01-01"}),
+    ("time_buckets", {"projectId": "p1", "day": "2025-01-01"}),
+]
+
+# List handler filters, as built from their query parameters; ref filters
+# match both stored forms of the id
+PROJECT = {"projectId": {"$in": ref_values("1")}}
+SPRINT = {"sprintId": {"$in": ref_values("s1")}}
+ASSIGNEE = {"$or": [
+    {"isTaskEntry": {"$ne": False}, "taskId": {"$in": ["t1", "t2"]}},
+    {"isTaskEntry": False, "taskId": {"$in": ["b1"]}},
+]}
+PAGED_QUERIES = [
+    ("projects", {}),
+    ("sprints", PROJECT),
+    ("tasks", PROJECT),
+    ("tasks", {**PROJECT, **SPRINT}),
+    ("tasks", SPRINT),
+    ("bugs", PROJECT),
+    ("bugs", {**PROJECT, **SPRINT}),
+    ("bugs", SPRINT),
+    ("bugs", {"taskId": {"$in": ref_values("t1")}}),
+    ("team", PROJECT),
+    ("team", {**PROJECT, **SPRINT}),
+    ("team", SPRINT),
+    ("time_entries", PROJECT),
+    ("time_entries", {**PROJECT, **SPRINT}),
+    ("time_entries", SPRINT),
+    ("time_entries", ASSIGNEE),
+]
+
+
+def plan_stages(plan):
+    """Collect every stage name in an explain() winning plan"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def test_every_collection_has_unique_id_index(run, clean_db):
+    for collection_name in INDEXES:
+        if collection_name in ("tombstones", "time_buckets"):
+            continue
+        info = run(clean_db[collection_name].index_information())
+        assert info["id_unique"]["unique"] is True
+        assert info["id_unique"]["key"] == [("id", 1)]
+
+
+@pytest.mark.parametrize("collection_name,query", HOT_QUERIES)
+def test_hot_query_uses_an_index(run, clean_db, collection_name, query):
+    run(clean_db[collection_name].insert_one(dict(query)))
+    explanation = run(clean_db[collection_name].find(query).explain())
+    stages = plan_stages(explanation["queryPlanner"]["winningPlan"])
+    assert "COLLSCAN" not in stages
+    assert "IXSCAN" in stages or "IDHACK" in stages or "EXPRESS_IXSCAN" in stages
+
+
+@pytest.mark.parametrize("collection_name,query", PAGED_QUERIES)
+def test_list_pages_are_read_in_index_order(run, clean_db, collection_name, query):
+    cursor = clean_db[collection_name].find(query).sort(PAGE_SORT).limit(DEFAULT_PAGE_SIZE + 1)
+    stages = plan_stages(run(cursor.explain())["queryPlanner"]["winningPlan"])
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from metrics import (  # noqa: E402
+    CommandMetrics, Counter, Histogram, PoolMetrics, http_request_duration, mongo_command_duration, mongo_documents,
+    mongo_pool_checked_out, mongo_pool_checkout_failures, mongo_pool_wait,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, ("/a",))
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 4.25',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("things_total", "Things", ("name",))
+    counter.inc(('say "hi"\n',))
+    assert counter.render().splitlines()[-1] == 'things_total{name="say \\"hi\\"\\n"} 1'
+
+
+def test_requests_are_recorded_by_route_template():
+    client = TestClient(server.app)
+    before = http_request_duration.count(("GET", "/api/health"))
+    assert client.get("/api/health").status_code == 200
+    assert http_request_duration.count(("GET", "/api/health")) == before + 1
+
+    body = client.get("/api/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"}' in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert "process_uptime_seconds" in body
+
+
+def test_status_reports_uptime():
+    status = TestClient(server.app).get("/api/status").json()
+    assert status["uptimeSeconds"] >= 0 and status["uptime"].startswith("0d ")
+
+
+def test_command_listener_records_latency_and_documents():
+    listener = CommandMetrics()
+    started = SimpleNamespace(command_name="find", command={"find": "widgets"}, connection_id=("h", 1), request_id=7)
+    listener.started(started)
+    listener.succeeded(SimpleNamespace(
+        command_name="find", connection_id=("h", 1), request_id=7, duration_micros=1500,
+        reply={"cursor": {"firstBatch": [{}, {}, {}]}},
+    ))
+    assert mongo_command_duration.count(("find", "widgets")) == 1
+    assert mongo_documents.value(("find", "widgets")) == 3
+
+
+def test_pool_listener_records_wait_and_connections_in_use():
+    listener = PoolMetrics()
+    address = ("pool-test", 27017)
+    listener.connection_check_out_started(SimpleNamespace(address=address))
+    listener.connection_checked_out(SimpleNamespace(address=address, connection_id=1))
+    assert mongo_pool_wait.count(("pool-test:27017",)) == 1
+    assert mongo_pool_checked_out.value(("pool-test:27017",)) == 1
+
+    listener.connection_checked_in(SimpleNamespace(address=address, connection_id=1))
+    listener.connection_check_out_started(SimpleNamespace(address=address))
+    listener.connection_check_out_failed(SimpleNamespace(address=address, reason="timeout"))
+    assert mongo_pool_checked_out.value(("pool-test:27017",)) == 0
+    assert mongo_pool_checkout_failures.value(("pool-test:27017", "timeout")) == 1
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import ValidationError  # noqa: E402
+
+import server  # noqa: E402
+from models import Sprint, SprintUpdate, Task, TaskUpdate, projection, ref_values  # noqa: E402
+
+
+def test_references_keep_their_type():
+    task = Task(projectId=3, sprintId="9f4e", title="T", status="New", priority="Low")
+    assert task.projectId == 3 and task.sprintId == "9f4e"
+
+
+def test_ref_values_match_either_stored_type():
+    assert ref_values("7") == ref_values(7) == ["7", 7]
+    assert ref_values("9f4e") == ["9f4e"]
+
+
+def test_unknown_fields_are_dropped():
+    task = Task(projectId=1, title="T", status="New", priority="Low", severity="High", _id="x")
+    assert "severity" not in task.model_dump()
+
+
+def test_updates_only_carry_fields_that_were_sent():
+    assert TaskUpdate(sprintId=None).model_dump(exclude_unset=True) == {"sprintId": None}
+    assert "id" not in TaskUpdate.model_fields and "rollup" not in SprintUpdate.model_fields
+    with pytest.raises(ValidationError):
+        TaskUpdate(title=None)
+
+
+def test_sprint_dates_are_parsed():
+    sprint = Sprint(projectId=1, name="S", status="Planning", startDate="2025-01-06", endDate="2025-01-20T00:00:00Z")
+    assert sprint.startDate.day == 6 and sprint.endDate.tzinfo is not None
+
+
+def test_projection_matches_model():
+    assert projection(Task) == {"_id": 0, **{name: 1 for name in Task.model_fields}}
+
+
+def test_invalid_bodies_are_rejected_before_reaching_mongo():
+    client = TestClient(server.app)
+    response = client.post("/api/tasks", json={"projectId": 1, "title": "T"})
+    assert response.status_code == 422
+    missing = {error["loc"][-1] for error in response.json()["detail"]}
+    assert missing == {"status", "priority"}
+
+    response = client.put("/api/tasks/t1", json={"estimatedHours": "many"})
+    assert response.status_code == 422
+
+    # Derived from the rollup, so a value sent with the status would be overwritten
+    response = client.put("/api/sprints/s1", json={"status": "Completed", "acceptedPoints": 25})
+    assert response.status_code == 422
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from bson.objectid import ObjectId  # noqa: E402
+from fastapi import HTTPException, Response  # noqa: E402
+
+import server  # noqa: E402
+from pagination import DEFAULT_PAGE_SIZE, PageParams, decode_cursor, encode_cursor  # noqa: E402
+
+
+def page_params(limit=None, after=None, fields=None):
+    return PageParams(limit=limit, after=after, fields=fields)
+
+
+def list_tasks(run, response, page):
+    return orjson.loads(run(server.get_tasks(response, page=page)).body)
+
+
+def seed_tasks(run, database, count, created_at=None):
+    docs = [
+        {
+            "id": f"task-{i}",
+            "projectId": "p1",
+            "title": f"Task {i}",
+            "description": "x" * 100,
+            "status": "New",
+            "createdAt": created_at or datetime(2025, 1, 1) + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+    run(database.tasks.insert_many(docs))
+    return [doc["id"] for doc in docs]
+
+
+def collect_pages(run, limit, fields=None):
+    ids, after, pages = [], None, 0
+    while True:
+        response = Response()
+        page = list_tasks(run, response, page_params(limit=limit, after=after, fields=fields))
+        pages += 1
+        ids.extend(doc["id"] for doc in page)
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            return ids, pages
+
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "createdAt": datetime(2025, 3, 4, 5, 6, 7, 8000)}
+    assert decode_cursor(encode_cursor(doc)) == (doc["createdAt"], doc["_id"])
+
+
+def test_cursors_keep_the_type_of_createdAt():
+    for created_at in (None, 1735689600000, "sometime in 2024", datetime(2025, 1, 1)):
+        doc = {"_id": ObjectId(), "createdAt": created_at}
+        assert decode_cursor(encode_cursor(doc)) == (created_at, doc["_id"])
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        page_params(limit=10, after="not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_unpaginated_list_returns_everything(run, clean_db):
+    expected = seed_tasks(run, clean_db, DEFAULT_PAGE_SIZE + 5)
+    response = Response()
+    tasks = list_tasks(run, response, page_params())
+    assert [task["id"] for task in tasks] == expected
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_pages_cover_collection_once_in_order(run, clean_db):
+    expected = seed_tasks(run, clean_db, 25)
+    ids, pages = collect_pages(run, limit=10)
+    assert ids == expected
+    assert pages == 3
+
+
+def test_pages_break_createdAt_ties_by_id(run, clean_db):
+    expected = seed_tasks(run, clean_db, 12, created_at=datetime(2025, 1, 1))
+    ids, _ = collect_pages(run, limit=5)
+    assert sorted(ids) == sorted(expected)
+    assert len(ids) == len(set(ids))
+
+
+def test_pages_step_through_createdAt_of_every_type(run, clean_db):
+    # Mongo sorts missing and null first, then numbers, then strings, then dates
+    created = [None, None, 1735689600000, 1735689600001, "garbage", "not a date", datetime(2025, 1, 1)]
+    run(clean_db.tasks.insert_many([
+        {"id": f"task-{i}", "title": f"Task {i}", **({"createdAt": value} if i else {})}
+        for i, value in enumerate(created)
+    ]))
+    ids, pages = collect_pages(run, limit=2)
+    assert ids == [f"task-{i}" for i in range(len(created))]
+    assert pages == 4
+
+
+def test_fields_projection(run, clean_db):
+    seed_tasks(run, clean_db, 3)
+    tasks = list_tasks(run, Response(), page_params(fields="title,status"))
+    assert set(tasks[0]) == {"id", "createdAt", "title", "status"}
+
+
+def test_filters_accept_uuids_and_match_numeric_ids(run, clean_db):
+    run(clean_db.tasks.insert_many([
+        {"id": "t1", "projectId": 7, "sprintId": "9b2c4f7e-1d3a-4c1b-8e55-0f6a2d9e3b41", "title": "Int project"},
+        {"id": "t2", "projectId": "7", "sprintId": None, "title": "String project"},
+        {"id": "t3", "projectId": "8", "sprintId": None, "title": "Other"},
+    ]))
+
+    def ids(**filters):
+        return [task["id"] for task in orjson.loads(run(server.get_tasks(Response(), page=page_params(), **filters)).body)]
+
+    assert ids(project_id="7") == ["t1", "t2"]
+    assert ids(sprint_id="9b2c4f7e-1d3a-4c1b-8e55-0f6a2d9e3b41") == ["t1"]
@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+import server  # noqa: E402
+from models import (  # noqa: E402
+    Bug, BugUpdate, Project, ProjectUpdate, Sprint, SprintUpdate, Task, TaskUpdate, TeamMember, TeamMemberUpdate,
+)
+
+ENTITIES = [
+    # (create, update, delete, payload)
+    (server.create_project, server.update_project, server.delete_project,
+     Project(name="P", status="New", priority="Low", startDate="2025-01-01", endDate="2025-03-31")),
+    (server.create_sprint, server.update_sprint, server.delete_sprint,
+     Sprint(projectId=1, name="S", status="Planning", startDate="2025-01-06", endDate="2025-01-20")),
+    (server.create_task, server.update_task, server.delete_task,
+     Task(projectId=1, title="T", status="New", priority="Low")),
+    (server.create_bug, server.update_bug, server.delete_bug,
+     Bug(projectId=1, title="B", status="New", priority="Low", severity="Low")),
+    (server.create_team_member, server.update_team_member, server.delete_team_member,
+     TeamMember(name="M", role="Dev", capacity=40)),
+]
+UPDATES = {
+    server.update_project: ProjectUpdate,
+    server.update_sprint: SprintUpdate,
+    server.update_task: TaskUpdate,
+    server.update_bug: BugUpdate,
+    server.update_team_member: TeamMemberUpdate,
+}
+
+
+@pytest.mark.parametrize("create,update,delete,payload", ENTITIES, ids=lambda value: getattr(value, "__name__", ""))
+def test_create_and_update_are_single_round_trips(run, round_trips, create, update, delete, payload):
+    created = run(create(payload.model_copy()))
+    assert round_trips.total == 1
+
+    round_trips.reset()
+    updated = run(update(created["id"], UPDATES[update](status="Done")))
+    assert round_trips.total == 1
+    assert updated["status"] == "Done" and updated["id"] == created["id"]
+
+
+@pytest.mark.parametrize("create,update,delete,payload", ENTITIES, ids=lambda value: getattr(value, "__name__", ""))
+def test_missing_documents_cost_one_round_trip(run, round_trips, create, update, delete, payload):
+    with pytest.raises(HTTPException):
+        run(update("missing", UPDATES[update](status="Done")))
+    assert round_trips.total == 1
+
+    round_trips.reset()
+    with pytest.raises(HTTPException):
+        run(delete("missing"))
+    assert round_trips.total == 1
+
+
+def test_project_delete_writes_the_document_and_its_tombstone(run, round_trips):
+    project = run(server.create_project(ENTITIES[0][3].model_copy()))
+    round_trips.reset()
+    run(server.delete_project(project["id"]))
+    assert dict(round_trips.commands) == {("findAndModify", "projects"): 1, ("insert", "tombstones"): 1}
+
+
+def test_update_response_reflects_stored_document(run, round_trips, clean_db):
+    task = run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    updated = run(server.update_task(task["id"], TaskUpdate(status="Testing")))
+    stored = server.format_document(run(clean_db.tasks.find_one({"id": task["id"]})))
+    # Mongo stores datetimes with millisecond precision
+    assert abs(updated.pop("updatedAt") - stored.pop("updatedAt")).total_seconds() < 0.001
+    assert updated == stored
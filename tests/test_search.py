@@ -0,0 +1,112 @@
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+import server  # noqa: E402
+from models import Bug, Task, TaskUpdate  # noqa: E402
+import search as search_module  # noqa: E402
+from search import build_match, parse_query, reindex_search_terms, search, search_fields  # noqa: E402
+
+
+def task(title, description=None, **fields):
+    return Task(title=title, description=description, **{"projectId": 1, "status": "New", "priority": "Low", **fields})
+
+
+def titles(result):
+    return [hit["document"]["title"] for hit in result["results"]]
+
+
+def test_the_last_word_is_a_prefix_until_followed_by_a_space():
+    assert parse_query("Login tim") == (["login"], "tim")
+    assert parse_query("login timeout ") == (["login", "timeout"], None)
+    # Single letters narrow nothing as prefixes
+    assert parse_query("login t") == (["login", "t"], None)
+    assert parse_query("  ") == ([], None)
+
+
+def test_search_fields_hold_distinct_lowercased_words():
+    assert search_fields({"title": "Fix login, then LOGIN again", "status": "New"}) == {
+        "titleTerms": ["fix", "login", "then", "again"],
+    }
+    assert search_fields({"description": None}) == {"descriptionTerms": []}
+
+
+def test_filters_match_ids_stored_as_ints_or_strings():
+    match = build_match(["login"], None, {"projectId": "7", "sprintId": None, "status": "Done"})
+    assert match == {"$text": {"$search": "login"}, "projectId": {"$in": ["7", 7]}, "status": "Done"}
+
+
+def test_unknown_types_are_rejected(run):
+    with pytest.raises(HTTPException) as exc:
+        run(server.search_items(q="login", type="epics"))
+    assert exc.value.status_code == 400
+
+
+def test_title_matches_rank_above_description_matches(run, clean_db):
+    run(server.create_task(task("Refactor settings", "The login form needs work")))
+    run(server.create_task(task("Login page crashes", "Seen on mobile")))
+    run(server.create_bug(Bug(projectId=2, title="Unrelated", status="New", priority="Low", severity="Minor")))
+
+    result = run(search("login "))
+    assert titles(result) == ["Login page crashes", "Refactor settings"]
+    assert result["total"] == 2 and not result["truncated"]
+    assert "titleTerms" not in result["results"][0]["document"]
+
+
+def test_prefixes_autocomplete_and_combine_with_words(run, clean_db):
+    run(server.create_task(task("Session timeout on login")))
+    run(server.create_task(task("Timer drift", "Unrelated to login")))
+    run(server.create_task(task("Login button colour")))
+
+    assert set(titles(run(search("tim")))) == {"Session timeout on login", "Timer drift"}
+    assert titles(run(search("login tim")))[0] == "Session timeout on login"
+    assert "Login button colour" not in titles(run(search("login tim")))
+
+
+def test_facets_count_every_match_and_filters_narrow_them(run, clean_db):
+    for n in range(3):
+        run(server.create_task(task(f"Export fails {n}", projectId=1, sprintId="s1", status="New")))
+    run(server.create_bug(Bug(projectId="2", title="Export is slow", status="Done", priority="Low", severity="Minor")))
+
+    result = run(search("export ", limit=2))
+    assert len(result["results"]) == 2 and result["total"] == 4
+    facets = result["facets"]
+    assert facets["type"] == [{"value": "task", "count": 3}, {"value": "bug", "count": 1}]
+    assert facets["status"] == [{"value": "New", "count": 3}, {"value": "Done", "count": 1}]
+
+    assert titles(run(search("export ", project_id="2"))) == ["Export is slow"]
+    assert run(search("export ", status="New", types=["bug"]))["total"] == 0
+
+
+def test_pages_do_not_overlap(run, clean_db):
+    for n in range(5):
+        run(server.create_task(task(f"Report {n}")))
+    first = titles(run(search("report ", limit=3)))
+    second = titles(run(search("report ", offset=3, limit=3)))
+    assert len(first) == 3 and len(second) == 2 and not set(first) & set(second)
+
+
+def test_updates_and_backfill_keep_terms_current(run, clean_db):
+    created = run(server.create_task(task("Old title")))
+    run(server.update_task(created["id"], TaskUpdate(title="Renamed dashboard")))
+    assert titles(run(search("dash"))) == ["Renamed dashboard"]
+    assert run(search("old "))["total"] == 0
+
+    run(clean_db.bugs.insert_one({"id": "b1", "projectId": 1, "title": "Imported crash", "status": "New"}))
+    assert run(search("cra"))["total"] == 0
+    assert run(reindex_search_terms()) == {"task": 0, "bug": 1}
+    assert titles(run(search("cra"))) == ["Imported crash"]
+
+
+def test_capped_queries_keep_the_best_matches(run, clean_db, monkeypatch):
+    monkeypatch.setattr(search_module, "MAX_CANDIDATES", 3)
+    for n in range(5):
+        run(server.create_task(task(f"Note {n}", "Mentions the invoice")))
+    run(server.create_task(task("Invoice totals are wrong")))
+
+    result = run(search("invo", limit=1))
+    assert result["truncated"] and result["total"] == 3
+    assert titles(result) == ["Invoice totals are wrong"]
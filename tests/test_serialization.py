@@ -0,0 +1,44 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("bson")
+pytest.importorskip("fastapi")
+
+from bson.objectid import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from serialization import FastJSONResponse, dumps  # noqa: E402
+
+
+def test_matches_default_encoding():
+    doc = {
+        "_id": ObjectId(),
+        "id": "t1",
+        "title": "Überprüfung",
+        "createdAt": datetime(2025, 1, 2, 3, 4, 5, 123000),
+        "updatedAt": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "sprintId": None,
+        "actualHours": 5.5,
+        "tags": ["a", "b"],
+    }
+    expected = jsonable_encoder({**doc, "_id": str(doc["_id"])})
+    assert json.loads(dumps([doc])) == [expected]
+
+
+def test_non_string_keys_are_stringified():
+    assert json.loads(dumps({1: "a"})) == {"1": "a"}
+
+
+def test_unknown_types_are_rejected():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_response_renders_raw_documents():
+    oid = ObjectId()
+    response = FastJSONResponse([{"_id": oid}], headers={"ETag": '"x"'})
+    assert json.loads(response.body) == [{"_id": str(oid)}]
+    assert response.headers["ETag"] == '"x"'
+    assert response.media_type == "application/json"
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("motor")
+
+from pymongo.read_preferences import Primary, SecondaryPreferred  # noqa: E402
+
+from database import client, store  # noqa: E402
+from settings import Settings, load_env_files  # noqa: E402
+
+
+def test_defaults_leave_unset_options_to_the_driver():
+    options = Settings.from_env({}).client_options()
+    assert options["maxPoolSize"] == 100 and options["serverSelectionTimeoutMS"] == 5000
+    assert "waitQueueTimeoutMS" not in options and "compressors" not in options
+
+
+def test_environment_overrides():
+    settings = Settings.from_env({
+        "MONGO_MAX_POOL_SIZE": "20",
+        "MONGO_MIN_POOL_SIZE": "5",
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS": "250",
+        "MONGO_COMPRESSORS": "zstd, zlib",
+        "MONGO_ZLIB_LEVEL": "3",
+    })
+    options = settings.client_options()
+    assert (options["maxPoolSize"], options["minPoolSize"], options["waitQueueTimeoutMS"]) == (20, 5, 250)
+    assert options["compressors"] == "zstd,zlib" and options["zlibCompressionLevel"] == 3
+
+
+def test_analytics_read_preference():
+    preference = Settings.from_env({"MONGO_ANALYTICS_MAX_STALENESS_SECONDS": "120"}).analytics_read_preference()
+    assert isinstance(preference, SecondaryPreferred) and preference.max_staleness == 120
+    assert isinstance(Settings(analytics_read_preference_mode="primary").analytics_read_preference(), Primary)
+    with pytest.raises(ValueError, match="sideways"):
+        Settings(analytics_read_preference_mode="sideways").analytics_read_preference()
+
+
+def test_env_files_never_choose_the_database(tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text('DB_NAME="test_database"\nMONGO_MAX_POOL_SIZE=20\nMONGO_URL=mongodb://other\n')
+    environ = {"MONGO_URL": "mongodb://set"}
+    load_env_files([env_file, tmp_path / "missing.env"], environ)
+    assert environ == {"MONGO_URL": "mongodb://set", "MONGO_MAX_POOL_SIZE": "20"}
+    assert Settings.from_env(environ).db_name == "agile_tracker"
+
+
+def test_client_and_repositories_use_the_settings():
+    assert client.options.pool_options.max_pool_size == 100
+    assert store.tasks.collection.read_preference == Primary()
+    assert isinstance(store.tasks.analytics.read_preference, SecondaryPreferred)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("redis")
+fakeredis = pytest.importorskip("fakeredis")
+
+from bson.objectid import ObjectId  # noqa: E402
+
+from cache import MISSING, RedisCache  # noqa: E402
+
+
+@pytest.fixture
+def workers(run):
+    """Two caches standing in for two uvicorn workers sharing one Redis"""
+    server = fakeredis.FakeServer()
+    caches = [RedisCache(fakeredis.aioredis.FakeRedis(server=server), ttl=30) for _ in range(2)]
+    for cache in caches:
+        run(cache.start())
+    yield caches
+    for cache in caches:
+        run(cache.close())
+
+
+def test_values_round_trip_bson_types(run, workers):
+    worker_a, worker_b = workers
+    doc = {"_id": ObjectId(), "id": "t1", "createdAt": datetime(2025, 1, 1, 12, 0, 0, 123000), "rollup": {"doneHours": 1.5}}
+    run(worker_a.set("tasks:0:id:t1", [doc]))
+    assert run(worker_b.get("tasks:0:id:t1")) == [doc]
+    run(worker_a.set("tasks:0:id:missing", None))
+    assert run(worker_b.get("tasks:0:id:missing")) is None
+    assert run(worker_b.get("tasks:0:id:other")) is MISSING
+
+
+def test_delete_on_one_worker_evicts_for_all(run, workers):
+    worker_a, worker_b = workers
+    run(worker_b.set("tasks:0:id:t1", {"id": "t1"}))
+    run(worker_a.delete("tasks:0:id:t1"))
+    assert run(worker_b.get("tasks:0:id:t1")) is MISSING
+
+
+def test_generation_bump_reaches_other_worker_within_milliseconds(run, workers):
+    worker_a, worker_b = workers
+    assert run(worker_b.generation("tasks:lists")) == 0
+
+    async def bump_and_wait():
+        start = time.perf_counter()
+        await worker_a.bump("tasks:lists")
+        while await worker_b.generation("tasks:lists") != 1:
+            if time.perf_counter() - start > 1:
+                raise AssertionError("worker B never saw the bump")
+            await asyncio.sleep(0.001)
+        return time.perf_counter() - start
+
+    assert run(bump_and_wait()) < 0.1
+    assert run(worker_a.generation("tasks:lists")) == 1
+
+
+def test_late_starting_worker_loads_existing_generations(run, workers):
+    worker_a, worker_b = workers
+    run(worker_a.bump("sprints:entities"))
+    late = RedisCache(worker_a.redis, ttl=30)
+    # Before subscribing it reads stamps straight from Redis
+    assert run(late.generation("sprints:entities")) == 1
+    run(late.start())
+    assert run(late.generation("sprints:entities")) == 1
+    run(late.close())
+
+
+def test_loads_are_only_cached_at_the_generation_redis_holds(run, workers):
+    pytest.importorskip("lupa")
+    worker_a, worker_b = workers
+    assert run(worker_b.set_if_generation("tasks:0:id:t1", {"id": "t1"}, "tasks:lists", 0))
+    assert run(worker_a.get("tasks:0:id:t1")) == {"id": "t1"}
+
+    # A bump worker B's mirror has not heard of yet still blocks its stale load
+    run(worker_a.redis.hincrby(worker_a.generations_key, "tasks:lists", 1))
+    assert run(worker_b.generation("tasks:lists")) == 0
+    assert not run(worker_b.set_if_generation("tasks:0:id:t2", {"id": "t2"}, "tasks:lists", 0))
+    assert run(worker_a.get("tasks:0:id:t2")) is MISSING
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from database import client, slow_query_log  # noqa: E402
+from metrics import current_scope  # noqa: E402
+from models import Task  # noqa: E402
+from slow_queries import SlowQueryLog, filter_shape, summarize_explain  # noqa: E402
+
+EXPLAIN = {
+    "queryPlanner": {"winningPlan": {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "projectId_1_sprintId_1"},
+    }},
+    "executionStats": {"nReturned": 2, "totalDocsExamined": 40, "totalKeysExamined": 40, "executionTimeMillis": 12},
+}
+
+
+def events(command, reply, duration_micros, request_id=1):
+    name = next(iter(command))
+    started = SimpleNamespace(command_name=name, command=command, connection_id=("h", 1), request_id=request_id)
+    succeeded = SimpleNamespace(
+        command_name=name, database_name="test", connection_id=("h", 1), request_id=request_id,
+        duration_micros=duration_micros, reply=reply,
+    )
+    return started, succeeded
+
+
+def test_filter_shape_hides_values():
+    shape = filter_shape({"projectId": 4, "status": {"$in": ["New", "Done"]}, "$or": [{"a": 1}, {"b": 2}]})
+    assert shape == {"projectId": "?", "status": {"$in": ["?"]}, "$or": [{"a": "?"}]}
+
+
+def test_explain_summary():
+    summary = summarize_explain(EXPLAIN)
+    assert summary["stages"] == ["FETCH", "IXSCAN"]
+    assert summary["indexes"] == ["projectId_1_sprintId_1"]
+    assert summary["docsExamined"] == 40 and summary["nReturned"] == 2
+    assert not summary["collectionScan"]
+
+
+def test_only_slow_commands_are_recorded_with_their_route():
+    log = SlowQueryLog(threshold_ms=50)
+    scope = {"type": "http", "method": "GET", "route": SimpleNamespace(path="/api/tasks")}
+    token = current_scope.set(scope)
+    try:
+        for request_id, duration in ((1, 10_000), (2, 80_000)):
+            started, succeeded = events(
+                {"find": "tasks", "filter": {"projectId": request_id}}, {"cursor": {"firstBatch": [{}]}}, duration, request_id,
+            )
+            log.started(started)
+            log.succeeded(succeeded)
+    finally:
+        current_scope.reset(token)
+
+    [entry] = log.recent()
+    assert entry["route"] == "GET /api/tasks"
+    assert entry["collection"] == "tasks" and entry["durationMs"] == 80.0
+    assert entry["filterShape"] == {"projectId": "?"}
+    assert entry["docsReturned"] == 1
+    # No loop was started, so nothing is explained
+    assert entry["explain"] is None
+
+
+def test_negative_threshold_disables_logging():
+    log = SlowQueryLog(threshold_ms=-1)
+    started, succeeded = events({"find": "tasks", "filter": {}}, {"cursor": {"firstBatch": []}}, 10_000_000)
+    log.started(started)
+    log.succeeded(succeeded)
+    assert log.recent() == []
+
+
+def test_admin_endpoint_lists_and_clears():
+    slow_query_log.record("find", "test", {"find": "bugs", "filter": {"status": "Open"}}, None, 150, {})
+    http = TestClient(server.app)
+    body = http.get("/api/admin/slow-queries").json()
+    assert body["entries"][0]["collection"] == "bugs"
+    assert http.delete("/api/admin/slow-queries").status_code == 200
+    assert http.get("/api/admin/slow-queries").json()["entries"] == []
+
+
+def test_slow_queries_are_explained(run, clean_db):
+    log = SlowQueryLog(threshold_ms=0)
+
+    async def capture():
+        log.start(client, asyncio.get_running_loop())
+        await server.create_task(Task(projectId=1, title="T", status="New", priority="Low"))
+        command = {"find": "tasks", "filter": {"projectId": 1}}
+        entry = log.record("find", clean_db.name, command, None, 500, {"cursor": {"firstBatch": [{}]}})
+        for _ in range(100):
+            if entry["explain"]:
+                return entry
+            await asyncio.sleep(0.02)
+        return entry
+
+    entry = run(capture())
+    assert entry["explain"]["nReturned"] == 1
+    assert entry["explain"]["indexes"]
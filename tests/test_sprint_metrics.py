@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("motor")
+
+from sprint_metrics import get_sprint_metrics, hours_to_points  # noqa: E402
+
+
+def test_hours_to_points_rounds_half_up():
+    assert hours_to_points(12) == 2
+    assert hours_to_points(20) == 3
+    assert hours_to_points(3.9) == 0
+
+
+def test_metrics_roll_up_tasks_and_bugs_per_sprint(run, clean_db):
+    run(clean_db.sprints.insert_many([
+        {"id": "s1", "projectId": 1, "name": "Sprint 1", "status": "Active", "committedPoints": 5, "addedPoints": 1, "descopedPoints": 0},
+        {"id": "s2", "projectId": 1, "name": "Sprint 2", "status": "Planning", "committedPoints": 3},
+        {"id": "s3", "projectId": 2, "name": "Other", "status": "Active", "committedPoints": 8},
+    ]))
+    run(clean_db.tasks.insert_many([
+        {"id": "t1", "projectId": 1, "sprintId": "s1", "status": "Done", "estimatedHours": 8, "actualHours": 8},
+        {"id": "t2", "projectId": 1, "sprintId": "s1", "status": "In Progress", "estimatedHours": 4, "actualHours": 2},
+        {"id": "t3", "projectId": 1, "sprintId": "s2", "status": "Done", "actualHours": 16},
+        {"id": "t4", "projectId": 2, "sprintId": "s3", "status": "Done", "actualHours": 40},
+    ]))
+    run(clean_db.bugs.insert_many([
+        {"id": "b1", "projectId": 1, "sprintId": "s1", "status": "Done", "estimatedHours": 2, "actualHours": 4},
+        {"id": "b2", "projectId": 1, "sprintId": None, "status": "Done", "actualHours": 100},
+    ]))
+
+    metrics = {row["sprintId"]: row for row in run(get_sprint_metrics(1))}
+
+    assert set(metrics) == {"s1", "s2"}
+    s1 = metrics["s1"]
+    assert s1["itemCount"] == 3 and s1["doneCount"] == 2
+    assert s1["doneHours"] == 12 and s1["actualHours"] == 14 and s1["estimatedHours"] == 14
+    assert s1["acceptedPoints"] == 2
+    assert (s1["committedPoints"], s1["addedPoints"], s1["descopedPoints"]) == (5, 1, 0)
+    # Planning sprints report no accepted points even with completed work
+    assert metrics["s2"]["acceptedPoints"] == 0 and metrics["s2"]["doneHours"] == 16
+
+    assert {row["sprintId"] for row in run(get_sprint_metrics())} == {"s1", "s2", "s3"}
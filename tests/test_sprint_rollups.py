@@ -0,0 +1,100 @@
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+import server  # noqa: E402
+from models import Bug, BugUpdate, SprintUpdate, Task, TaskUpdate, TimeEntry  # noqa: E402
+from sprint_rollups import item_deltas, reconcile_sprint_rollups, status_key  # noqa: E402
+
+
+def sprint(run, database, sprint_id="s1"):
+    return run(database.sprints.find_one({"id": sprint_id}))
+
+
+def test_item_deltas_move_between_sprints():
+    old = {"sprintId": "s1", "status": "Done", "actualHours": 8}
+    new = {"sprintId": "s2", "status": "Done", "actualHours": 8}
+    assert item_deltas(old, new) == {
+        "s1": {"rollup.itemCount": -1, "rollup.statusCounts.Done": -1, "rollup.doneHours": -8},
+        "s2": {"rollup.itemCount": 1, "rollup.statusCounts.Done": 1, "rollup.doneHours": 8},
+    }
+    assert item_deltas(new, new) == {}
+
+
+def test_status_keys_cannot_address_nested_fields_or_operators():
+    assert status_key("In Progress") == "In Progress"
+    assert status_key("v1.2 QA") == "v1\uff0e2 QA"
+    assert status_key("$set") == "\uff04set"
+    assert status_key("") == status_key(None) == "Unknown"
+    assert item_deltas(None, {"sprintId": "s1", "status": "a.b"}) == {
+        "s1": {"rollup.itemCount": 1, "rollup.statusCounts.a\uff0eb": 1},
+    }
+
+
+def test_write_paths_keep_rollup_current(run, clean_db):
+    run(clean_db.sprints.insert_one({"id": "s1", "name": "Sprint", "status": "Active"}))
+
+    task = run(server.create_task(Task(projectId=1, sprintId="s1", title="T", status="New", actualHours=0, priority="Low")))
+    bug = run(server.create_bug(Bug(projectId=1, sprintId="s1", title="B", status="New", severity="Low", priority="Low")))
+    assert sprint(run, clean_db)["rollup"] == {"itemCount": 2, "statusCounts": {"New": 2}}
+
+    run(server.update_task(task["id"], TaskUpdate(status="Done", actualHours=6)))
+    run(server.update_bug(bug["id"], BugUpdate(status="Done", actualHours=4)))
+    doc = sprint(run, clean_db)
+    assert doc["rollup"]["statusCounts"] == {"New": 0, "Done": 2}
+    assert doc["rollup"]["doneHours"] == 10
+    assert doc["acceptedPoints"] == 1
+
+    entry = run(server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, hours=4, date="2025-01-01")))
+    doc = sprint(run, clean_db)
+    assert doc["rollup"]["doneHours"] == 14 and doc["acceptedPoints"] == 2
+
+    run(server.delete_time_entry(entry["id"]))
+    assert sprint(run, clean_db)["rollup"]["doneHours"] == 10
+
+    run(server.delete_bug(bug["id"]))
+    doc = sprint(run, clean_db)
+    assert doc["rollup"]["itemCount"] == 1 and doc["rollup"]["doneHours"] == 6
+
+    report = run(reconcile_sprint_rollups(dry_run=True))
+    assert report["checked"] == 1 and report["drifted"] == 0
+
+
+def test_reconcile_reports_and_repairs_drift(run, clean_db):
+    run(clean_db.sprints.insert_one({"id": "s1", "status": "Active", "rollup": {"itemCount": 7, "doneHours": 3}}))
+    # Written behind the API's back, as a bulk import would
+    run(clean_db.tasks.insert_many([
+        {"id": "t1", "sprintId": "s1", "status": "Done", "actualHours": 16},
+        {"id": "t2", "sprintId": "s1", "status": "In Progress", "actualHours": 1},
+    ]))
+
+    report = run(reconcile_sprint_rollups(dry_run=True))
+    assert report["drifted"] == 1 and report["corrected"] == 0
+    assert report["drift"][0]["expected"] == {"itemCount": 2, "doneHours": 16, "statusCounts": {"Done": 1, "In Progress": 1}}
+    assert sprint(run, clean_db)["rollup"]["itemCount"] == 7
+
+    report = run(reconcile_sprint_rollups())
+    assert report["corrected"] == 1
+    doc = sprint(run, clean_db)
+    assert doc["rollup"]["itemCount"] == 2 and doc["acceptedPoints"] == 2
+    assert run(reconcile_sprint_rollups())["drifted"] == 0
+
+
+def test_planning_sprints_accept_no_points_until_started(run, clean_db):
+    run(clean_db.sprints.insert_one({"id": "s1", "name": "Sprint", "status": "Planning"}))
+    run(server.create_task(Task(projectId=1, sprintId="s1", title="T", status="Done", actualHours=16, priority="Low")))
+    assert sprint(run, clean_db)["acceptedPoints"] == 0
+    assert run(reconcile_sprint_rollups(dry_run=True))["drifted"] == 0
+
+    run(server.update_sprint("s1", SprintUpdate(status="Active")))
+    assert sprint(run, clean_db)["acceptedPoints"] == 2
+    assert run(reconcile_sprint_rollups(dry_run=True))["drifted"] == 0
+
+
+def test_statuses_with_dots_and_dollars_are_counted(run, clean_db):
+    run(clean_db.sprints.insert_one({"id": "s1", "name": "Sprint", "status": "Active"}))
+    for status in ("v1.2 QA", "$pending"):
+        run(server.create_task(Task(projectId=1, sprintId="s1", title="T", status=status, priority="Low")))
+    assert sprint(run, clean_db)["rollup"]["statusCounts"] == {status_key("v1.2 QA"): 1, status_key("$pending"): 1}
+    assert run(reconcile_sprint_rollups(dry_run=True))["drifted"] == 0
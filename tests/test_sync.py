@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+import server  # noqa: E402
+from models import Task, TaskUpdate  # noqa: E402
+from sync import _object, decode_token, encode_token, sync_changes  # noqa: E402
+
+DATASET = 500
+
+
+def collect(run, names, since=None):
+    async def read():
+        return "".join([chunk async for chunk in sync_changes(names, since)])
+    return orjson.loads(run(read()))
+
+
+async def values(*items):
+    for item in items:
+        yield item
+
+
+def test_tokens_round_trip_at_millisecond_precision():
+    moment = datetime(2025, 3, 1, 12, 30, 15, 123000)
+    assert decode_token(encode_token(moment)) == moment
+    with pytest.raises(ValueError):
+        decode_token("yesterday")
+
+
+def test_streamed_objects_leave_out_empty_arrays(run):
+    async def render():
+        return "".join([part async for part in _object([("a", values()), ("b", values(1, 2)), ("c", values("x"))])])
+    assert orjson.loads(run(render())) == {"b": [1, 2], "c": ["x"]}
+
+
+def test_invalid_tokens_are_rejected(run):
+    with pytest.raises(HTTPException) as exc:
+        run(server.sync(since="nope"))
+    assert exc.value.status_code == 400
+
+
+def test_delta_contains_only_what_changed(run, clean_db):
+    long_ago = datetime.now() - timedelta(days=1)
+    run(clean_db.tasks.insert_many([
+        {"id": f"t{i}", "projectId": 1, "title": f"T{i}", "status": "New", "priority": "Low", "createdAt": long_ago}
+        for i in range(DATASET)
+    ]))
+    snapshot = collect(run, ["tasks"])
+    assert snapshot["reset"] and len(snapshot["changes"]["tasks"]) == DATASET
+
+    since = decode_token(encode_token(datetime.now() - timedelta(seconds=1)))
+    created = run(server.create_task(Task(projectId=1, title="New", status="New", priority="Low")))
+    run(server.update_task("t1", TaskUpdate(status="Done")))
+    run(server.delete_task("t2"))
+
+    delta = collect(run, ["tasks", "timeEntries"], since)
+    assert not delta["reset"]
+    assert {doc["id"] for doc in delta["changes"]["tasks"]} == {created["id"], "t1"}
+    assert delta["deleted"] == {"tasks": ["t2"]}
+    assert "_id" not in delta["changes"]["tasks"][0]
+
+
+def test_stale_tokens_get_a_full_snapshot(run, clean_db):
+    run(server.create_task(Task(projectId=1, title="T", status="New", priority="Low")))
+    delta = collect(run, ["tasks"], datetime.now() - timedelta(days=365))
+    assert delta["reset"] and len(delta["changes"]["tasks"]) == 1
+
+
+def test_cascaded_changes_are_synced(run, clean_db):
+    run(clean_db.sprints.insert_one({"id": "s1", "name": "S", "createdAt": datetime(2025, 1, 1)}))
+    run(clean_db.tasks.insert_one({"id": "t1", "sprintId": "s1", "createdAt": datetime(2025, 1, 1)}))
+    run(clean_db.time_entries.insert_one({"id": "e1", "taskId": "t9", "createdAt": datetime(2025, 1, 1)}))
+    run(clean_db.tasks.insert_one({"id": "t9", "createdAt": datetime(2025, 1, 1)}))
+    since = datetime.now() - timedelta(seconds=1)
+
+    run(server.delete_sprint("s1"))
+    run(server.delete_task("t9"))
+
+    delta = collect(run, ["sprints", "tasks", "timeEntries"], since)
+    assert [doc["id"] for doc in delta["changes"]["tasks"]] == ["t1"]
+    assert delta["deleted"] == {"sprints": ["s1"], "tasks": ["t9"], "timeEntries": ["e1"]}
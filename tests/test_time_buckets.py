@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+import server  # noqa: E402
+from batch import Batch, BatchOperation  # noqa: E402
+from models import Task, TimeEntry  # noqa: E402
+from time_buckets import bucket_day, entry_deltas, merge_bucket_deltas, reconcile_time_buckets  # noqa: E402
+
+PARALLEL_ENTRIES = 200
+CASCADED_ENTRIES = 2500
+
+
+def seed_task(run, assignee="m1", status="In Progress"):
+    return run(server.create_task(Task(
+        projectId=1, sprintId="s1", title="T", status=status, priority="Low", assigneeId=assignee,
+    )))
+
+
+def log(run, task, hours=1.0, date="2025-01-06"):
+    return run(server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, sprintId="s1", hours=hours, date=date)))
+
+
+def quarter(run, **filters):
+    return run(server.get_time_buckets(start="2025-01-01", end="2025-03-31", **filters))
+
+
+def test_days_are_normalized_from_free_form_dates():
+    assert bucket_day("2025-01-06") == "2025-01-06"
+    assert bucket_day("2025-01-06T23:30:00Z") == "2025-01-06"
+    assert bucket_day("01/06/2025") == "2025-01-06"
+    assert bucket_day("last tuesday") is None and bucket_day(None) is None
+
+
+def test_deltas_skip_entries_without_a_bucket_and_cancel_out():
+    entry = {"projectId": 1, "sprintId": "s1", "assigneeId": "m1", "date": "2025-01-06", "hours": 2}
+    legacy = {key: value for key, value in entry.items() if key != "assigneeId"}
+    added = entry_deltas([entry, entry, legacy])
+    assert added == {(1, "s1", "m1", "2025-01-06"): (4.0, 2)}
+    assert merge_bucket_deltas([added, entry_deltas([entry, entry], -1)]) == {}
+
+
+def test_invalid_ranges_are_rejected(run):
+    for start, end in (("2025-02-01", "2025-01-01"), ("2024-01-01", "2025-06-01"), ("Jan 1", "2025-01-02")):
+        with pytest.raises(HTTPException) as exc:
+            run(server.get_time_buckets(start=start, end=end))
+        assert exc.value.status_code == 400
+
+
+def test_entries_fill_their_assignees_daily_bucket(run, clean_db):
+    task = seed_task(run)
+    log(run, task, 2, "2025-01-06")
+    log(run, task, 3, "2025-01-06")
+    log(run, task, 1, "2025-01-07")
+    log(run, seed_task(run, assignee="m2"), 8, "2025-01-06")
+
+    sheet = quarter(run, assignee_id="m1")
+    assert [(bucket["day"], bucket["hours"], bucket["entries"]) for bucket in sheet["buckets"]] == [
+        ("2025-01-06", 5, 2), ("2025-01-07", 1, 1),
+    ]
+    assert sheet["totalHours"] == 6
+    assert quarter(run, project_id="1")["totalHours"] == 14
+
+
+def test_offline_assignee_ids_match_their_query_string(run, clean_db):
+    log(run, seed_task(run, assignee=7), 2)
+    assert quarter(run, assignee_id="7")["totalHours"] == 2
+
+
+def test_parallel_creates_and_deletes_leave_buckets_exact(run, clean_db):
+    task = seed_task(run, status="Done")
+
+    async def log_all():
+        return await asyncio.gather(*[
+            server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, sprintId="s1", hours=0.5, date="2025-01-06"))
+            for _ in range(PARALLEL_ENTRIES)
+        ])
+
+    entries = run(log_all())
+    [bucket] = quarter(run)["buckets"]
+    assert bucket["hours"] == PARALLEL_ENTRIES * 0.5 and bucket["entries"] == PARALLEL_ENTRIES
+
+    async def delete_half():
+        await asyncio.gather(*[server.delete_time_entry(entry["id"]) for entry in entries[::2]])
+
+    run(delete_half())
+    [bucket] = quarter(run)["buckets"]
+    assert bucket["entries"] == PARALLEL_ENTRIES // 2
+    assert run(reconcile_time_buckets(dry_run=True))["drifted"] == 0
+
+
+def test_buckets_stay_with_the_assignee_at_logging_time(run, clean_db):
+    task = seed_task(run)
+    entry = log(run, task, 4)
+    run(clean_db.tasks.update_one({"id": task["id"]}, {"$set": {"assigneeId": "m2"}}))
+    run(server.delete_time_entry(entry["id"]))
+    assert quarter(run)["buckets"] == []
+
+
+def test_cascade_and_batch_deletes_empty_buckets(run, clean_db):
+    task = seed_task(run)
+    for _ in range(3):
+        log(run, task)
+    run(server.delete_task(task["id"]))
+    assert quarter(run)["buckets"] == []
+
+    other = seed_task(run)
+    result = run(Batch([
+        BatchOperation(op="create", collection="timeEntries", data={
+            "taskId": other["id"], "projectId": 1, "sprintId": "s1", "hours": 2, "date": "2025-02-03",
+        }),
+    ]).run())
+    assert quarter(run, assignee_id="m1")["totalHours"] == 2
+    run(Batch([BatchOperation(op="delete", collection="timeEntries", id=result["results"][0]["id"])]).run())
+    assert quarter(run)["buckets"] == []
+
+
+def test_cascades_sum_bucket_deltas_in_mongo(run, clean_db, round_trips):
+    task = seed_task(run)
+    run(clean_db.time_entries.insert_many([
+        {"id": f"e{n}", "taskId": task["id"], "projectId": 1, "sprintId": "s1", "assigneeId": "m1",
+         "hours": 1, "date": f"2025-01-0{n % 3 + 1}"}
+        for n in range(CASCADED_ENTRIES)
+    ]))
+    run(reconcile_time_buckets())
+    round_trips.reset()
+
+    assert run(server.delete_task(task["id"]))["affected"]["timeEntries"] == CASCADED_ENTRIES
+    assert quarter(run)["buckets"] == []
+    assert run(clean_db.tombstones.count_documents({"collection": "time_entries"})) == CASCADED_ENTRIES
+    # Grouped per bucket and deleted in one command, never listed by id
+    assert round_trips.commands[("aggregate", "time_entries")] == 1
+    assert round_trips.commands[("delete", "time_entries")] == 1
+    assert ("distinct", "time_entries") not in round_trips.commands
+
+
+def test_reconcile_assigns_legacy_entries_and_rebuilds_buckets(run, clean_db):
+    task = seed_task(run)
+    run(clean_db.time_entries.insert_many([
+        {"id": "e1", "taskId": task["id"], "projectId": 1, "sprintId": "s1", "hours": 2, "date": "2025-03-01"},
+        {"id": "e2", "taskId": task["id"], "projectId": 1, "sprintId": "s1", "hours": 1, "date": "someday"},
+    ]))
+    assert quarter(run)["buckets"] == []
+
+    report = run(reconcile_time_buckets())
+    assert report["assigned"] == 2 and report["unbucketed"] == 1 and report["corrected"] == 1
+    assert run(clean_db.time_entries.find_one({"id": "e1"}))["assigneeId"] == "m1"
+    assert quarter(run, assignee_id="m1")["totalHours"] == 2
+    assert run(reconcile_time_buckets(dry_run=True))["drifted"] == 0
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+import server  # noqa: E402
+from models import Task, TimeEntry  # noqa: E402
+
+PARALLEL_ENTRIES = 300
+
+
+def seed_done_task(run, database):
+    run(database.sprints.insert_one({"id": "s1", "status": "Active"}))
+    return run(server.create_task(Task(projectId=1, sprintId="s1", title="T", status="Done", actualHours=0, priority="Low")))
+
+
+def test_parallel_time_entries_sum_exactly(run, clean_db):
+    task = seed_done_task(run, clean_db)
+
+    async def log_all():
+        return await asyncio.gather(*[
+            server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, hours=0.5, date="2025-01-01"))
+            for _ in range(PARALLEL_ENTRIES)
+        ])
+
+    entries = run(log_all())
+    expected = PARALLEL_ENTRIES * 0.5
+    assert run(clean_db.tasks.find_one({"id": task["id"]}))["actualHours"] == expected
+    sprint = run(clean_db.sprints.find_one({"id": "s1"}))
+    assert sprint["rollup"]["doneHours"] == expected
+
+    async def delete_all():
+        # Every entry is deleted twice; the duplicate must not subtract again
+        ids = [entry["id"] for entry in entries] * 2
+        return await asyncio.gather(*[server.delete_time_entry(entry_id) for entry_id in ids], return_exceptions=True)
+
+    results = run(delete_all())
+    assert sum(isinstance(result, dict) for result in results) == PARALLEL_ENTRIES
+    assert run(clean_db.tasks.find_one({"id": task["id"]}))["actualHours"] == 0
+    assert run(clean_db.sprints.find_one({"id": "s1"}))["rollup"]["doneHours"] == 0
+
+
+def test_delete_floors_actual_hours_at_zero(run, clean_db):
+    task = seed_done_task(run, clean_db)
+    entry = run(server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, hours=5, date="2025-01-01")))
+    run(clean_db.tasks.update_one({"id": task["id"]}, {"$set": {"actualHours": 2}}))
+    run(clean_db.sprints.update_one({"id": "s1"}, {"$set": {"rollup.doneHours": 2}}))
+
+    run(server.delete_time_entry(entry["id"]))
+    assert run(clean_db.tasks.find_one({"id": task["id"]}))["actualHours"] == 0
+    assert run(clean_db.sprints.find_one({"id": "s1"}))["rollup"]["doneHours"] == 0
+
+
+def test_entries_for_unfinished_items_leave_hours_alone(run, clean_db):
+    task = run(server.create_task(Task(projectId=1, title="T", status="In Progress", actualHours=1, priority="Low")))
+    run(server.create_time_entry(TimeEntry(taskId=task["id"], projectId=1, hours=3, date="2025-01-01")))
+    assert run(clean_db.tasks.find_one({"id": task["id"]}))["actualHours"] == 1
@@ -0,0 +1,129 @@
+import json
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+import server  # noqa: E402
+from sync import sync_changes  # noqa: E402
+from transfer import Importer  # noqa: E402
+
+
+def seed(run, database):
+    run(database.projects.insert_one({"id": "p1", "name": "Project", "createdAt": datetime(2025, 1, 1)}))
+    run(database.tasks.insert_many([
+        {"id": f"t{i}", "projectId": "p1", "title": f"Task {i}", "createdAt": datetime(2025, 1, 2)}
+        for i in range(3)
+    ]))
+    run(database.time_entries.insert_one({"id": "e1", "taskId": "t0", "hours": 2.5, "date": "2025-01-03"}))
+
+
+def read_body(run, response):
+    return run(read_stream(response.body_iterator))
+
+
+async def read_stream(chunks):
+    return "".join([chunk async for chunk in chunks])
+
+
+def test_export_ndjson(run, clean_db):
+    seed(run, clean_db)
+    response = run(server.export_data(format="ndjson", collections=None))
+    assert response.media_type == "application/x-ndjson"
+
+    records = [json.loads(line) for line in read_body(run, response).splitlines()]
+    assert [record["collection"] for record in records] == ["projects", "tasks", "tasks", "tasks", "timeEntries"]
+    assert records[0]["document"] == {"id": "p1", "name": "Project", "createdAt": "2025-01-01T00:00:00"}
+    assert all("_id" not in record["document"] for record in records)
+
+
+def test_export_json_matches_frontend_shape(run, clean_db):
+    seed(run, clean_db)
+    response = run(server.export_data(format="json", collections="tasks,timeEntries,team"))
+    data = json.loads(read_body(run, response))
+    assert list(data) == ["tasks", "timeEntries", "team"]
+    assert [task["id"] for task in data["tasks"]] == ["t0", "t1", "t2"]
+    assert data["timeEntries"][0]["hours"] == 2.5
+    assert data["team"] == []
+
+
+def test_export_rejects_unknown_collection(run, clean_db):
+    with pytest.raises(HTTPException) as exc_info:
+        run(server.export_data(format="ndjson", collections="tasks,widgets"))
+    assert exc_info.value.status_code == 400
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_import_ndjson_in_batches(run, clean_db):
+    lines = [json.dumps({"collection": "tasks", "document": {"title": f"Task {i}", "createdAt": "2025-01-02T00:00:00"}}) for i in range(25)]
+    lines.append(json.dumps({"collection": "timeEntries", "document": {"id": "e1", "hours": 1}}))
+    body = ("\n".join(lines) + "\n").encode()
+
+    importer = Importer(batch_size=10)
+    # Small chunks split records across reads
+    run(importer.load_ndjson(chunked(body, 37)))
+    report = run(importer.finish())
+
+    assert report["collections"]["tasks"] == {"received": 25, "written": 25, "failed": 0}
+    assert report["collections"]["timeEntries"]["written"] == 1
+    assert report["failedBatches"] == [] and report["errors"] == []
+    assert run(clean_db.tasks.count_documents({})) == 25
+    task = run(clean_db.tasks.find_one({"title": "Task 0"}))
+    assert task["id"] and task["createdAt"] == datetime(2025, 1, 2)
+
+
+def test_import_reports_duplicates_and_bad_records(run, clean_db):
+    run(clean_db.tasks.insert_one({"id": "t1", "title": "Existing"}))
+    body = "\n".join([
+        json.dumps({"collection": "tasks", "document": {"id": "t1", "title": "Duplicate"}}),
+        json.dumps({"collection": "tasks", "document": {"id": "t2", "title": "New"}}),
+        json.dumps({"collection": "widgets", "document": {}}),
+        "{not json",
+    ]).encode()
+
+    importer = Importer()
+    run(importer.load_ndjson(chunked(body, 1024)))
+    report = run(importer.finish())
+
+    assert report["collections"]["tasks"] == {"received": 2, "written": 1, "failed": 1}
+    assert report["failedBatches"][0]["errors"][0]["id"] == "t1"
+    assert [error["source"] for error in report["errors"]] == ["line 3", "line 4"]
+
+
+def test_import_upsert_replaces_existing(run, clean_db):
+    run(clean_db.tasks.insert_one({"id": "t1", "title": "Old"}))
+    importer = Importer(upsert=True)
+    run(importer.load_json({"tasks": [{"id": "t1", "title": "New"}]}))
+    report = run(importer.finish())
+
+    assert report["collections"]["tasks"]["failed"] == 0
+    assert run(clean_db.tasks.find_one({"id": "t1"}))["title"] == "New"
+
+
+def test_import_keeps_valid_updated_at_and_is_synced(run, clean_db):
+    importer = Importer()
+    since = datetime.now() - timedelta(seconds=1)
+    run(importer.load_json({"tasks": [
+        {"id": "t1", "title": "Edited offline", "updatedAt": "2024-06-01T08:00:00"},
+        {"id": "t2", "title": "Never edited"},
+        {"id": "t3", "title": "Bad stamp", "updatedAt": "last week"},
+    ]}))
+    run(importer.finish())
+
+    stamps = {task["id"]: task["updatedAt"] for task in run(clean_db.tasks.find().to_list(None))}
+    assert stamps["t1"] == datetime(2024, 6, 1, 8)
+    assert stamps["t2"] == stamps["t3"] >= since
+
+    # Delta sync still hands out the record with the old updatedAt
+    delta = orjson.loads(run(read_stream(sync_changes(["tasks"], since))))
+    assert {task["id"] for task in delta["changes"]["tasks"]} == {"t1", "t2", "t3"}
+    assert "importedAt" not in delta["changes"]["tasks"][0]